@@ -0,0 +1,10 @@
+# Course:      CS261 - Data Structures
+# Description: Benchmark suite comparing the separate chaining and open addressing
+#              HashMaps with Python's built-in dict. Run it with
+#
+#                  python -m benchmarks [--sizes 1000 100000 ...] [--output results.json]
+#                                       [--baseline benchmarks/baselines/default.json]
+#
+#              keys.py builds the key sets and access patterns, workloads.py times one
+#              workload on one map, and runner.py runs the whole matrix, writes the results
+#              as JSON and flags results that got slower than a stored baseline.
@@ -0,0 +1,64 @@
+# Course:      CS261 - Data Structures
+# Description: Command line entry point of the benchmark suite (python -m benchmarks).
+#              Prints one line per case, optionally writes the results to a JSON file and
+#              compares them with a baseline, exiting with status 1 if any case regressed.
+
+import argparse
+import sys
+
+from benchmarks.keys import DISTRIBUTIONS
+from benchmarks.runner import (DEFAULT_BUDGET, DEFAULT_REPEAT, DEFAULT_SIZES, FUNCTIONS, LOAD_FACTORS,
+                               REGRESSION_THRESHOLD, compare, load_results, run, save_results)
+from benchmarks.workloads import MAPS, WORKLOADS
+
+
+def _print_record(record: dict) -> None:
+    """
+    Prints one result line
+    """
+    timing = '%12.0f ns/op' % record['ns_per_op'] if record['status'] == 'ok' else '%15s' % record['status']
+    load = '' if record['table_load'] is None else '  load %.2f' % record['table_load']
+    print('%-4s %-15s %-8s %-7s %9d  lf %-5s%s%s' % (record['map'], record['function'], record['distribution'],
+                                                      record['workload'], record['size'], record['load_factor'],
+                                                      timing, load))
+    sys.stdout.flush()
+
+
+def main(arguments: list = None) -> int:
+    """
+    Runs the suite as configured by the command line arguments and returns the exit status
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="HashMap benchmark suite")
+    parser.add_argument('--maps', nargs='+', choices=MAPS, default=MAPS)
+    parser.add_argument('--functions', nargs='+', choices=tuple(FUNCTIONS), default=tuple(FUNCTIONS))
+    parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS, default=DISTRIBUTIONS)
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help="key counts, e.g. 1000 10000 100000 1000000 10000000")
+    parser.add_argument('--load-factors', nargs='+', type=float, default=LOAD_FACTORS)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help="seconds allowed per case")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="runs per case, the median is kept")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare with results saved in this JSON file")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown flagged as a regression")
+    options = parser.parse_args(arguments)
+
+    results = run(options.maps, options.functions, options.distributions, options.workloads, options.sizes,
+                  options.load_factors, options.budget, options.repeat, progress=_print_record)
+    if options.output:
+        save_results(results, options.output)
+
+    if not options.baseline:
+        return 0
+    regressions = compare(results, load_results(options.baseline), options.threshold)
+    for record in regressions:
+        change = 'timed out' if record['change'] is None else '%+.0f%%' % (record['change'] * 100)
+        print('REGRESSION', *(record[field] for field in ('map', 'function', 'distribution', 'workload',
+                                                         'size', 'load_factor')), change)
+    print(len(regressions), 'regression(s) against', options.baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# Course:      CS261 - Data Structures
+# Description: Key sets and access patterns for the benchmarks. Every distribution returns
+#              the keys to insert, keys that are never inserted (for misses) and the order
+#              in which the inserted keys are read. All of them are seeded, so every run
+#              uses the same keys.
+#
+#              uniform:  random lowercase strings, read in uniformly random order
+#              zipf:     the same strings, read with Zipfian skew (a few keys are most reads)
+#              anagram:  permutations of the same letters. Every key has the same
+#                        hash_function_1 value, the worst case for the course hash functions.
+
+import itertools
+import random
+import string
+
+
+# Length of the uniform and Zipfian keys
+KEY_LENGTH = 12
+
+# Zipf exponent: the key of rank r is read with weight 1 / r ** ZIPF_EXPONENT
+ZIPF_EXPONENT = 1.1
+
+# Letters permuted into anagram keys; 11! is enough for 10 ** 7 hits and misses each
+ANAGRAM_LETTERS = 'abcdefghijk'
+
+DISTRIBUTIONS = ('uniform', 'zipf', 'anagram')
+
+
+def random_strings(count: int, seed: int) -> list:
+    """
+    Returns count distinct random lowercase strings
+    """
+    generator = random.Random(seed)
+    letters = string.ascii_lowercase
+    keys = set()
+    while len(keys) < count:
+        keys.add(''.join(generator.choices(letters, k=KEY_LENGTH)))
+    keys = sorted(keys)
+    generator.shuffle(keys)
+    return keys
+
+
+def anagrams(count: int, skip: int = 0) -> list:
+    """
+    Returns count distinct permutations of ANAGRAM_LETTERS, after the first skip ones
+    """
+    permutations = itertools.islice(itertools.permutations(ANAGRAM_LETTERS), skip, skip + count)
+    return [''.join(letters) for letters in permutations]
+
+
+def zipf_order(count: int, reads: int, seed: int) -> list:
+    """
+    Returns reads positions in range(count), position r - 1 drawn with weight 1 / r ** ZIPF_EXPONENT
+    """
+    generator = random.Random(seed)
+    weights = list(itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, count + 1)))
+    return generator.choices(range(count), cum_weights=weights, k=reads)
+
+
+def key_sets(distribution: str, count: int, seed: int = 261) -> tuple:
+    """
+    Returns a tuple of three lists for the distribution: count keys to insert, count keys
+    that are not inserted, and count reads of the inserted keys in access order
+    """
+    if distribution == 'anagram':
+        keys, missing = anagrams(count), anagrams(count, skip=count)
+    elif distribution in ('uniform', 'zipf'):
+        both = random_strings(2 * count, seed)
+        keys, missing = both[:count], both[count:]
+    else:
+        raise ValueError("Unknown key distribution " + repr(distribution))
+
+    if distribution == 'zipf':
+        order = zipf_order(count, count, seed + 1)
+    else:
+        generator = random.Random(seed + 1)
+        order = [generator.randrange(count) for _ in range(count)]
+    return keys, missing, [keys[position] for position in order]
@@ -0,0 +1,183 @@
+# Course:      CS261 - Data Structures
+# Description: Runs the benchmark matrix (map kind x hash function x key distribution x
+#              workload x size x load factor) and compares results with a baseline. Results
+#              are a JSON friendly dict: 'meta' describes the run and 'results' holds one
+#              record per case with its status ('ok', 'timeout' or 'skipped'), operation
+#              count, seconds, nanoseconds per operation and final table load. A case that
+#              times out is skipped at every larger size. Baselines are results saved from
+#              an earlier run on the same machine; timings from other machines don't compare.
+
+import gc
+import json
+import platform
+import sys
+import time
+from time import perf_counter
+
+from a6_include import hash_function_1, hash_function_2
+from benchmarks.keys import DISTRIBUTIONS, key_sets
+from benchmarks.workloads import MAPS, MAX_LOAD, WORKLOADS, BenchmarkTimeout, run_workload
+
+
+FUNCTIONS = {'hash_function_1': hash_function_1, 'hash_function_2': hash_function_2}
+
+DEFAULT_SIZES = (1000, 10000)
+LOAD_FACTORS = (0.25, 0.5, 1.0)
+
+# Seconds a single case may take, setup included, before it times out
+DEFAULT_BUDGET = 5.0
+
+# Runs per case unless told otherwise. The median run is kept, so one run slowed down by
+# other work on the machine doesn't move the result
+DEFAULT_REPEAT = 3
+
+# Fast cases are run again until their runs add up to this many seconds (at most MAX_RUNS
+# runs, within the case's budget), so a case of a few microseconds isn't timed just once
+MIN_TOTAL_SECONDS = 0.2
+MAX_RUNS = 100
+
+# A case is flagged once it is this much slower per operation than its baseline. Between two
+# runs of the suite on a shared single-CPU machine, the medians of 19 cases in 20 moved by
+# less than a third, but a few moved by up to 85%, so only twice as slow is flagged
+REGRESSION_THRESHOLD = 1.0
+
+# Fields that identify a case
+CASE_FIELDS = ('map', 'function', 'distribution', 'workload', 'size', 'load_factor')
+
+
+def _case_key(record: dict) -> tuple:
+    """
+    Returns the fields of a result record that identify its case
+    """
+    return tuple(record[field] for field in CASE_FIELDS)
+
+
+def cases(maps, functions, distributions, workloads, sizes, load_factors) -> list:
+    """
+    Returns every case of the matrix as a dict of CASE_FIELDS. dict uses its own hash and
+    ignores load factors, the resize workload always starts from capacity 11, and load
+    factors a map would resize away from are left out.
+    """
+    matrix = []
+    for size in sorted(sizes):
+        for distribution in distributions:
+            for kind in maps:
+                for function in (('builtin',) if kind == 'dict' else functions):
+                    for workload in workloads:
+                        if kind == 'dict' or workload == 'resize':
+                            factors = (None,)
+                        else:
+                            factors = [factor for factor in load_factors if factor <= MAX_LOAD[kind]]
+                        for factor in factors:
+                            matrix.append(dict(zip(CASE_FIELDS, (kind, function, distribution,
+                                                                 workload, size, factor))))
+    return matrix
+
+
+def run(maps=MAPS, functions=tuple(FUNCTIONS), distributions=DISTRIBUTIONS, workloads=WORKLOADS,
+        sizes=DEFAULT_SIZES, load_factors=LOAD_FACTORS, budget: float = DEFAULT_BUDGET,
+        repeat: int = DEFAULT_REPEAT, progress: callable = None) -> dict:
+    """
+    Runs every case and returns the results. Each case keeps its median of at least repeat
+    runs (more for cases faster than MIN_TOTAL_SECONDS). progress(record) is called after
+    every case.
+    """
+    timed_out = set()
+    records = []
+    key_cache = {}
+
+    for case in cases(maps, functions, distributions, workloads, sizes, load_factors):
+        record = dict(case, status='ok', operations=None, seconds=None, ns_per_op=None, table_load=None)
+        family = _case_key(case)[:4] + (case['load_factor'],)
+
+        if family in timed_out:
+            record['status'] = 'skipped'
+        else:
+            sets_key = (case['distribution'], case['size'])
+            if sets_key not in key_cache:
+                key_cache.clear()
+                key_cache[sets_key] = key_sets(*sets_key)
+            keys, missing, reads = key_cache[sets_key]
+            function = FUNCTIONS.get(case['function'])
+
+            gc.collect()
+            gc.disable()
+            try:
+                total, runs, started = 0.0, [], perf_counter()
+                while len(runs) < repeat or (total < MIN_TOTAL_SECONDS and len(runs) < MAX_RUNS and
+                                             perf_counter() - started < budget):
+                    deadline = perf_counter() + budget
+                    operations, seconds, load = run_workload(case['workload'], case['map'], function, keys,
+                                                             missing, reads, case['load_factor'], deadline)
+                    total += seconds
+                    runs.append((seconds, operations, load))
+                seconds, operations, load = sorted(runs)[len(runs) // 2]
+                record.update(operations=operations, seconds=seconds, table_load=load,
+                              ns_per_op=seconds * 1e9 / operations)
+            except BenchmarkTimeout:
+                record.update(status='timeout', operations=None, seconds=None, ns_per_op=None, table_load=None)
+                timed_out.add(family)
+            finally:
+                gc.enable()
+
+        records.append(record)
+        if progress is not None:
+            progress(record)
+
+    meta = {'python': sys.version.split()[0], 'platform': platform.platform(),
+            'machine': platform.machine(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'sizes': sorted(sizes), 'budget': budget, 'repeat': repeat}
+    return {'meta': meta, 'results': records}
+
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Returns a list of the cases in results that regressed against baseline: ran more than
+    threshold slower per operation, or timed out where the baseline finished. Each item is
+    the result record plus 'baseline_ns_per_op' and 'change' (the relative slowdown).
+    """
+    previous = {_case_key(record): record for record in baseline['results']}
+    regressions = []
+    for record in results['results']:
+        before = previous.get(_case_key(record))
+        if before is None or before['status'] != 'ok' or record['status'] == 'skipped':
+            continue
+        if record['status'] == 'timeout':
+            change = None
+        else:
+            change = record['ns_per_op'] / before['ns_per_op'] - 1
+            if change <= threshold:
+                continue
+        regressions.append(dict(record, baseline_ns_per_op=before['ns_per_op'], change=change))
+    return regressions
+
+
+def save_results(results: dict, path: str) -> None:
+    """
+    Writes results to a JSON file
+    """
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=1)
+        file.write('\n')
+
+
+def load_results(path: str) -> dict:
+    """
+    Reads results written by save_results()
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nBenchmark runner - example 1")
+    print("----------------------------")
+    results = run(functions=('hash_function_2',), workloads=('read', 'resize'), sizes=(1000,),
+                  load_factors=(0.5,))
+    for record in results['results']:
+        print(record['map'], record['distribution'], record['workload'], record['status'],
+              round(record['ns_per_op']) if record['ns_per_op'] else None)
+    print(compare(results, results))
@@ -0,0 +1,138 @@
+# Course:      CS261 - Data Structures
+# Description: Timed benchmark workloads. Each workload builds a map of one kind ('sc',
+#              'oa' or 'dict'), runs count operations on it and returns the seconds they
+#              took, not counting any setup. Every loop checks a deadline between chunks of
+#              keys and raises BenchmarkTimeout once it has passed, so a case that degrades
+#              badly (such as anagram keys with hash_function_1) can't stall the suite.
+#
+#              insert:  put() every key into a map pre-sized for the target load factor
+#              read:    get() every read of a filled map
+#              miss:    get() keys that are not in a filled map
+#              churn:   remove() an old key and put() a new one, keeping the size constant
+#              resize:  put() every key into a map starting at capacity 11
+
+from time import perf_counter
+
+import hash_map_oa
+import hash_map_sc
+
+
+# Operations between deadline checks
+CHUNK = 4096
+
+# Highest load factor each map keeps before it resizes
+MAX_LOAD = {'sc': 1.0, 'oa': 0.5}
+
+MAPS = ('sc', 'oa', 'dict')
+WORKLOADS = ('insert', 'read', 'miss', 'churn', 'resize')
+
+
+class BenchmarkTimeout(Exception):
+    """
+    Raised when a workload runs past its deadline
+    """
+    pass
+
+
+def _chunks(items: list, deadline: float):
+    """
+    Returns a generator over CHUNK sized slices of items that raises BenchmarkTimeout
+    once the deadline has passed
+    """
+    for start in range(0, len(items), CHUNK):
+        if perf_counter() > deadline:
+            raise BenchmarkTimeout()
+        yield items[start:start + CHUNK]
+
+
+def new_map(kind: str, function: callable, capacity: int):
+    """
+    Returns an empty map of the given kind
+    """
+    if kind == 'sc':
+        return hash_map_sc.HashMap(capacity, function)
+    if kind == 'oa':
+        return hash_map_oa.HashMap(capacity, function)
+    if kind == 'dict':
+        return {}
+    raise ValueError("Unknown map kind " + repr(kind))
+
+
+def capacity_for(kind: str, count: int, load_factor: float) -> int:
+    """
+    Returns the capacity that holds count keys at about the given load factor
+    """
+    if kind == 'dict' or load_factor is None:
+        return 11
+    return max(int(count / load_factor) + 1, 11)
+
+
+def _operations(m) -> tuple:
+    """
+    Returns the put, get and remove methods of the map
+    """
+    if isinstance(m, dict):
+        return m.__setitem__, m.get, lambda key: m.pop(key, None)
+    return m.put, m.get, m.remove
+
+
+def _filled(kind: str, function: callable, keys: list, load_factor: float, deadline: float):
+    """
+    Returns a map of the given kind holding every key, sized for the load factor
+    """
+    m = new_map(kind, function, capacity_for(kind, len(keys), load_factor))
+    put = _operations(m)[0]
+    for chunk in _chunks(keys, deadline):
+        for key in chunk:
+            put(key, key)
+    return m
+
+
+def run_workload(workload: str, kind: str, function: callable, keys: list, missing: list,
+                 reads: list, load_factor: float, deadline: float) -> tuple:
+    """
+    Runs one workload and returns a tuple of the number of operations, the seconds they
+    took and the map's load factor afterwards (None for dict)
+    """
+    if workload in ('insert', 'resize'):
+        capacity = 11 if workload == 'resize' else capacity_for(kind, len(keys), load_factor)
+        m = new_map(kind, function, capacity)
+        put = _operations(m)[0]
+        start = perf_counter()
+        for chunk in _chunks(keys, deadline):
+            for key in chunk:
+                put(key, key)
+        operations = len(keys)
+
+    else:
+        m = _filled(kind, function, keys, load_factor, deadline)
+        put, get, remove = _operations(m)
+        if workload == 'read':
+            start = perf_counter()
+            for chunk in _chunks(reads, deadline):
+                for key in chunk:
+                    get(key)
+            operations = len(reads)
+
+        elif workload == 'miss':
+            start = perf_counter()
+            for chunk in _chunks(missing, deadline):
+                for key in chunk:
+                    get(key)
+            operations = len(missing)
+
+        elif workload == 'churn':
+            pairs = list(zip(keys, missing))
+            start = perf_counter()
+            for chunk in _chunks(pairs, deadline):
+                for old, new in chunk:
+                    remove(old)
+                    put(new, new)
+            operations = 2 * len(pairs)
+
+        else:
+            raise ValueError("Unknown workload " + repr(workload))
+
+    seconds = perf_counter() - start
+    load = None if isinstance(m, dict) else m.table_load()
+    return operations, seconds, load
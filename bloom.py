@@ -0,0 +1,197 @@
+# Course:      CS261 - Data Structures
+# Description: Counting Bloom filter kept in front of a HashMap (SC & OA), behind its
+#              enable_bloom(), disable_bloom() and bloom_stats() methods. While enabled, the
+#              map adds every new key to the filter and removes every removed key from it, so
+#              get() and contains_key() answer a missing key without hashing it with the map's
+#              function or walking a chain (SC) or probe sequence (OA), unless the filter
+#              gives a false positive. The filter is rebuilt, sized for the new capacity,
+#              whenever the table is resized; a map without a filter only tests one attribute.
+#
+#              Every key sets `hashes` of `width` one-byte counters, chosen by double hashing
+#              from Python's hash() of the key, independently of the map's hash function. The
+#              hash is scrambled with mix_hash() first: the high half of an unmixed small int's
+#              hash is 0, which would make every counter index a shifted copy of the first.
+#              Counters stop at MAX_COUNT and are never decremented from there, which can
+#              only leave false positives behind, never false negatives.
+
+import math
+
+from hash_engine import mix_hash
+
+
+# Counters per key the table holds before its next resize, unless told otherwise
+COUNTERS_PER_KEY = 10
+
+# Counter value that sticks
+MAX_COUNT = 255
+
+# Smallest number of counters in a filter
+MIN_COUNTERS = 64
+
+
+class CountingBloomFilter:
+    """
+    Counting Bloom filter of string keys, supporting removes
+    """
+
+    def __init__(self, expected: int, counters_per_key: int = COUNTERS_PER_KEY) -> None:
+        """
+        Initialize new empty filter sized for the expected number of keys
+        """
+        if counters_per_key < 1:
+            raise ValueError("CountingBloomFilter needs at least one counter per key")
+        self._counters_per_key = counters_per_key
+        # Number of hashes that minimizes the false positive rate at the expected load
+        self._hashes = max(1, round(counters_per_key * math.log(2)))
+        self._allocate(expected)
+        self.negatives = 0
+        self.false_positives = 0
+
+    def _allocate(self, expected: int) -> None:
+        """
+        Replaces the counters with zeroed ones sized for the expected number of keys
+        """
+        self._expected = expected
+        self._width = max(expected * self._counters_per_key, MIN_COUNTERS)
+        self._counters = bytearray(self._width)
+        self._keys = 0
+
+    def add(self, key: str) -> None:
+        """
+        Adds the key to the filter
+        """
+        h = mix_hash(hash(key))
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        counters, width = self._counters, self._width
+        for i in range(self._hashes):
+            index = (h1 + i * h2) % width
+            if counters[index] < MAX_COUNT:
+                counters[index] += 1
+        self._keys += 1
+
+    def update(self, keys) -> None:
+        """
+        Adds every given key to the filter
+        """
+        for key in keys:
+            self.add(key)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a key that was added to the filter
+        """
+        h = mix_hash(hash(key))
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        counters, width = self._counters, self._width
+        for i in range(self._hashes):
+            index = (h1 + i * h2) % width
+            if 0 < counters[index] < MAX_COUNT:
+                counters[index] -= 1
+        self._keys -= 1
+
+    def might_contain(self, key: str) -> bool:
+        """
+        Returns False if the key is certainly not in the filter, otherwise returns True
+        """
+        h = mix_hash(hash(key))
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        counters, width = self._counters, self._width
+        for i in range(self._hashes):
+            if not counters[(h1 + i * h2) % width]:
+                self.negatives += 1
+                return False
+        return True
+
+    def record_false_positive(self) -> None:
+        """
+        Counts one key the filter let through that the table didn't hold
+        """
+        self.false_positives += 1
+
+    def clear(self) -> None:
+        """
+        Removes every key. The lookup counters are kept.
+        """
+        self._allocate(self._expected)
+
+    def rebuild(self, keys, expected: int) -> None:
+        """
+        Replaces the contents by the given keys, in counters sized for the expected number of keys
+        """
+        self._allocate(expected)
+        self.update(keys)
+
+    def false_positive_rate(self) -> float:
+        """
+        Returns the fraction of lookups of missing keys the filter let through so far
+        """
+        misses = self.negatives + self.false_positives
+        return self.false_positives / misses if misses else 0.0
+
+    def expected_false_positive_rate(self) -> float:
+        """
+        Returns the false positive rate expected for the number of keys the filter holds
+        """
+        return (1 - math.exp(-self._hashes * self._keys / self._width)) ** self._hashes
+
+    def as_dict(self) -> dict:
+        """
+        Returns the filter's size, load and lookup counters as a dict
+        """
+        return {'keys': self._keys,
+                'counters': self._width,
+                'hashes': self._hashes,
+                'negatives': self.negatives,
+                'false_positives': self.false_positives,
+                'false_positive_rate': self.false_positive_rate(),
+                'expected_false_positive_rate': self.expected_false_positive_rate()}
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nBloom filter - example 1")
+    print("------------------------")
+    import hash_map_oa
+    import hash_map_sc
+    from a6_include import hash_function_2
+
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        m = map_class(11, hash_function_2)
+        m.enable_bloom()
+        for i in range(100):
+            m.put('str' + str(i), i)
+        for i in range(0, 100, 2):
+            m.remove('str' + str(i))
+        found = sum(m.contains_key('str' + str(i)) for i in range(100))
+        missing = sum(m.get('other' + str(i)) is None for i in range(1000))
+        stats = m.bloom_stats()
+        print(map_class.__module__, found, missing, stats['keys'], stats['counters'],
+              round(stats['false_positive_rate'], 4), round(stats['expected_false_positive_rate'], 4))
+
+    print("\n20000 keys, 20000 contains_key() calls for missing keys (us per call)")
+    print("----------------------------------------------------------------------")
+    import random
+    from time import perf_counter
+
+    from hash_engine import crc32_hash
+
+    generator = random.Random(1)
+    keys = ['key%06d' % i for i in range(20000)]
+    # Near misses: same length and characters as the keys, so a weak hash sends them to full buckets
+    missing = ['kez%06d' % generator.randrange(20000) for _ in range(20000)]
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        for function in (hash_function_2, crc32_hash):
+            times = []
+            for enabled in (False, True):
+                m = map_class(11, function)
+                for key in keys:
+                    m.put(key, key)
+                if enabled:
+                    m.enable_bloom()
+                start = perf_counter()
+                found = sum(map(m.contains_key, missing))
+                times.append(round((perf_counter() - start) / len(missing) * 1e6, 1))
+            print(map_class.__module__, function.__name__, 'off', times[0], 'on', times[1], found,
+                  'fp rate', round(m.bloom_stats()['false_positive_rate'], 4))
@@ -0,0 +1,352 @@
+# Course:      CS261 - Data Structures
+# Description: Bounded cache on top of a HashMap (hash_map_oa by default). The cache holds
+#              at most max_entries entries and/or max_bytes bytes, and evicts entries to stay
+#              within those limits. Two eviction policies are available: LRU evicts the entry
+#              used least recently, CLOCK (second chance) sweeps a hand over the entries and
+#              evicts the first one not used since the hand last passed it.
+#
+#              Every map value is a node holding the cached value, and the nodes are also
+#              linked into the policy's list, so each access does O(1) bookkeeping and no
+#              second dict is kept. Evicted entries are removed with the map's own remove(),
+#              which leaves a tombstone (OA) or unlinks the chain node (SC).
+
+import sys
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+import hash_map_oa
+import hash_map_sc
+import hooks
+
+
+# Eviction policies
+LRU = 'lru'
+CLOCK = 'clock'
+
+
+def default_weigher(key: str, value: object) -> int:
+    """
+    Returns the number of bytes an entry counts for against max_bytes
+    """
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class _Node:
+    """
+    Map value: the cached value plus the policy's links and bits
+    """
+    __slots__ = ('key', 'value', 'weight', 'prev', 'next', 'referenced')
+
+    def __init__(self, key: str, value: object, weight: int) -> None:
+        self.key = key
+        self.value = value
+        self.weight = weight
+        self.prev = self.next = self
+        self.referenced = False
+
+
+class _LRUPolicy:
+    """
+    Circular list with a sentinel, most recently used first
+    """
+
+    def __init__(self) -> None:
+        self._sentinel = _Node(None, None, 0)
+
+    def _link_front(self, node: _Node) -> None:
+        head = self._sentinel
+        node.prev, node.next = head, head.next
+        head.next.prev = node
+        head.next = node
+
+    def insert(self, node: _Node) -> None:
+        self._link_front(node)
+
+    def touch(self, node: _Node) -> None:
+        self.remove(node)
+        self._link_front(node)
+
+    def remove(self, node: _Node) -> None:
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def victim(self) -> _Node:
+        return self._sentinel.prev
+
+    def clear(self) -> None:
+        self._sentinel.prev = self._sentinel.next = self._sentinel
+
+
+class _ClockPolicy:
+    """
+    Circular list of the entries with a hand; new entries go just behind the hand
+    """
+
+    def __init__(self) -> None:
+        self._hand = None
+
+    def insert(self, node: _Node) -> None:
+        hand = self._hand
+        if hand is None:
+            node.prev = node.next = node
+            self._hand = node
+            return
+        node.prev, node.next = hand.prev, hand
+        hand.prev.next = node
+        hand.prev = node
+
+    def touch(self, node: _Node) -> None:
+        node.referenced = True
+
+    def remove(self, node: _Node) -> None:
+        if node.next is node:
+            self._hand = None
+            return
+        if self._hand is node:
+            self._hand = node.next
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def victim(self) -> _Node:
+        # Entries used since the hand last passed get a second chance
+        hand = self._hand
+        while hand.referenced:
+            hand.referenced = False
+            hand = hand.next
+        self._hand = hand
+        return hand
+
+    def clear(self) -> None:
+        self._hand = None
+
+
+_POLICIES = {LRU: _LRUPolicy, CLOCK: _ClockPolicy}
+
+
+class BoundedCache:
+    """
+    HashMap with a size limit that evicts entries to stay within it
+    """
+
+    # Event hooks while any are registered (see hooks.py)
+    _hooks = None
+
+    def __init__(self,
+                 max_entries: int = None,
+                 max_bytes: int = None,
+                 policy: str = LRU,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 map_class: type = hash_map_oa.HashMap,
+                 weigher: callable = default_weigher) -> None:
+        """
+        Initialize new cache holding at most max_entries entries and at most max_bytes bytes,
+        as measured by weigher(key, value). At least one limit is required. policy is LRU or
+        CLOCK; the entries are stored in a map_class of the given capacity and hash function.
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError("BoundedCache needs max_entries, max_bytes or both")
+        if policy not in _POLICIES:
+            raise ValueError("Unknown eviction policy " + repr(policy))
+
+        self._map = map_class(capacity, function)
+        self._policy = _POLICIES[policy]()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._weigher = weigher if max_bytes is not None else None
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _over_budget(self) -> bool:
+        """
+        Returns True if the cache holds more than its limits allow
+        """
+        return (self._max_entries is not None and self._map.get_size() > self._max_entries) or \
+            (self._max_bytes is not None and self._bytes > self._max_bytes)
+
+    def _discard(self, node: _Node) -> None:
+        """
+        Removes the node's entry from the map and the policy
+        """
+        self._map.remove(node.key)
+        self._policy.remove(node)
+        self._bytes -= node.weight
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds or replaces the entry for the given key, then evicts entries until the cache is
+        within its limits. An entry weighing more than max_bytes on its own is rejected and
+        leaves the cache unchanged, including any value already cached for the key.
+        """
+        weight = self._weigher(key, value) if self._weigher is not None else 0
+        if self._max_bytes is not None and weight > self._max_bytes:
+            return
+
+        # One probe finds the key's node or adds the new one
+        new = _Node(key, value, weight)
+        node = self._map.setdefault(key, new)
+        if node is not new:
+            self._bytes += weight - node.weight
+            node.value, node.weight = value, weight
+            self._policy.touch(node)
+        else:
+            self._policy.insert(node)
+            self._bytes += weight
+
+        while self._over_budget():
+            victim = self._policy.victim()
+            self._discard(victim)
+            self._evictions += 1
+            if self._hooks is not None:
+                self._hooks.fire(self, 'evict', key=victim.key, value=victim.value)
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value cached for the given key and marks it as used.
+        If the key is not cached, returns default.
+        """
+        node = self._map.get(key)
+        if node is None:
+            self._misses += 1
+            return default
+        self._hits += 1
+        self._policy.touch(node)
+        return node.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is cached, otherwise returns False.
+        Doesn't count as a use of the entry.
+        """
+        return self._map.contains_key(key)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key from the cache. If the key is not cached, does nothing.
+        """
+        node = self._map.get(key)
+        if node is not None:
+            self._discard(node)
+
+    def clear(self) -> None:
+        """
+        Removes every entry. The counters are kept.
+        """
+        self._map.clear()
+        self._policy.clear()
+        self._bytes = 0
+
+    def get_size(self) -> int:
+        """
+        Return number of cached entries
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of the underlying map
+        """
+        return self._map.get_capacity()
+
+    def get_bytes(self) -> int:
+        """
+        Return the total weight of the cached entries (0 without a byte limit)
+        """
+        return self._bytes
+
+    def add_hook(self, event: str, callback: callable) -> None:
+        """
+        Registers callback(cache, event, data) for the evict event (see hooks.py). Hooks
+        for the underlying map's events go on the map itself.
+        """
+        if event != 'evict':
+            raise ValueError("BoundedCache only fires evict hooks")
+        hooks.add_hook(self, event, callback)
+
+    def remove_hook(self, event: str, callback: callable) -> None:
+        """
+        Unregisters a callback added with add_hook()
+        """
+        hooks.remove_hook(self, event, callback)
+
+    def counters(self) -> dict:
+        """
+        Returns a dict of the hit, miss and eviction counts and the hit rate
+        """
+        lookups = self._hits + self._misses
+        return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                'hit_rate': self._hits / lookups if lookups else 0.0}
+
+    def items(self):
+        """
+        Returns a generator over the cached (key, value) pairs
+        """
+        return ((key, node.value) for key, node in self._map.items())
+
+    def keys(self):
+        """
+        Returns a generator over the cached keys
+        """
+        return self._map.keys()
+
+    def values(self):
+        """
+        Returns a generator over the cached values
+        """
+        return (node.value for node in self._map.values())
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array where each index contains a tuple of a cached key/value pair
+        """
+        return DynamicArray(list(self.items()))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nBoundedCache - example 1")
+    print("------------------------")
+    for policy in (LRU, CLOCK):
+        cache = BoundedCache(3, policy=policy, function=hash_function_2)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, key.upper())
+        cache.get('a')
+        cache.put('d', 'D')
+        print(policy, sorted(cache.keys()), cache.get('b'), cache.counters())
+
+    evicted = []
+    cache = BoundedCache(2, function=hash_function_2)
+    cache.add_hook('evict', lambda cache, event, data: evicted.append((data['key'], data['value'])))
+    for key in ('a', 'b', 'c', 'd'):
+        cache.put(key, key.upper())
+    print(evicted)
+
+    print("\nBoundedCache - example 2, byte budget")
+    print("-------------------------------------")
+    cache = BoundedCache(max_bytes=1000, function=hash_function_2, map_class=hash_map_sc.HashMap)
+    for i in range(20):
+        cache.put('str' + str(i), 'x' * (10 * i))
+    print(sorted(cache.keys()), cache.get_bytes(), cache.counters()['evictions'])
+    cache.put('str19', 'x' * 2000)
+    print(cache.get('str19') == 'x' * 190, cache.get_bytes(), cache.counters()['evictions'])
+
+    print("\nZipf workload, 1000 entries out of 100000 keys, 300000 lookups")
+    print("--------------------------------------------------------------")
+    import random
+    from time import perf_counter
+
+    generator = random.Random(1)
+    weights = [1 / rank for rank in range(1, 100001)]
+    requests = ['key' + str(rank) for rank in generator.choices(range(100000), weights, k=300000)]
+    for policy in (LRU, CLOCK):
+        cache = BoundedCache(1000, policy=policy, function=hash)
+        start = perf_counter()
+        for key in requests:
+            if cache.get(key) is None:
+                cache.put(key, key)
+        counters = cache.counters()
+        print(policy, 'hit rate', round(counters['hit_rate'], 3), 'evictions', counters['evictions'],
+              'capacity', cache.get_capacity(), round(perf_counter() - start, 2), 's')
@@ -0,0 +1,119 @@
+# Course:      CS261 - Data Structures
+# Description: Table capacity helpers shared by the HashMaps. Prime capacities are found
+#              without trial division, and are exactly the ones _next_prime()/_is_prime()
+#              would give: below PRIME_TABLE_SIZE they are looked up in a sieve built once
+#              at import time, above it primality is settled by a deterministic
+#              Miller-Rabin test. Power of two capacities are used by the maps that index
+#              with a bit mask.
+
+
+# Capacities below this are looked up in the sieve
+PRIME_TABLE_SIZE = 1 << 16
+
+# Miller-Rabin with these bases is exact for every number below 3.3 * 10^24
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def _sieve(size: int) -> bytearray:
+    """
+    Returns a bytearray where index i is 1 if i is prime, otherwise 0
+    """
+    table = bytearray([1]) * size
+    table[0:2] = b'\x00\x00'
+    factor = 2
+    while factor * factor < size:
+        if table[factor]:
+            table[factor * factor::factor] = bytes(len(range(factor * factor, size, factor)))
+        factor += 1
+    return table
+
+
+_primes = _sieve(PRIME_TABLE_SIZE)
+
+
+def _miller_rabin(number: int) -> bool:
+    """
+    Returns True if the given odd number above the sieve is prime
+    """
+    odd, shifts = number - 1, 0
+    while odd % 2 == 0:
+        odd //= 2
+        shifts += 1
+
+    for witness in _WITNESSES:
+        x = pow(witness, odd, number)
+        if x == 1 or x == number - 1:
+            continue
+        for _ in range(shifts - 1):
+            x = x * x % number
+            if x == number - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def is_prime(capacity: int) -> bool:
+    """
+    Determine if given integer is a prime number and return boolean
+    """
+    if capacity < PRIME_TABLE_SIZE:
+        return capacity >= 0 and _primes[capacity] == 1
+    return capacity % 2 == 1 and _miller_rabin(capacity)
+
+
+def next_prime(capacity: int) -> int:
+    """
+    Returns the smallest odd prime number that is >= capacity, like HashMap._next_prime()
+    """
+    capacity = max(capacity, 3)
+    if capacity < PRIME_TABLE_SIZE:
+        index = _primes.find(1, capacity)
+        if index >= 0:
+            return index
+        capacity = PRIME_TABLE_SIZE
+
+    capacity |= 1
+    while not _miller_rabin(capacity):
+        capacity += 2
+    return capacity
+
+
+def prime_capacity(capacity: int) -> int:
+    """
+    Returns capacity if it is prime, otherwise the next highest prime number
+    """
+    if is_prime(capacity):
+        return capacity
+    return next_prime(capacity)
+
+
+def next_power_of_two(capacity: int) -> int:
+    """
+    Returns the smallest power of two that is >= capacity (and at least 1)
+    """
+    if capacity <= 1:
+        return 1
+    return 1 << (capacity - 1).bit_length()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nCapacity - prime table example 1")
+    print("--------------------------------")
+    from hash_map_sc import HashMap
+
+    m = HashMap(11)
+    result = True
+    for capacity in list(range(0, 5000)) + list(range(PRIME_TABLE_SIZE - 100, PRIME_TABLE_SIZE + 100)) + \
+            list(range(10 ** 9, 10 ** 9 + 100)):
+        result &= is_prime(capacity) == (capacity > 1 and m._is_prime(capacity))
+        result &= next_prime(capacity) == m._next_prime(capacity)
+    print(result, [prime_capacity(capacity) for capacity in (1, 2, 22, 30, 53, 100)])
+    print(next_prime(10 ** 6), next_prime(2 ** 40))
+
+    print("\nCapacity - power of two example 1")
+    print("---------------------------------")
+    print([next_power_of_two(capacity) for capacity in (0, 1, 2, 3, 16, 17, 1000)])
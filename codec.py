@@ -0,0 +1,95 @@
+# Course:      CS261 - Data Structures
+# Description: Compact binary encoding of keys and values, used wherever a HashMap's
+#              contents leave the Python heap (shared memory tables, snapshots). Every
+#              encoded object is one tag byte followed by its payload; None, booleans,
+#              64-bit ints, floats, strings and bytes have their own tags and anything
+#              else is pickled. The length of an encoded object is stored by the caller.
+
+import pickle
+import struct
+
+
+# Tag bytes
+NONE = b'N'
+TRUE = b'T'
+FALSE = b'F'
+INT = b'i'
+BIG_INT = b'I'
+FLOAT = b'f'
+STRING = b's'
+BYTES = b'b'
+PICKLE = b'p'
+
+_INT64 = struct.Struct('<q')
+_DOUBLE = struct.Struct('<d')
+
+
+class CodecException(Exception):
+    """
+    Raised when a buffer doesn't hold a valid encoded object
+    """
+    pass
+
+
+def encode(value: object) -> bytes:
+    """
+    Returns the encoding of the given key or value
+    """
+    kind = type(value)
+    if kind is str:
+        return STRING + value.encode('utf-8', 'surrogatepass')
+    if kind is int:
+        if -(1 << 63) <= value < (1 << 63):
+            return INT + _INT64.pack(value)
+        return BIG_INT + str(value).encode('ascii')
+    if value is None:
+        return NONE
+    if kind is bool:
+        return TRUE if value else FALSE
+    if kind is float:
+        return FLOAT + _DOUBLE.pack(value)
+    if kind is bytes:
+        return BYTES + value
+    return PICKLE + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(data) -> object:
+    """
+    Returns the object encoded in the given bytes or memoryview
+    """
+    if len(data) == 0:
+        raise CodecException("Empty buffer")
+
+    tag = data[0:1]
+    if tag == STRING:
+        return str(data[1:], 'utf-8', 'surrogatepass')
+    if tag == INT:
+        return _INT64.unpack_from(data, 1)[0]
+    if tag == NONE:
+        return None
+    if tag == TRUE:
+        return True
+    if tag == FALSE:
+        return False
+    if tag == FLOAT:
+        return _DOUBLE.unpack_from(data, 1)[0]
+    if tag == BIG_INT:
+        return int(str(data[1:], 'ascii'))
+    if tag == BYTES:
+        return bytes(data[1:])
+    if tag == PICKLE:
+        return pickle.loads(data[1:])
+    raise CodecException("Unknown tag " + repr(bytes(tag)))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nCodec - round trip example 1")
+    print("----------------------------")
+    values = [None, True, False, 0, -5, 2 ** 63 - 1, 2 ** 70, -2 ** 90, 1.5, float('inf'),
+              '', 'key1', 'éü€\ud800', b'\x00\x01', (1, 'a'), [None], {'a': 1}]
+    for value in values:
+        encoded = encode(value)
+        print(repr(value), len(encoded), decode(memoryview(encoded)) == value)
@@ -0,0 +1,376 @@
+# Course:      CS261 - Data Structures
+# Description: Thread-safe HashMap built from segments. Keys are split over a fixed number
+#              of independent HashMaps (SC or OA) by hash % segments, and every segment has
+#              its own lock, so writers to different segments never wait for each other and
+#              a resize only ever holds up its own segment. Reads take no lock: each segment
+#              keeps a version number that writers make odd while they change the segment
+#              (a seqlock). A read that saw an odd version, or a different one afterwards,
+#              overlapped a write and is retried, and after a few tries it takes the lock.
+
+import threading
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+import hash_map_oa
+import hash_map_sc
+
+
+# Number of segments (and locks) unless told otherwise
+SEGMENTS = 16
+
+# Lock-free attempts a read makes before it takes the segment lock
+OPTIMISTIC_READS = 3
+
+
+class ConcurrentHashMap:
+    """
+    HashMap that can be shared by several threads
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 segments: int = SEGMENTS,
+                 map_class: type = hash_map_sc.HashMap) -> None:
+        """
+        Initialize new HashMap split into the given number of segments, each one a map_class
+        (hash_map_sc.HashMap or hash_map_oa.HashMap) with an equal share of the capacity
+        """
+        share = max(-(-capacity // segments), 1)
+        self._segments = [map_class(share, function) for _ in range(segments)]
+        self._locks = [threading.Lock() for _ in range(segments)]
+        self._versions = [0] * segments
+        self._hash_function = function
+
+    def __str__(self) -> str:
+        """
+        Override string method to print every segment
+        """
+        out = ''
+        for index in range(len(self._segments)):
+            with self._locks[index]:
+                out += 'Segment ' + str(index) + ':\n' + str(self._segments[index])
+        return out
+
+    def _segment_index(self, key: str) -> int:
+        """
+        Returns the index of the segment the key belongs in
+        """
+        return self._hash_function(key) % len(self._segments)
+
+    def _write(self, key: str, operation: callable):
+        """
+        Runs operation(segment) on the key's segment under its lock, with the segment
+        version odd for the duration, and returns the result
+        """
+        index = self._segment_index(key)
+        with self._locks[index]:
+            self._versions[index] += 1
+            try:
+                return operation(self._segments[index])
+            finally:
+                self._versions[index] += 1
+
+    def _read(self, key: str, operation: callable):
+        """
+        Runs operation(segment) on the key's segment without locking and returns the result
+        if no write overlapped it. Falls back to the lock after OPTIMISTIC_READS tries.
+        """
+        index = self._segment_index(key)
+        segment, versions = self._segments[index], self._versions
+
+        for _ in range(OPTIMISTIC_READS):
+            before = versions[index]
+            if before % 2 == 1:
+                continue
+            try:
+                result = operation(segment)
+            except Exception:
+                # A read racing a resize can index a table that is being replaced
+                continue
+            if versions[index] == before:
+                return result
+
+        with self._locks[index]:
+            return operation(segment)
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. If the given key already exists in the hash map,
+        its associated value is replaced with the new value.
+        """
+        self._write(key, lambda segment: segment.put(key, value))
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        it is added with the default value, which is returned. Atomic.
+        """
+        return self._write(key, lambda segment: segment.setdefault(key, default))
+
+    def update_with(self, key: str, function: callable, default: object = None) -> object:
+        """
+        Stores function(current value) for the given key, using default as the current value
+        if the key is not in the hash map, and returns the new value. Atomic.
+        """
+        return self._write(key, lambda segment: segment.update_with(key, function, default))
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value of the given key, starting from 0 if the key is not in the
+        hash map, and returns the new value. Atomic.
+        """
+        return self._write(key, lambda segment: segment.increment(key, delta))
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        self._write(key, lambda segment: segment.remove(key))
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, the method returns None.
+        """
+        return self._read(key, lambda segment: segment.get(key))
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        return self._read(key, lambda segment: segment.contains_key(key))
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of every segment to an equal share of new_capacity, one
+        segment at a time
+        """
+        share = max(-(-new_capacity // len(self._segments)), 1)
+        for index in range(len(self._segments)):
+            with self._locks[index]:
+                self._versions[index] += 1
+                try:
+                    self._segments[index].resize_table(share)
+                finally:
+                    self._versions[index] += 1
+
+    def clear(self) -> None:
+        """
+        Clears the contents of every segment, one segment at a time
+        """
+        for index in range(len(self._segments)):
+            with self._locks[index]:
+                self._versions[index] += 1
+                try:
+                    self._segments[index].clear()
+                finally:
+                    self._versions[index] += 1
+
+    def get_size(self) -> int:
+        """
+        Return size of map. Other threads may change it at any moment.
+        """
+        return sum(segment.get_size() for segment in self._segments)
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map, summed over the segments
+        """
+        return sum(segment.get_capacity() for segment in self._segments)
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self.get_size() / self.get_capacity()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets over all segments
+        """
+        count = 0
+        for index in range(len(self._segments)):
+            with self._locks[index]:
+                count += self._segments[index].empty_buckets()
+        return count
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs. Each segment is copied under its
+        lock when the generator reaches it, so every segment is seen in a consistent state.
+        """
+        for index in range(len(self._segments)):
+            with self._locks[index]:
+                pairs = list(self._segments[index].items())
+            yield from pairs
+
+    def keys(self):
+        """
+        Returns a generator over the keys in the hash map
+        """
+        return (key for key, _ in self.items())
+
+    def values(self):
+        """
+        Returns a generator over the values in the hash map
+        """
+        return (value for _, value in self.items())
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array where each index contains a tuple of a key/value pair stored in the hash map.
+        """
+        keyValues = DynamicArray()
+        for pair in self.items():
+            keyValues.append(pair)
+        return keyValues
+
+
+def stress(m: ConcurrentHashMap, threads: int, operations: int) -> bool:
+    """
+    Runs writer threads that increment shared counters and put self-describing entries
+    (value == key) while reader threads check every value they see. The interpreter switches
+    threads as often as it can to provoke races. Returns True if no reader saw a wrong value
+    and every counter adds up.
+    """
+    import sys
+
+    errors = []
+    counters = ['counter' + str(i) for i in range(10)]
+
+    def writer(number: int) -> None:
+        for i in range(operations):
+            m.increment(counters[i % len(counters)])
+            key = 'w' + str(number) + '-' + str(i)
+            m.put(key, key)
+            if i % 3 == 0:
+                m.remove(key)
+
+    def reader(number: int) -> None:
+        for i in range(operations):
+            key = 'w' + str(i % threads) + '-' + str(i)
+            value = m.get(key)
+            if value is not None and value != key:
+                errors.append((key, value))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+        workers += [threading.Thread(target=reader, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    total = sum(m.get(counter) for counter in counters)
+    size = len(counters) + threads * (operations - len(range(0, operations, 3)))
+    return not errors and total == threads * operations and m.get_size() == size
+
+
+def throughput(m, threads: int, operations: int, write_ratio: float = 0.1) -> float:
+    """
+    Runs the given number of threads, each doing operations get() or put() calls (put() for
+    the write_ratio fraction) on the map, and returns the total operations per second
+    """
+    import random
+    from time import perf_counter
+
+    keys = ['key' + str(i) for i in range(10000)]
+    for key in keys:
+        m.put(key, 0)
+
+    def work(seed: int) -> None:
+        generator = random.Random(seed)
+        for _ in range(operations):
+            key = keys[generator.randrange(len(keys))]
+            if generator.random() < write_ratio:
+                m.put(key, seed)
+            else:
+                m.get(key)
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    start = perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * operations / (perf_counter() - start)
+
+
+def worst_read_latency(m, count: int) -> float:
+    """
+    Puts count keys into the map from one thread, so segments keep resizing, while another
+    thread reads keys that are already there. Returns the slowest single get() in seconds.
+    """
+    import gc
+    from time import perf_counter
+
+    keys = ['key' + str(i) for i in range(1000)]
+    for key in keys:
+        m.put(key, key)
+    done = threading.Event()
+    worst = [0.0]
+
+    def write() -> None:
+        for i in range(count):
+            m.put('new' + str(i), i)
+        done.set()
+
+    def read() -> None:
+        i = 0
+        while not done.is_set():
+            start = perf_counter()
+            m.get(keys[i % len(keys)])
+            worst[0] = max(worst[0], perf_counter() - start)
+            i += 1
+
+    gc.disable()
+    try:
+        workers = [threading.Thread(target=write), threading.Thread(target=read)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        gc.enable()
+    return worst[0]
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nConcurrentHashMap - example 1")
+    print("-----------------------------")
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        m = ConcurrentHashMap(11, hash_function_2, 4, map_class)
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+        for i in range(0, 150, 2):
+            m.remove('str' + str(i))
+        result = True
+        for i in range(150):
+            result &= m.get('str' + str(i)) == (i * 100 if i % 2 else None)
+            result &= m.contains_key('str' + str(i)) == (i % 2 == 1)
+        print(result, m.get_size(), m.get_keys_and_values().length(), m.get_capacity())
+
+    print("\nConcurrentHashMap - stress test, 8 writers and 8 readers")
+    print("--------------------------------------------------------")
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        print(map_class.__module__, stress(ConcurrentHashMap(11, hash, map_class=map_class), 8, 3000))
+
+    print("\nThroughput, 90% get / 10% put (operations per second)")
+    print("-----------------------------------------------------")
+    for threads in (1, 4, 8):
+        for segments in (1, SEGMENTS):
+            m = ConcurrentHashMap(11, hash, segments)
+            print(threads, 'threads,', segments, 'segments:', round(throughput(m, threads, 50000)))
+
+    print("\nWorst get() latency while another thread puts 500000 keys (ms)")
+    print("---------------------------------------------------------------")
+    for segments in (1, SEGMENTS):
+        m = ConcurrentHashMap(11, hash, segments)
+        print(segments, 'segments:', round(worst_read_latency(m, 500000) * 1000, 2))
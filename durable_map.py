@@ -0,0 +1,490 @@
+# Course:      CS261 - Data Structures
+# Description: Durable HashMap: wraps a hash_map_sc or hash_map_oa HashMap and records
+#              every change in an append-only write-ahead log next to a snapshot (see
+#              snapshot.py). Changes are appended to a buffer in memory, and a background
+#              thread writes and fsyncs the buffer every commit interval, so one fsync
+#              commits every change made in that interval (group commit). Opening the map
+#              loads the snapshot and replays the log on top of it. Once the log grows past
+#              a limit it is compacted in the background: a new log is started, a snapshot
+#              of the map at that moment is written, and the old log is deleted. An old log
+#              left by a compaction cut short is folded into a new snapshot when the map is
+#              opened, before the next compaction could replace it.
+#
+#              Log format: a header with magic and format version, then one record per
+#              change: CRC-32 of the rest of the record, operation, key length and value
+#              length, followed by the encoded key and value (see codec.py). Replay stops at
+#              the first incomplete or corrupt record, which a crash can leave at the end.
+
+import os
+import struct
+import threading
+import zlib
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from codec import decode, encode
+import hash_map_oa
+import hash_map_sc
+
+
+MAGIC = b'HMWL'
+VERSION = 1
+
+# Operations
+PUT = 1
+REMOVE = 2
+CLEAR = 3
+
+# magic, version
+LOG_HEADER = struct.Struct('<4sH')
+
+# CRC-32 of the rest of a record
+CRC = struct.Struct('<I')
+
+# operation, encoded key length, encoded value length
+OPERATION = struct.Struct('<BII')
+
+RECORD_SIZE = CRC.size + OPERATION.size
+
+# Seconds between group commits unless told otherwise
+COMMIT_INTERVAL = 0.01
+
+# Log size in bytes that starts a background compaction unless told otherwise
+COMPACT_AFTER = 64 << 20
+
+SNAPSHOT_FILE = 'snapshot'
+LOG_FILE = 'log'
+OLD_LOG_FILE = 'log.old'
+
+
+class DurableMapException(Exception):
+    """
+    Raised when a log file can't be replayed
+    """
+    pass
+
+
+def _record(operation: int, key: object = None, value: object = None) -> bytes:
+    """
+    Returns the log record of one change
+    """
+    key, value = encode(key), encode(value)
+    body = OPERATION.pack(operation, len(key), len(value)) + key + value
+    return CRC.pack(zlib.crc32(body)) + body
+
+
+def _replay(m, path: str) -> None:
+    """
+    Applies the records of the log at path to the map and cuts off any incomplete or
+    corrupt records at the end of the log
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < LOG_HEADER.size:
+        # A crash while the log was being created, before any record was written
+        return
+    if LOG_HEADER.unpack_from(data, 0) != (MAGIC, VERSION):
+        raise DurableMapException(path + " is not a version " + str(VERSION) + " HashMap log")
+
+    view = memoryview(data)
+    offset = LOG_HEADER.size
+    while offset + RECORD_SIZE <= len(data):
+        operation, key_length, value_length = OPERATION.unpack_from(data, offset + CRC.size)
+        start = offset + RECORD_SIZE
+        middle = start + key_length
+        end = middle + value_length
+        if end > len(data) or zlib.crc32(view[offset + CRC.size:end]) != CRC.unpack_from(data, offset)[0]:
+            break
+
+        if operation == PUT:
+            m.put(decode(view[start:middle]), decode(view[middle:end]))
+        elif operation == REMOVE:
+            m.remove(decode(view[start:middle]))
+        elif operation == CLEAR:
+            m.clear()
+        offset = end
+
+    view.release()
+    if offset < len(data):
+        with open(path, 'r+b') as file:
+            file.truncate(offset)
+
+
+def _new_log(path: str):
+    """
+    Creates an empty log file at path and returns it open for appending
+    """
+    file = open(path, 'wb')
+    file.write(LOG_HEADER.pack(MAGIC, VERSION))
+    file.flush()
+    os.fsync(file.fileno())
+    return file
+
+
+class DurableHashMap:
+    """
+    HashMap whose contents survive a crash or restart
+    """
+
+    def __init__(self,
+                 directory: str,
+                 map_class: type = hash_map_sc.HashMap,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 commit_interval: float = COMMIT_INTERVAL,
+                 compact_after: int = COMPACT_AFTER) -> None:
+        """
+        Open the map stored in directory, creating it if needed, as a map_class with the given
+        hash function. A new map starts with the given capacity. Changes reach the disk within
+        commit_interval seconds; sync() waits until they have.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._map_class = map_class
+        self._hash_function = function
+        self._commit_interval = commit_interval
+        self._compact_after = compact_after
+
+        # A leftover old log means a compaction was cut short: its snapshot wasn't written,
+        # or was written and the old log wasn't deleted yet. Replaying a log twice is harmless.
+        snapshot_path = self._path(SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            self._map = map_class.load(snapshot_path, function)
+        else:
+            self._map = map_class(capacity, function)
+        for name in (OLD_LOG_FILE, LOG_FILE):
+            if os.path.exists(self._path(name)):
+                _replay(self._map, self._path(name))
+
+        # Finish the cut short compaction before any new write: the snapshot now holds both
+        # logs, so both are deleted, the old one first. A compaction cut short right after
+        # renaming the log leaves no new log behind.
+        if os.path.exists(self._path(OLD_LOG_FILE)):
+            self._write_snapshot(self._map)
+            os.remove(self._path(OLD_LOG_FILE))
+            if os.path.exists(self._path(LOG_FILE)):
+                os.remove(self._path(LOG_FILE))
+            self._sync_directory()
+
+        if os.path.exists(self._path(LOG_FILE)) and os.path.getsize(self._path(LOG_FILE)) >= LOG_HEADER.size:
+            self._log = open(self._path(LOG_FILE), 'ab')
+        else:
+            self._log = _new_log(self._path(LOG_FILE))
+            self._sync_directory()
+        self._log_size = self._log.tell()
+
+        # _lock guards the map and the pending records, _log_lock the log file. A thread
+        # that needs both takes _log_lock first.
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._pending = bytearray()
+        self._compaction = None
+        self._closed = threading.Event()
+        self._committer = threading.Thread(target=self._commit_loop, daemon=True)
+        self._committer.start()
+
+    def _path(self, name: str) -> str:
+        """
+        Returns the path of a file in the map's directory
+        """
+        return os.path.join(self._directory, name)
+
+    def _sync_directory(self) -> None:
+        """
+        Fsyncs the map's directory, so the files created, renamed and deleted in it so far
+        stay that way after a power loss, in the order they were changed
+        """
+        descriptor = os.open(self._directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _write_snapshot(self, m) -> None:
+        """
+        Replaces the snapshot by a snapshot of the given map, once it is on disk
+        """
+        temporary = self._path(SNAPSHOT_FILE + '.tmp')
+        m.save(temporary)
+        with open(temporary, 'rb') as file:
+            os.fsync(file.fileno())
+        os.replace(temporary, self._path(SNAPSHOT_FILE))
+        self._sync_directory()
+
+    def __enter__(self) -> "DurableHashMap":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Commits every change, waits for a running compaction and closes the log.
+        The map can't be used afterwards.
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._committer.join()
+        if self._compaction is not None:
+            self._compaction.join()
+        self.sync()
+        self._log.close()
+
+    # ------------------------------------------------------------------ #
+
+    def _commit_loop(self) -> None:
+        """
+        Background thread: commits the pending records every commit interval and starts a
+        compaction once the log is too big
+        """
+        while not self._closed.wait(self._commit_interval):
+            self.sync()
+            if self._log_size > self._compact_after and \
+                    (self._compaction is None or not self._compaction.is_alive()):
+                self._compaction = threading.Thread(target=self.compact, daemon=True)
+                self._compaction.start()
+
+    def sync(self) -> None:
+        """
+        Writes and fsyncs every change made so far. Returns once they are on disk.
+        """
+        with self._log_lock:
+            with self._lock:
+                pending, self._pending = self._pending, bytearray()
+            if pending:
+                self._log.write(pending)
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log_size += len(pending)
+
+    def compact(self) -> None:
+        """
+        Replaces the snapshot and log by a snapshot of the current contents. The map is only
+        locked while the log is switched and its contents are copied; the snapshot is
+        written while other threads keep using the map.
+        """
+        with self._log_lock:
+            with self._lock:
+                pending, self._pending = self._pending, bytearray()
+                pairs = list(self._map.items())
+                capacity = self._map.get_capacity()
+            self._log.write(pending)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            os.replace(self._path(LOG_FILE), self._path(OLD_LOG_FILE))
+            self._log = _new_log(self._path(LOG_FILE))
+            self._sync_directory()
+            self._log_size = self._log.tell()
+
+        copy = self._map_class(capacity, self._hash_function)
+        copy.put_many([key for key, _ in pairs], [value for _, value in pairs])
+        self._write_snapshot(copy)
+        os.remove(self._path(OLD_LOG_FILE))
+        self._sync_directory()
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. If the given key already exists in the hash map,
+        its associated value is replaced with the new value.
+        """
+        record = _record(PUT, key, value)
+        with self._lock:
+            self._map.put(key, value)
+            self._pending += record
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        it is added with the default value, which is returned.
+        """
+        with self._lock:
+            size = self._map.get_size()
+            value = self._map.setdefault(key, default)
+            if self._map.get_size() != size:
+                self._pending += _record(PUT, key, value)
+            return value
+
+    def update_with(self, key: str, function: callable, default: object = None) -> object:
+        """
+        Replaces the value associated with the given key by function(value) and returns the
+        new value. If the key is not in the hash map, function(default) is added instead.
+        """
+        with self._lock:
+            value = self._map.update_with(key, function, default)
+            self._pending += _record(PUT, key, value)
+            return value
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value associated with the given key and returns the new value.
+        A key that is not in the hash map starts from 0.
+        """
+        with self._lock:
+            value = self._map.increment(key, delta)
+            self._pending += _record(PUT, key, value)
+            return value
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        record = _record(REMOVE, key)
+        with self._lock:
+            self._map.remove(key)
+            self._pending += record
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map
+        """
+        with self._lock:
+            self._map.clear()
+            self._pending += _record(CLEAR)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table. Not logged: capacity only changes the
+        layout, which the next snapshot records.
+        """
+        with self._lock:
+            self._map.resize_table(new_capacity)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, the method returns None.
+        """
+        with self._lock:
+            return self._map.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        with self._lock:
+            return self._map.contains_key(key)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._map.get_capacity()
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self._map.table_load()
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs, copied under the lock when the
+        generator starts
+        """
+        with self._lock:
+            pairs = list(self._map.items())
+        yield from pairs
+
+    def keys(self):
+        """
+        Returns a generator over the keys in the hash map
+        """
+        return (key for key, _ in self.items())
+
+    def values(self):
+        """
+        Returns a generator over the values in the hash map
+        """
+        return (value for _, value in self.items())
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array where each index contains a tuple of a key/value pair stored in the hash map.
+        """
+        return DynamicArray(list(self.items()))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nDurableHashMap - recovery example 1")
+    print("-----------------------------------")
+    import shutil
+    import tempfile
+
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        directory = tempfile.mkdtemp()
+        with DurableHashMap(directory, map_class, 11, hash_function_2) as m:
+            for i in range(150):
+                m.put('str' + str(i), i * 100)
+            m.compact()
+            for i in range(0, 150, 2):
+                m.remove('str' + str(i))
+            m.increment('counter', 5)
+
+        # A crash can leave half a record at the end of the log
+        with open(os.path.join(directory, LOG_FILE), 'ab') as file:
+            file.write(_record(PUT, 'torn', 1)[:-3])
+
+        with DurableHashMap(directory, map_class, 11, hash_function_2) as m:
+            result = all(m.get('str' + str(i)) == (i * 100 if i % 2 else None) for i in range(150))
+            print(result, m.get('counter'), m.contains_key('torn'), m.get_size(), m.get_capacity())
+
+        # A compaction cut short after switching logs: the old log is folded in on open,
+        # so the compaction below can't overwrite it
+        os.replace(os.path.join(directory, LOG_FILE), os.path.join(directory, OLD_LOG_FILE))
+        with open(os.path.join(directory, LOG_FILE), 'wb') as file:
+            file.write(LOG_HEADER.pack(MAGIC, VERSION) + _record(PUT, 'after', 1))
+        with DurableHashMap(directory, map_class, 11, hash_function_2) as m:
+            folded = not os.path.exists(os.path.join(directory, OLD_LOG_FILE))
+            m.put('later', 2)
+            m.compact()
+        with DurableHashMap(directory, map_class, 11, hash_function_2) as m:
+            print(folded, m.get('str1'), m.get('counter'), m.get('after'), m.get('later'), m.get_size())
+
+        # A compaction cut short between renaming the log and creating the new one
+        with DurableHashMap(directory, map_class, 11, hash_function_2) as m:
+            m.put('last', 3)
+        os.replace(os.path.join(directory, LOG_FILE), os.path.join(directory, OLD_LOG_FILE))
+        with DurableHashMap(directory, map_class, 11, hash_function_2) as m:
+            print(sorted(os.listdir(directory)), m.get('last'), m.get('later'), m.get_size())
+        shutil.rmtree(directory)
+
+    print("\nThroughput, 200000 put() with a 10 ms group commit (operations per second)")
+    print("--------------------------------------------------------------------------")
+    from time import perf_counter
+
+    from hash_engine import crc32_hash
+
+    keys = ['key' + str(i) for i in range(200000)]
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        start = perf_counter()
+        m = map_class(11, crc32_hash)
+        for i, key in enumerate(keys):
+            m.put(key, i)
+        memory = len(keys) / (perf_counter() - start)
+
+        directory = tempfile.mkdtemp()
+        start = perf_counter()
+        with DurableHashMap(directory, map_class, 11, crc32_hash) as m:
+            for i, key in enumerate(keys):
+                m.put(key, i)
+        durable = len(keys) / (perf_counter() - start)
+
+        start = perf_counter()
+        with DurableHashMap(directory, map_class, 11, crc32_hash) as m:
+            recovered = m.get('key123456') == 123456
+        print(map_class.__module__, 'in memory', round(memory), 'durable', round(durable),
+              'ratio', round(memory / durable, 2), 'recovery', round(perf_counter() - start, 2), 's',
+              recovered)
+        shutil.rmtree(directory)
@@ -0,0 +1,366 @@
+# Course:      CS261 - Data Structures
+# Description: HashMaps (SC & OA) whose entries can expire. put(key, value, ttl) gives the
+#              entry a deadline ttl seconds away. Expiry is lazy: get(), contains_key() and
+#              the other lookups drop an expired entry when they reach it. Expired entries
+#              that are never looked up again are removed by sweep(), which pops deadlines
+#              off a heap instead of scanning the table, so it only does work for entries
+#              that are due. sweep() can be called from time to time with a bound on the
+#              work it does, or run by a background thread (start_sweeper()).
+#
+#              Deadlines live in their own hash_map_oa HashMap, so entries without a TTL
+#              cost nothing extra and the map's values are stored unchanged. Every method
+#              below takes the map's lock, so the background sweeper can run alongside them.
+
+import heapq
+import threading
+import time
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_engine import to_list
+import hash_map_oa
+import hash_map_sc
+
+
+# Seconds between background sweeps unless told otherwise
+SWEEP_INTERVAL = 1.0
+
+# Expired entries removed by each background sweep unless told otherwise
+SWEEP_BATCH = 1000
+
+
+class ExpiringMixin:
+    """
+    Per-key TTL support for a HashMap class. Must come before the HashMap in the bases.
+    """
+
+    def __init__(self,
+                 capacity: int,
+                 function: callable = hash_function_1,
+                 clock: callable = time.monotonic) -> None:
+        """
+        Initialize new HashMap. Deadlines are measured with clock(), in seconds.
+        """
+        super().__init__(capacity, function)
+        self._clock = clock
+        self._deadlines = hash_map_oa.HashMap(11, function)
+        self._heap = []
+        self._lock = threading.RLock()
+        self._sweeper = None
+        self._stop_sweeper = None
+        self._resizing = False
+
+    def _expire(self, key: str) -> None:
+        """
+        Removes the key's entry if its deadline has passed
+        """
+        if self._deadlines.get_size() == 0:
+            return
+        deadline = self._deadlines.get(key)
+        if deadline is not None and deadline <= self._clock():
+            super().remove(key)
+            self._deadlines.remove(key)
+
+    def _expire_many(self, keys: list) -> None:
+        """
+        Removes the entries of the given keys whose deadline has passed
+        """
+        if self._deadlines.get_size() > 0:
+            for key in keys:
+                self._expire(key)
+
+    def _forget(self, key: str) -> None:
+        """
+        Drops the key's deadline. Its heap item is left behind and skipped when popped.
+        """
+        if self._deadlines.get_size() > 0:
+            self._deadlines.remove(key)
+
+    def _push(self, key: str, deadline: float) -> None:
+        """
+        Records the key's deadline, rebuilding the heap once stale items dominate it
+        """
+        self._deadlines.put(key, deadline)
+        heapq.heappush(self._heap, (deadline, key))
+        if len(self._heap) > 64 and len(self._heap) > 2 * self._deadlines.get_size():
+            self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object, ttl: float = None) -> None:
+        """
+        Updates the key/value pair in the hash map. The entry expires ttl seconds from now,
+        or never if ttl is None. Replacing an entry replaces its TTL too.
+        """
+        with self._lock:
+            super().put(key, value)
+            if self._resizing:
+                # The OA map moves entries to the new table with put(), which keeps their TTLs
+                return
+            if ttl is None:
+                self._forget(key)
+            else:
+                self._push(key, self._clock() + ttl)
+
+    def get_ttl(self, key: str) -> float:
+        """
+        Returns the seconds left before the key's entry expires, or None if the key is not
+        in the hash map or never expires
+        """
+        with self._lock:
+            self._expire(key)
+            deadline = self._deadlines.get(key)
+            return None if deadline is None else deadline - self._clock()
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map or has expired, the method returns None.
+        """
+        with self._lock:
+            self._expire(key)
+            return super().get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map and hasn't expired, otherwise returns False.
+        """
+        with self._lock:
+            self._expire(key)
+            return super().contains_key(key)
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        it is added with the default value, without a TTL, which is returned.
+        """
+        with self._lock:
+            self._expire(key)
+            return super().setdefault(key, default)
+
+    def get_or_insert(self, key: str, factory: callable) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        factory() is called once and its result is added under the key, without a TTL.
+        """
+        with self._lock:
+            self._expire(key)
+            return super().get_or_insert(key, factory)
+
+    def update_with(self, key: str, function: callable, default: object = None) -> object:
+        """
+        Replaces the value associated with the given key by function(value) and returns the
+        new value, keeping the entry's TTL. A missing key gets function(default), without a TTL.
+        """
+        with self._lock:
+            self._expire(key)
+            return super().update_with(key, function, default)
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value associated with the given key and returns the new value,
+        keeping the entry's TTL. A missing key starts from 0, without a TTL.
+        """
+        with self._lock:
+            self._expire(key)
+            return super().increment(key, delta)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        with self._lock:
+            super().remove(key)
+            self._forget(key)
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map, without a TTL
+        """
+        keys = to_list(keys)
+        with self._lock:
+            super().put_many(keys, values)
+            for key in keys if self._deadlines.get_size() > 0 else ():
+                self._forget(key)
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        Keys that are not in the hash map or have expired get None.
+        """
+        keys = to_list(keys)
+        with self._lock:
+            self._expire_many(keys)
+            return super().get_many(keys)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map.
+        """
+        keys = to_list(keys)
+        with self._lock:
+            super().remove_many(keys)
+            for key in keys if self._deadlines.get_size() > 0 else ():
+                self._forget(key)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table
+        """
+        with self._lock:
+            self._resizing = True
+            try:
+                super().resize_table(new_capacity)
+            finally:
+                self._resizing = False
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map
+        """
+        with self._lock:
+            super().clear()
+            self._deadlines.clear()
+            self._heap = []
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs that haven't expired, copied under
+        the lock when the generator starts
+        """
+        if self._resizing:
+            # The SC map streams every entry, expired or not, into the new table
+            yield from super().items()
+            return
+
+        with self._lock:
+            now = self._clock()
+            deadlines = self._deadlines
+            if deadlines.get_size() == 0:
+                pairs = list(super().items())
+            else:
+                pairs = []
+                for key, value in super().items():
+                    deadline = deadlines.get(key)
+                    if deadline is None or deadline > now:
+                        pairs.append((key, value))
+        yield from pairs
+
+    def keys(self):
+        """
+        Returns a generator over the keys that haven't expired
+        """
+        return (key for key, _ in self.items())
+
+    def values(self):
+        """
+        Returns a generator over the values that haven't expired
+        """
+        return (value for _, value in self.items())
+
+    # ------------------------------------------------------------------ #
+
+    def sweep(self, max_items: int = None) -> int:
+        """
+        Removes expired entries, earliest deadline first, stopping after max_items heap items
+        (all due items if None). Returns the number of entries removed.
+        """
+        removed = 0
+        with self._lock:
+            heap, deadlines, now = self._heap, self._deadlines, self._clock()
+            inspected = 0
+            while heap and heap[0][0] <= now and (max_items is None or inspected < max_items):
+                deadline, key = heapq.heappop(heap)
+                inspected += 1
+                # Skip items left behind by a removed key or a newer TTL
+                if deadlines.get(key) == deadline:
+                    super().remove(key)
+                    deadlines.remove(key)
+                    removed += 1
+        return removed
+
+    def start_sweeper(self, interval: float = SWEEP_INTERVAL, max_items: int = SWEEP_BATCH) -> None:
+        """
+        Starts a daemon thread calling sweep(max_items) every interval seconds
+        """
+        if self._sweeper is not None:
+            return
+        self._stop_sweeper = threading.Event()
+
+        def run(stop: threading.Event) -> None:
+            while not stop.wait(interval):
+                self.sweep(max_items)
+
+        self._sweeper = threading.Thread(target=run, args=(self._stop_sweeper,), daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """
+        Stops the background sweeper thread and waits for it to finish
+        """
+        if self._sweeper is not None:
+            self._stop_sweeper.set()
+            self._sweeper.join()
+            self._sweeper = None
+
+
+class ExpiringSCHashMap(ExpiringMixin, hash_map_sc.HashMap):
+    """
+    Separate chaining HashMap with per-key TTLs
+    """
+    pass
+
+
+class ExpiringOAHashMap(ExpiringMixin, hash_map_oa.HashMap):
+    """
+    Open addressing HashMap with per-key TTLs
+    """
+    pass
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nExpiring HashMap - example 1")
+    print("----------------------------")
+    now = [0.0]
+    for map_class in (ExpiringSCHashMap, ExpiringOAHashMap):
+        now[0] = 0.0
+        m = map_class(11, hash_function_2, clock=lambda: now[0])
+        for i in range(20):
+            m.put('session' + str(i), i, ttl=10 + i)
+        m.put('forever', 'x')
+        now[0] = 15.0
+        print(m.get('session0'), m.contains_key('session4'), m.get('session5'), m.get_ttl('session9'),
+              m.get_size())
+        print(m.sweep(), m.get_size(), sorted(m.keys())[:3], m.get_keys_and_values().length())
+
+    print("\nFinding 1000 expired entries among 200000: full scan vs sweep() (ms)")
+    print("--------------------------------------------------------------------")
+    from time import perf_counter
+
+    for map_class in (ExpiringSCHashMap, ExpiringOAHashMap):
+        now[0] = 0.0
+        m = map_class(11, hash, clock=lambda: now[0])
+        for i in range(200000):
+            m.put('key' + str(i), i, ttl=5 if i % 200 == 0 else 3600)
+        now[0] = 10.0
+
+        start = perf_counter()
+        live = m.get_keys_and_values().length()
+        scan = perf_counter() - start
+        start = perf_counter()
+        removed = m.sweep()
+        print(map_class.__name__, 'scan', round(scan * 1000, 1), 'sweep', round((perf_counter() - start) * 1000, 1),
+              live, removed, m.get_size())
+
+    print("\nBackground sweeper")
+    print("------------------")
+    m = ExpiringOAHashMap(11, hash_function_1)
+    for i in range(100):
+        m.put('str' + str(i), i, ttl=0.05)
+    m.start_sweeper(interval=0.02, max_items=10)
+    time.sleep(0.5)
+    m.stop_sweeper()
+    print(m.get_size())
@@ -0,0 +1,241 @@
+# Course:      CS261 - Data Structures
+# Description: Frequency analysis over large inputs: mode(s), frequency and top-k values.
+#              The input (a DynamicArray or any iterable, e.g. a generator of log tokens) is
+#              cut into chunks that worker processes count, each into its own HashMap. The
+#              partial counts come back as (value, count) pairs in first-occurrence order and
+#              are merged, in chunk order, into one FrequencyTable. At most a few chunks per
+#              worker are in flight, so a generator is never read far ahead of the counting.
+#
+#              Merging in chunk order keeps the values in the order they first occur in the
+#              input, so mode() returns the same array as hash_map_sc.find_mode(), and ties
+#              in top_k() go to the value seen first.
+
+from collections import deque
+import heapq
+from itertools import chain, islice
+import multiprocessing
+import os
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+import hash_map_oa
+import hash_map_sc
+
+
+# Values per chunk sent to a worker
+CHUNK_SIZE = 1 << 16
+
+# Chunks queued per worker, bounding how far ahead of the workers the input is read
+CHUNKS_IN_FLIGHT = 2
+
+
+def count_chunk(values: list, map_class: type, function: callable) -> list:
+    """
+    Counts the given values in a map_class and returns the (value, count) pairs in the
+    order the values first occur. Runs in the worker processes.
+    """
+    counts = map_class(11, function)
+    order = []
+    for value in values:
+        if counts.increment(value) == 1:
+            order.append(value)
+    return [(value, counts.get(value)) for value in order]
+
+
+def _chunks(source, chunk_size: int):
+    """
+    Returns a generator over lists of at most chunk_size consecutive values of the source
+    """
+    if isinstance(source, DynamicArray):
+        length = source.length()
+        for start in range(0, length, chunk_size):
+            yield [source.get_at_index(i) for i in range(start, min(start + chunk_size, length))]
+        return
+
+    iterator = iter(source)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+class FrequencyTable:
+    """
+    Count of every distinct value, merged from partial counts
+    """
+
+    def __init__(self, map_class: type = hash_map_sc.HashMap, function: callable = hash_function_1) -> None:
+        """
+        Initialize new empty table storing the counts in a map_class with the given hash function
+        """
+        self._counts = map_class(11, function)
+        self._values = []
+        self._total = 0
+        self._max_frequency = 0
+
+    def merge(self, pairs) -> None:
+        """
+        Adds the given (value, count) pairs to the counts. Values not seen before are
+        ordered after every value already in the table, in the order given.
+        """
+        counts, values = self._counts, self._values
+        max_frequency = self._max_frequency
+        for value, count in pairs:
+            frequency = counts.increment(value, count)
+            if frequency == count:
+                values.append(value)
+            if frequency > max_frequency:
+                max_frequency = frequency
+            self._total += count
+        self._max_frequency = max_frequency
+
+    def get(self, value: object) -> int:
+        """
+        Returns the number of times the value was counted
+        """
+        return self._counts.get(value) or 0
+
+    def get_total(self) -> int:
+        """
+        Return number of values counted
+        """
+        return self._total
+
+    def get_distinct(self) -> int:
+        """
+        Return number of distinct values counted
+        """
+        return len(self._values)
+
+    def mode(self) -> tuple[DynamicArray, int]:
+        """
+        Returns a tuple containing the mode value(s), in first-occurrence order, along with
+        the frequency, like hash_map_sc.find_mode()
+        """
+        counts, frequency = self._counts, self._max_frequency
+        return DynamicArray([value for value in self._values if counts.get(value) == frequency]), frequency
+
+    def top_k(self, k: int) -> DynamicArray:
+        """
+        Returns an array of the (value, count) pairs of the k most frequent values, most
+        frequent first. Values with the same count are ordered by first occurrence.
+        """
+        counts = self._counts
+        ranked = heapq.nlargest(k, enumerate(self._values),
+                                key=lambda pair: (counts.get(pair[1]), -pair[0]))
+        return DynamicArray([(value, counts.get(value)) for _, value in ranked])
+
+
+def count(source,
+          workers: int = None,
+          chunk_size: int = CHUNK_SIZE,
+          map_class: type = hash_map_sc.HashMap,
+          function: callable = hash_function_1) -> FrequencyTable:
+    """
+    Returns a FrequencyTable of the values of the source, a DynamicArray or any iterable.
+    Chunks are counted by a pool of worker processes (one per CPU if workers is None);
+    a source of one chunk, or a single worker, is counted in this process. map_class and
+    function must be picklable.
+    """
+    workers = workers or os.cpu_count() or 1
+    table = FrequencyTable(map_class, function)
+    chunks = _chunks(source, chunk_size)
+
+    first = next(chunks, None)
+    if first is None:
+        return table
+    second = next(chunks, None)
+    if second is None or workers == 1:
+        for chunk in chain((first,), () if second is None else (second,), chunks):
+            table.merge(count_chunk(chunk, map_class, function))
+        return table
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for chunk in chain((first, second), chunks):
+            pending.append(pool.apply_async(count_chunk, (chunk, map_class, function)))
+            # Merge the oldest chunk before reading further ahead
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                table.merge(pending.popleft().get())
+        while pending:
+            table.merge(pending.popleft().get())
+    return table
+
+
+def find_mode(source,
+              workers: int = None,
+              chunk_size: int = CHUNK_SIZE,
+              map_class: type = hash_map_sc.HashMap,
+              function: callable = hash_function_1) -> tuple[DynamicArray, int]:
+    """
+    Returns a tuple containing the mode value(s) of the source along with the frequency
+    (see count())
+    """
+    return count(source, workers, chunk_size, map_class, function).mode()
+
+
+def top_k(source,
+          k: int,
+          workers: int = None,
+          chunk_size: int = CHUNK_SIZE,
+          map_class: type = hash_map_sc.HashMap,
+          function: callable = hash_function_1) -> DynamicArray:
+    """
+    Returns an array of the (value, count) pairs of the k most frequent values of the
+    source (see count() and FrequencyTable.top_k())
+    """
+    return count(source, workers, chunk_size, map_class, function).top_k(k)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nFrequency - example 1, same result as hash_map_sc.find_mode")
+    print("-----------------------------------------------------------")
+    import random
+
+    test_cases = (
+        [],
+        ["apple", "apple", "grape", "melon", "peach"],
+        ["Arch", "Manjaro", "Manjaro", "Mint", "Mint", "Mint", "Ubuntu", "Ubuntu", "Ubuntu"],
+        ["one", "two", "three", "four", "five"],
+        ["2", "4", "2", "6", "8", "4", "1", "3", "4", "5", "7", "3", "3", "2"]
+    )
+    for case in test_cases:
+        da = DynamicArray(case)
+        mode, frequency = find_mode(da, workers=2, chunk_size=4)
+        expected, expected_frequency = hash_map_sc.find_mode(da)
+        print(mode, frequency, str(mode) == str(expected) and frequency == expected_frequency)
+
+    generator = random.Random(1)
+    matches = 0
+    for _ in range(50):
+        da = DynamicArray([str(generator.randrange(30)) for _ in range(generator.randrange(1, 300))])
+        mode, frequency = find_mode(da, workers=1, chunk_size=generator.randrange(1, 50),
+                                    map_class=hash_map_oa.HashMap, function=hash_function_2)
+        expected, expected_frequency = hash_map_sc.find_mode(da)
+        matches += str(mode) == str(expected) and frequency == expected_frequency
+    print(matches, 'of 50 random arrays match')
+
+    print("\nFrequency - example 2, top_k")
+    print("----------------------------")
+    words = "the cat and the dog and the bird saw a cat".split()
+    print(top_k(words, 3))
+    print(top_k(iter(words), 10, chunk_size=3).length())
+
+    print("\n2000000 Zipf tokens (s)")
+    print("-----------------------")
+    from time import perf_counter
+
+    weights = [1 / rank for rank in range(1, 50001)]
+    tokens = ['token' + str(rank) for rank in generator.choices(range(50000), weights, k=2000000)]
+
+    start = perf_counter()
+    mode, frequency = hash_map_sc.find_mode(DynamicArray(tokens[:200000]))
+    print('hash_map_sc.find_mode, first 200000 tokens', round(perf_counter() - start, 2), mode, frequency)
+    for workers in (1, 2, 4):
+        start = perf_counter()
+        table = count((token for token in tokens), workers=workers, function=hash)
+        mode, frequency = table.mode()
+        print('workers', workers, round(perf_counter() - start, 2), mode, frequency, table.get_distinct(),
+              table.top_k(3))
@@ -0,0 +1,289 @@
+# Course:      CS261 - Data Structures
+# Description: Hashing engine shared by both HashMaps (SC & OA). Wraps one of the
+#              hash functions from a6_include with an optional bounded memo of
+#              key -> hash results, and hashes whole batches of keys at once with
+#              NumPy. Every value it returns is identical to the wrapped function,
+#              so bucket layouts built with either one stay valid.
+
+
+from functools import lru_cache
+import zlib
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+
+try:
+    import numpy as np
+except ImportError:     # NumPy is optional, batches fall back to plain Python
+    np = None
+
+
+# Keys are hashed in blocks of this many so the padded code point matrix stays small
+BATCH_SIZE = 4096
+
+# Keys longer than this are hashed one at a time instead of widening the whole block
+MAX_VECTOR_LENGTH = 256
+
+
+def function_id(function: callable) -> int:
+    """
+    Return 1 or 2 if the given function is (or wraps) hash_function_1 or hash_function_2,
+    otherwise 0
+    """
+    function = getattr(function, 'function', function)
+    if function is hash_function_1:
+        return 1
+    if function is hash_function_2:
+        return 2
+    return 0
+
+
+def function_name(function: callable) -> str:
+    """
+    Return the module and qualified name of the given function (or of the function it wraps),
+    e.g. 'a6_include.hash_function_1'. Unlike function_id() it tells custom functions apart.
+    A script's functions are named '__main__.' in worker processes too.
+    """
+    function = getattr(function, 'function', function)
+    module = getattr(function, '__module__', None) or 'builtins'
+    if module == '__mp_main__':
+        module = '__main__'
+    return module + '.' + getattr(function, '__qualname__', type(function).__qualname__)
+
+
+def to_list(keys) -> list:
+    """
+    Return the given keys as a list. Accepts a DynamicArray or any iterable.
+    """
+    if isinstance(keys, list):
+        return keys
+    if isinstance(keys, DynamicArray):
+        return [keys.get_at_index(index) for index in range(keys.length())]
+    return list(keys)
+
+
+def crc32_hash(key: str) -> int:
+    """
+    Return the CRC-32 of the key's UTF-8 bytes. Unlike hash_function_1/2 it spreads similar
+    keys well, and unlike hash() it is the same in every process, so examples and
+    measurements that don't depend on the hash function use it.
+    """
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def largest_put_size(size: int, keys: list, slots: list, contains: callable) -> int:
+    """
+    Return the largest size a map of the given size has when put() checks its load, if put()
+    is called for each key in order. contains(key, slot) tells whether the key, at the
+    given slot (index or hash) of the same position, is already in the map.
+    """
+    added, seen = 0, set()
+    last_added = False
+    for key, slot in zip(keys, slots):
+        last_added = key not in seen and (size == 0 or not contains(key, slot))
+        if last_added:
+            seen.add(key)
+            added += 1
+    # put() checks before it adds, so the last key doesn't count if it was added
+    return size + added - (1 if last_added else 0)
+
+
+def _code_points(keys: list):
+    """
+    Return an (n, length) matrix of the Unicode code points of the given keys, padded
+    with zeros on the right. A zero code point adds nothing to either hash function.
+    """
+    width = max(len(key) for key in keys)
+    if width == 0:
+        return np.zeros((len(keys), 0), dtype=np.uint32)
+    # NumPy stores 'U' strings as UCS4, so the buffer already holds the code points
+    return np.array(keys, dtype='U' + str(width)).view(np.uint32).reshape(len(keys), width)
+
+
+class HashEngine:
+    """
+    Hashes keys for a HashMap, one key at a time or in batches.
+
+    The engine is callable, so it can be passed anywhere a hash function is expected:
+
+        m = HashMap(53, HashEngine(hash_function_1, memo_size=10000))
+    """
+
+    def __init__(self, function: callable = hash_function_1, memo_size: int = 0) -> None:
+        """
+        Initialize the engine for a hash function. If memo_size is positive, up to that
+        many key -> hash results are remembered (least recently used are dropped first).
+        """
+        self.function = getattr(function, 'function', function)
+        self._id = function_id(self.function)
+        self._memo_size = memo_size
+
+        if memo_size > 0:
+            self._hash = lru_cache(maxsize=memo_size)(self.function)
+        else:
+            self._hash = self.function
+
+    def __call__(self, key: str) -> int:
+        """
+        Return the hash of a single key
+        """
+        return self._hash(key)
+
+    def cache_info(self):
+        """
+        Return hit/miss statistics of the memo, or None if memoization is disabled
+        """
+        if self._memo_size > 0:
+            return self._hash.cache_info()
+        return None
+
+    def cache_clear(self) -> None:
+        """
+        Drop every remembered hash
+        """
+        if self._memo_size > 0:
+            self._hash.cache_clear()
+
+    def hash_many(self, keys) -> list:
+        """
+        Return a list with the hash of every given key, in order
+        """
+        keys = to_list(keys)
+        if np is None or self._id == 0 or not keys:
+            return [self._hash(key) for key in keys]
+
+        hashes = []
+        for start in range(0, len(keys), BATCH_SIZE):
+            hashes.extend(self._hash_block(keys[start:start + BATCH_SIZE]).tolist())
+        return hashes
+
+    def indices(self, keys, capacity: int) -> list:
+        """
+        Return a list with the bucket index (hash % capacity) of every given key, in order
+        """
+        keys = to_list(keys)
+        if np is None or self._id == 0 or not keys:
+            return [self._hash(key) % capacity for key in keys]
+
+        indices = []
+        for start in range(0, len(keys), BATCH_SIZE):
+            block = self._hash_block(keys[start:start + BATCH_SIZE])
+            indices.extend((block % capacity).tolist())
+        return indices
+
+    def _hash_block(self, keys: list):
+        """
+        Hash one block of keys with NumPy and return the hashes as an int64 array.
+        Anything that can't be vectorized (non-string or very long keys) is handed
+        to the scalar function.
+        """
+        short, positions = [], []
+        hashes = np.zeros(len(keys), dtype=np.int64)
+        for position, key in enumerate(keys):
+            if type(key) is str and len(key) <= MAX_VECTOR_LENGTH:
+                short.append(key)
+                positions.append(position)
+            else:
+                hashes[position] = self.function(key)
+
+        if short:
+            codes = _code_points(short)
+            if self._id == 1:
+                values = codes.sum(axis=1, dtype=np.int64)
+            else:
+                weights = np.arange(1, codes.shape[1] + 1, dtype=np.int64)
+                values = codes.astype(np.int64) @ weights
+            if len(short) == len(keys):
+                return values
+            hashes[positions] = values
+
+        return hashes
+
+
+def bucket_indices(hashes: list, capacity: int) -> list:
+    """
+    Return a list with hash % capacity for every given hash, computed in one vectorized
+    step when NumPy is available
+    """
+    if np is None or not hashes:
+        return [hash % capacity for hash in hashes]
+    try:
+        return (np.array(hashes, dtype=np.int64) % capacity).tolist()
+    except OverflowError:
+        return [hash % capacity for hash in hashes]
+
+
+MASK_64 = (1 << 64) - 1
+
+
+def mix_hash(hash: int) -> int:
+    """
+    Returns the hash scrambled by the 64-bit finalizer of MurmurHash3, so every input bit
+    affects every output bit. The weak sums of hash_function_1/2 only fill the low bits;
+    mixing them first makes it safe to take an index or fingerprint from any bits.
+    """
+    hash &= MASK_64
+    hash ^= hash >> 33
+    hash = (hash * 0xff51afd7ed558ccd) & MASK_64
+    hash ^= hash >> 33
+    hash = (hash * 0xc4ceb9fe1a85ec53) & MASK_64
+    hash ^= hash >> 33
+    return hash
+
+
+def mix_hashes(hashes):
+    """
+    Returns mix_hash() of every given hash as a NumPy uint64 array
+    """
+    mixed = np.array(hashes, dtype=np.int64).astype(np.uint64)
+    mixed ^= mixed >> np.uint64(33)
+    mixed *= np.uint64(0xff51afd7ed558ccd)
+    mixed ^= mixed >> np.uint64(33)
+    mixed *= np.uint64(0xc4ceb9fe1a85ec53)
+    mixed ^= mixed >> np.uint64(33)
+    return mixed
+
+
+def mask_indices(hashes: list, capacity: int) -> list:
+    """
+    Return a list with mix_hash(hash) & (capacity - 1) for every given hash, for tables
+    with a power of two capacity
+    """
+    mask = capacity - 1
+    if np is None or not hashes:
+        return [mix_hash(hash) & mask for hash in hashes]
+    try:
+        return (mix_hashes(hashes) & np.uint64(mask)).tolist()
+    except OverflowError:
+        return [mix_hash(hash) & mask for hash in hashes]
+
+
+def as_engine(function: callable) -> HashEngine:
+    """
+    Return the given function if it already is a HashEngine, otherwise wrap it in one
+    """
+    if isinstance(function, HashEngine):
+        return function
+    return HashEngine(function)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nHashEngine - hash_many example 1")
+    print("--------------------------------")
+    keys = ['str' + str(i) for i in range(10)] + ['', 'a\x00', 'éü€', 'x' * 300]
+    for function in (hash_function_1, hash_function_2):
+        engine = HashEngine(function)
+        print(engine.hash_many(keys) == [function(key) for key in keys])
+        print(engine.indices(keys, 53) == [function(key) % 53 for key in keys])
+        print(bucket_indices(engine.hash_many(keys), 7) == [function(key) % 7 for key in keys])
+        print(mix_hashes(engine.hash_many(keys)).tolist() == [mix_hash(function(key)) for key in keys])
+        print(mask_indices(engine.hash_many(keys), 64) == [mix_hash(function(key)) % 64 for key in keys])
+
+    print("\nHashEngine - memo example 1")
+    print("---------------------------")
+    engine = HashEngine(hash_function_2, memo_size=2)
+    for key in ('key1', 'key2', 'key1', 'key3', 'key1'):
+        engine(key)
+    print(engine.cache_info())
@@ -6,13 +6,53 @@
 # Description: An implementation of a hash map that utilizes a dynamic array for storage and
 # Open Addressing with Quadratic Probing for collision resolution.
 # Contains methods for put(),resize_table(), table_load(), empty_buckets(), get(), contains_key(), remove(),
-# get_keys_and_values(), clear(), __iter__() and __next__().
+# get_keys_and_values(), keys(), values(), items(), clear(), put_many(), get_many(), remove_many(),
+# setdefault(), get_or_insert(), update_with(), increment(), tombstone_count(), effective_load(),
+# compact(), enable_stats(), disable_stats(), stats(), add_hook(), remove_hook(), enable_bloom(),
+# disable_bloom(), bloom_stats(), save(), load(), __iter__() and iter_range().
+# Iteration is done by HashMapIterator objects.
 
-from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
+from a6_include import (DynamicArray, HashEntry,
                         hash_function_1, hash_function_2)
+import bloom
+from capacity import prime_capacity
+from hash_engine import as_engine, bucket_indices, largest_put_size, to_list
+import hooks
+from map_stats import TableStats, describe
+import snapshot
+
+
+class ConcurrentModificationException(RuntimeError):
+    """
+    Raised by an iterator when its HashMap was structurally changed after the iterator
+    was created
+    """
+    pass
 
 
 class HashMap:
+    # Tombstones currently in the table. Class level defaults, so __init__ stays as provided
+    _tombstones = 0
+
+    # Number of structural changes (entries added or removed, resizes, clears) so far.
+    # Iterators compare it with the count they started with to detect changes.
+    _modcount = 0
+
+    # Compact the table once tombstones fill more than this fraction of it (None disables)
+    tombstone_threshold = 0.25
+
+    # Table health counters while stats are enabled (see map_stats.py)
+    _stats = None
+
+    # Event hooks while any are registered (see hooks.py)
+    _hooks = None
+
+    # Filter of the keys while one is enabled (see bloom.py)
+    _bloom = None
+
+    # How keys are placed in the table, recorded in snapshots (see snapshot.py)
+    _layout = snapshot.MODULO
+
     def __init__(self, capacity: int, function) -> None:
         """
         Initialize new HashMap that uses
@@ -94,6 +134,78 @@ class HashMap:
         its associated value is replaced with the new value. If the given key is not in the hash map,
         a new key/value pair is added.
         """
+        index, entry = self._locate_for_put(key)
+        if entry is not None:
+            entry.value = value
+        else:
+            self._insert_at(index, key, value)
+            self._size += 1
+
+    def _put_at(self, initial: int, key: str, value: object) -> bool:
+        """
+        Puts the key/value pair into the table, probing from the given initial index.
+        Returns True if a new entry was added, False if an existing value was replaced.
+        """
+        index = self._probe_at(initial, key)
+        bucket = self._buckets.get_at_index(index)
+        if bucket is not None and not bucket.is_tombstone:
+            # Key matches key in HashMap, update associated value
+            bucket.value = value
+            return False
+
+        # Set HashEntry at empty position
+        self._insert_at(index, key, value)
+        return True
+
+    def _insert_at(self, index: int, key: str, value: object) -> None:
+        """
+        Sets a new HashEntry at the given empty or tombstone index
+        """
+        bucket = self._buckets.get_at_index(index)
+        if bucket is not None and bucket.is_tombstone:
+            self._tombstones -= 1
+        self._buckets.set_at_index(index, HashEntry(key, value))
+        self._modcount += 1
+        if self._stats is not None:
+            self._stats.record_insert()
+        if self._bloom is not None:
+            self._bloom.add(key)
+
+    def _probe_at(self, initial: int, key: str) -> int:
+        """
+        Probes from the given initial index using quadratic probing and returns the index of
+        the key's active entry. If the key is not in the table, returns the index where put()
+        places it: the first tombstone on the probe sequence, or else the empty slot ending it.
+        """
+        index = initial
+        j = 1
+        free = -1
+        bucket = self._buckets.get_at_index(index)
+        while bucket is not None and j <= self._capacity:
+            if bucket.is_tombstone:
+                if free < 0:
+                    free = index
+            elif bucket.key == key:
+                break
+            index = self._probe(initial, j)
+            j += 1
+            bucket = self._buckets.get_at_index(index)
+        else:
+            if free >= 0 or bucket is not None:
+                index = free
+
+        if self._stats is not None:
+            self._stats.record_probe(j - 1)
+        if self._hooks is not None:
+            self._hooks.probe(self, key, j - 1)
+        return index
+
+    def _locate_for_put(self, key: str) -> tuple:
+        """
+        Resizes the table if put() would, then hashes and probes for the key once. Returns a
+        tuple of the probed index and the key's active entry (None if the key is not in the
+        hash map, in which case the index is where a new entry belongs).
+        """
         # If load factor >=0.5, double capacity
         if self.table_load() >= 0.5:
             new_capacity = self._capacity * 2
@@ -101,29 +213,118 @@ class HashMap:
 
         # Get hash and initial index
         hash = self._hash_function(key)
-        initial = (hash % self._capacity)
+        index = self._probe_at(self._index(hash), key)
+        entry = self._buckets.get_at_index(index)
+        if entry is None or entry.is_tombstone:
+            return index, None
+        return index, entry
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        it is added with the default value, which is returned.
+        """
+        index, entry = self._locate_for_put(key)
+        if entry is not None:
+            return entry.value
+
+        self._insert_at(index, key, default)
+        self._size += 1
+        return default
+
+    def get_or_insert(self, key: str, factory: callable) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        factory() is called once and its result is added under the key and returned.
+        """
+        index, entry = self._locate_for_put(key)
+        if entry is not None:
+            return entry.value
+
+        value = factory()
+        self._insert_at(index, key, value)
+        self._size += 1
+        return value
+
+    def update_with(self, key: str, function: callable, default: object = None) -> object:
+        """
+        Replaces the value associated with the given key by function(value) and returns the
+        new value. If the key is not in the hash map, function(default) is added instead.
+        """
+        index, entry = self._locate_for_put(key)
+        if entry is not None:
+            entry.value = function(entry.value)
+            return entry.value
+
+        value = function(default)
+        self._insert_at(index, key, value)
+        self._size += 1
+        return value
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value associated with the given key and returns the new value.
+        A key that is not in the hash map starts from 0.
+        """
+        index, entry = self._locate_for_put(key)
+        if entry is not None:
+            entry.value += delta
+            return entry.value
+
+        self._insert_at(index, key, delta)
+        self._size += 1
+        return delta
+
+    def _find_at(self, initial: int, key: str) -> tuple:
+        """
+        Returns a tuple of the active entry for the key, probing from the given initial index,
+        or None if the key is not in the table, and the number of probes past the initial one
+        """
+        j = 1
         bucket = self._buckets.get_at_index(initial)
-        # If index is empty, add HashEntry with key and value
-        if bucket is None:
-            self._buckets.set_at_index(initial, HashEntry(key, value))
-        # If index is not empty, probe for empty position using Quadratic probing
+        # Probe past tombstones. A quadratic probe sequence can cycle through full slots,
+        # so stop after capacity probes
+        while bucket is not None and j <= self._capacity:
+            if bucket.key == key and not bucket.is_tombstone:
+                break
+            index = self._probe(initial, j)
+            bucket = self._buckets.get_at_index(index)
+            j += 1
         else:
-            index = initial
-            j = 1
-            while bucket is not None and not bucket.is_tombstone:
-                # If key matches key in HashMap, update associated value
-                if bucket.key == key:
-                    bucket.value = value
-                    if bucket.is_tombstone:
-                        bucket.is_tombstone = False
-                    return
-                index = (initial + j**2) % self._capacity
-                j += 1
-                bucket = self._buckets.get_at_index(index)
-            # Set HashEntry at empty position
-            self._buckets.set_at_index(index, HashEntry(key, value))
+            bucket = None
+        return bucket, j - 1
 
-        self._size += 1
+    def _get_at(self, initial: int, key: str) -> HashEntry:
+        """
+        Returns the active entry for the key, probing from the given initial index,
+        or None if the key is not in the table
+        """
+        bucket, probes = self._find_at(initial, key)
+        if self._stats is not None:
+            self._stats.record_probe(probes)
+        if self._hooks is not None:
+            self._hooks.probe(self, key, probes)
+        return bucket
+
+    def _remove_at(self, initial: int, key: str) -> bool:
+        """
+        Turns the entry for the key into a tombstone, probing from the given initial index.
+        Returns True if an active entry was removed.
+        """
+        j = 1
+        bucket = self._buckets.get_at_index(initial)
+        count = 0
+
+        while bucket is not None and count < self._capacity:
+            count += 1
+            if bucket.key == key and not bucket.is_tombstone:
+                bucket.is_tombstone = True
+                self._modcount += 1
+                return True
+            index = self._probe(initial, j)
+            bucket = self._buckets.get_at_index(index)
+            j += 1
+        return False
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -135,17 +336,31 @@ class HashMap:
             return
 
         # Ensure new capacity is a prime number
-        if not self._is_prime(new_capacity):
-            new_capacity = self._next_prime(new_capacity)
+        new_capacity = self._round_capacity(new_capacity)
 
         # Create a new dynamic array with the new capacity
         new_buckets = DynamicArray()
         for _ in range(new_capacity):
             new_buckets.append(None)
 
+        # Moving the entries counts as the resize, not as lookups and inserts (or slow probes).
+        # The filter is rebuilt afterwards, sized for the new capacity
+        bloom = self._bloom
+        self._bloom = None
+        stats = self._stats
+        if stats is not None:
+            self._stats = None
+            started = stats.start_resize()
+        registry = self._hooks
+        if registry is not None:
+            resize_started = registry.start_resize(self, new_capacity)
+            self._hooks = None
+
         old_buckets, self._buckets = self._buckets, new_buckets
         self._capacity, old_capacity = new_capacity, self._capacity
         self._size = 0
+        self._tombstones = 0
+        self._modcount += 1
 
         # Rehash all non-tombstone entries into the new table
         for index in range(old_capacity):
@@ -154,12 +369,75 @@ class HashMap:
                 # Recalculate the new index for each entry
                 self.put(entry.key, entry.value)
 
+        if bloom is not None:
+            bloom.rebuild(self.keys(), new_capacity // 2)
+            self._bloom = bloom
+        if stats is not None:
+            stats.record_resize(started, old_capacity, new_capacity, self._size)
+            self._stats = stats
+        if registry is not None:
+            self._hooks = registry
+            registry.end_resize(self, resize_started, old_capacity)
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity resize_table() uses for the given one: the capacity itself if it
+        is prime, otherwise the next highest prime number (looked up, not trial divided)
+        """
+        return prime_capacity(capacity)
+
+    def _index(self, hash: int) -> int:
+        """
+        Returns the initial probe index of the given hash
+        """
+        return hash % self._capacity
+
+    def _indices(self, hashes: list) -> list:
+        """
+        Returns the initial probe index of every given hash, as _index() does
+        """
+        return bucket_indices(hashes, self._capacity)
+
+    def _probe(self, initial: int, j: int) -> int:
+        """
+        Returns the j-th index of the quadratic probe sequence starting at the given initial index
+        """
+        return (initial + j ** 2) % self._capacity
+
     def table_load(self) -> float:
         """
         Returns the current hash table load factor
         """
         return self._size / self._capacity
 
+    def tombstone_count(self) -> int:
+        """
+        Returns the number of tombstones in the hash table
+        """
+        return self._tombstones
+
+    def effective_load(self) -> float:
+        """
+        Returns the fraction of the hash table taken by active entries and tombstones,
+        which is what probe sequence lengths depend on
+        """
+        return (self._size + self._tombstones) / self._capacity
+
+    def compact(self) -> None:
+        """
+        Rehashes the active entries into a table of the same capacity, dropping every tombstone
+        """
+        if self._tombstones > 0:
+            self.resize_table(self._capacity)
+
+    def _compact_if_needed(self) -> None:
+        """
+        Compacts the table if tombstones fill more of it than tombstone_threshold allows
+        """
+        if self.tombstone_threshold is not None and \
+                self._tombstones > self.tombstone_threshold * self._capacity:
+            self.compact()
+
     def empty_buckets(self) -> int:
         """
         Returns the number of empty buckets in the HashMap
@@ -178,21 +456,17 @@ class HashMap:
         """
         Returns the value associated with the given key. If the key is not in the hash map, returns None.
         """
-        j = 1
+        bloom = self._bloom
+        if bloom is not None and not bloom.might_contain(key):
+            return None
+
         hash = self._hash_function(key)
-        initial = (hash % self._capacity)
-        bucket = self._buckets.get_at_index(initial)
-        if bucket is None:
+        entry = self._get_at(self._index(hash), key)
+        if entry is None:
+            if bloom is not None:
+                bloom.record_false_positive()
             return None
-        else:
-            while bucket is not None and not bucket.is_tombstone:
-                if bucket.key == key:
-                    if not bucket.is_tombstone:
-                        return bucket.value
-                else:
-                    index = (initial + j**2) % self._capacity
-                    bucket = self._buckets.get_at_index(index)
-                    j += 1
+        return entry.value
 
     def contains_key(self, key: str) -> bool:
         """
@@ -200,93 +474,280 @@ class HashMap:
         """
         if self._size == 0:
             return False
-        j = 1
-        hash = self._hash_function(key)
-        initial = (hash % self._capacity)
-        bucket = self._buckets.get_at_index(initial)
-        if bucket is None:
+        bloom = self._bloom
+        if bloom is not None and not bloom.might_contain(key):
             return False
-        else:
-            while bucket is not None and not bucket.is_tombstone:
-                if bucket.key == key:
-                    if not bucket.is_tombstone:
-                        return True
-                else:
-                    index = (initial + j ** 2) % self._capacity
-                    bucket = self._buckets.get_at_index(index)
-                    j += 1
 
+        hash = self._hash_function(key)
+        if self._get_at(self._index(hash), key) is not None:
+            return True
+        if bloom is not None:
+            bloom.record_false_positive()
         return False
 
-
     def remove(self, key: str) -> None:
         """
         Removes the given key and its associated value from the hash map. If the key is not in the hash map,
         the method does nothing.
         """
-        j = 1
         hash = self._hash_function(key)
-        initial = (hash % self._capacity)
-        bucket = self._buckets.get_at_index(initial)
-        count = 0
-
-        while bucket is not None and count < self._capacity:
-            count += 1
-            if bucket.key == key:
-                if not bucket.is_tombstone:
-                    self._size = (self._size - 1)
-                    bucket.is_tombstone = True
-            else:
-                index = (initial + j ** 2) % self._capacity
-                bucket = self._buckets.get_at_index(index)
-                j += 1
-
+        if self._remove_at(self._index(hash), key):
+            self._size -= 1
+            self._tombstones += 1
+            if self._bloom is not None:
+                self._bloom.remove(key)
+            self._compact_if_needed()
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         Returns a dynamic array where each index contains a tuple of a key/value pair stored in the HashMap
         """
         keyValues = DynamicArray()
-        for index in range(self._capacity):
-            bucket = self._buckets.get_at_index(index)
-            if bucket is not None:
-                if not bucket.is_tombstone:
-                    keyValues.append((bucket.key, bucket.value))
+        for pair in self.items():
+            keyValues.append(pair)
 
         return keyValues
 
+    def _entries(self):
+        """
+        Returns a generator over the active entries, in table order
+        """
+        buckets = self._buckets
+        for index in range(buckets.length()):
+            entry = buckets.get_at_index(index)
+            if entry is not None and not entry.is_tombstone:
+                yield entry
+
+    def keys(self):
+        """
+        Returns a generator over the keys in the hash map. Nothing is copied or changed,
+        so the map must not be changed while the generator is in use.
+        """
+        return (entry.key for entry in self._entries())
+
+    def values(self):
+        """
+        Returns a generator over the values in the hash map
+        """
+        return (entry.value for entry in self._entries())
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs in the hash map
+        """
+        return ((entry.key, entry.value) for entry in self._entries())
+
     def clear(self) -> None:
         """
         Clears the contents of the HashMap, without changing the underlying hash table capacity
         """
+        if self._hooks is not None:
+            self._hooks.fire(self, 'clear', size=self._size, capacity=self._capacity)
+
         # Iterate through the array and assign None to each index
         for bucket in range(self._buckets.length()):
             self._buckets.set_at_index(bucket, None)
 
         self._size = 0
+        self._tombstones = 0
+        self._modcount += 1
+        if self._bloom is not None:
+            self._bloom.clear()
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map. The result is
+        the same as calling put() for each pair in order, but the table is resized at most
+        once and all initial probe indices are computed in a single vectorized step.
+        """
+        keys, values = to_list(keys), to_list(values)
+        if len(keys) != len(values):
+            raise ValueError("put_many() needs the same number of keys and values")
+        if not keys:
+            return
+
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        # put() doubles capacity whenever the load it sees is >= 0.5
+        largest_size = largest_put_size(self._size, keys, self._indices(hashes),
+                                        lambda key, initial: self._get_at(initial, key) is not None)
+        new_capacity = self._capacity
+        while largest_size * 2 >= new_capacity:
+            new_capacity = self._round_capacity(new_capacity * 2)
+        if new_capacity != self._capacity:
+            self.resize_table(new_capacity)
+
+        # Fill the table in one pass
+        for key, value, initial in zip(keys, values, self._indices(hashes)):
+            if self._put_at(initial, key, value):
+                self._size += 1
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        Keys that are not in the hash map get None.
+        """
+        keys = to_list(keys)
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        found = DynamicArray()
+        bloom = self._bloom
+        for key, initial in zip(keys, self._indices(hashes)):
+            if bloom is not None and not bloom.might_contain(key):
+                found.append(None)
+                continue
+            entry = self._get_at(initial, key)
+            if entry is None and bloom is not None:
+                bloom.record_false_positive()
+            found.append(None if entry is None else entry.value)
+
+        return found
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map.
+        Keys that are not in the hash map are ignored.
+        """
+        keys = to_list(keys)
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        for key, initial in zip(keys, self._indices(hashes)):
+            if self._remove_at(initial, key):
+                self._size -= 1
+                self._tombstones += 1
+                if self._bloom is not None:
+                    self._bloom.remove(key)
+                self._compact_if_needed()
+
+    def enable_stats(self) -> None:
+        """
+        Starts recording table health counters, from zero, if they aren't already recorded
+        """
+        if self._stats is None:
+            self._stats = TableStats()
+
+    def disable_stats(self) -> None:
+        """
+        Stops recording table health counters and drops them
+        """
+        self._stats = None
+
+    def stats(self) -> dict:
+        """
+        Returns a dict of table health figures: tombstones, empty slots and the effective
+        load, plus the recorded counters (probe length histogram included) if stats are enabled
+        """
+        empty = 0
+        for index in range(self._capacity):
+            if self._buckets.get_at_index(index) is None:
+                empty += 1
+        return describe(self, {'tombstones': self._tombstones,
+                               'empty_slots': empty,
+                               'effective_load': self.effective_load()})
+
+    def add_hook(self, event: str, callback: callable, threshold: int = None) -> None:
+        """
+        Registers callback(map, event, data) for one of the events in hooks.EVENTS. For
+        slow_probe, a given threshold sets the probe length that fires it.
+        """
+        hooks.add_hook(self, event, callback, threshold)
+
+    def remove_hook(self, event: str, callback: callable) -> None:
+        """
+        Unregisters a callback added with add_hook()
+        """
+        hooks.remove_hook(self, event, callback)
+
+    def enable_bloom(self, counters_per_key: int = bloom.COUNTERS_PER_KEY) -> None:
+        """
+        Puts a counting Bloom filter of the keys in front of get() and contains_key(), if there
+        isn't one already, so most lookups of missing keys skip the probing (see bloom.py)
+        """
+        if self._bloom is None:
+            # The table holds up to half its capacity before the next resize
+            self._bloom = bloom.CountingBloomFilter(self._capacity // 2, counters_per_key)
+            self._bloom.update(self.keys())
+
+    def disable_bloom(self) -> None:
+        """
+        Drops the Bloom filter
+        """
+        self._bloom = None
+
+    def bloom_stats(self) -> dict:
+        """
+        Returns a dict of the Bloom filter's size and its measured and expected false positive
+        rates, or None if no filter is enabled
+        """
+        return None if self._bloom is None else self._bloom.as_dict()
+
+    def save(self, path: str) -> None:
+        """
+        Writes a binary snapshot of the hash map to the given path (see snapshot.py)
+        """
+        snapshot.save_oa(self, path)
+
+    @classmethod
+    def load(cls, path: str, function: callable = None) -> "HashMap":
+        """
+        Returns a hash map restored from a snapshot written by save(), with the same layout.
+        function is only needed if the saved map used a custom hash function.
+        """
+        return snapshot.load_oa(cls, path, function)
+
+    def __iter__(self) -> "HashMapIterator":
+        """
+        Create iterator for loop. Every loop gets its own iterator, so loops over the same
+        map can be nested.
+        """
+        return HashMapIterator(self)
+
+    def iter_range(self, start: int, stop: int) -> "HashMapIterator":
+        """
+        Returns an iterator over the active entries in buckets start up to (not including) stop.
+        Iterators over separate ranges can scan one map side by side.
+        """
+        return HashMapIterator(self, start, stop)
+
+
+class HashMapIterator:
+    """
+    Iterator over the active entries of a HashMap, with its own cursor. Raises
+    ConcurrentModificationException if the map is structurally changed while it is in use;
+    replacing the value of an existing key is allowed.
+    """
 
-    def __iter__(self):
+    def __init__(self, hash_map: HashMap, start: int = 0, stop: int = None) -> None:
         """
-        Create iterator for loop
+        Initialize the iterator over buckets start up to (not including) stop
+        """
+        capacity = hash_map.get_capacity()
+        self._map = hash_map
+        self._index = max(start, 0)
+        self._stop = capacity if stop is None else min(stop, capacity)
+        self._modcount = hash_map._modcount
+
+    def __iter__(self) -> "HashMapIterator":
+        """
+        Return the iterator itself
         """
-        self._index = 0
         return self
 
-    def __next__(self):
+    def __next__(self) -> HashEntry:
         """
-        Obtain next value and advance iterator
+        Obtain next active entry and advance the cursor
         """
-        try:
-            value = self._buckets.get_at_index(self._index)
-            if value is None or value.is_tombstone:
-                while value is None or value.is_tombstone:
-                    self._index += 1
-                    value = self._buckets.get_at_index(self._index)
-        except DynamicArrayException:
-            raise StopIteration
+        if self._map._modcount != self._modcount:
+            raise ConcurrentModificationException("HashMap was changed during iteration")
 
-        self._index += 1
-        return value
+        buckets = self._map._buckets
+        while self._index < self._stop:
+            entry = buckets.get_at_index(self._index)
+            self._index += 1
+            if entry is not None and not entry.is_tombstone:
+                return entry
+
+        raise StopIteration
 
 
 # ------------------- BASIC TESTING ---------------------------------------- #
@@ -0,0 +1,381 @@
+# Course:      CS261 - Data Structures
+# Description: Open Addressing HashMap using Robin Hood hashing. Entries are placed by
+#              linear probing, and each slot stores its entry's probe distance (how far it
+#              sits from its home index). An insert that meets an entry closer to home than
+#              itself takes that slot and carries on with the displaced entry, so probe
+#              distances stay short and even at load factors of 0.85 - 0.9. Unsuccessful
+#              lookups stop as soon as they pass an entry closer to home than the search,
+#              and remove() shifts the following entries back instead of leaving tombstones.
+#              Storage uses parallel arrays like hash_map_oa_soa.
+
+from array import array
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+from capacity import prime_capacity
+
+
+# Probe distance stored in empty slots
+EMPTY = -1
+
+# Load factor put() lets the table reach before doubling it
+LOAD_FACTOR = 0.9
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, load_factor: float = LOAD_FACTOR) -> None:
+        """
+        Initialize new HashMap that uses Robin Hood hashing for collision resolution.
+        The table doubles when an insert would take it above load_factor, which must be
+        between 0 and 1 (both excluded).
+        """
+        if not 0 < load_factor < 1:
+            raise ValueError("Robin Hood HashMap needs 0 < load_factor < 1")
+
+        # capacity must be a prime number
+        self._capacity = self._next_prime(capacity)
+        self._allocate(self._capacity)
+
+        self._hash_function = function
+        self._load_factor = load_factor
+        self._size = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._distances[i] == EMPTY:
+                slot = None
+            else:
+                slot = 'K: ' + str(self._keys[i]) + ' V: ' + str(self._values[i]) + \
+                       ' D: ' + str(self._distances[i])
+            out += str(i) + ': ' + str(slot) + '\n'
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replaces the storage arrays with empty arrays of the given capacity
+        """
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._hashes = array('q', bytes(8 * capacity))
+        self._distances = array('l', [EMPTY]) * capacity
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Returns the slot index holding the key, or -1 if the key is not in the table.
+        The search stops at an empty slot or at an entry closer to home than the search.
+        """
+        distances, hashes, keys = self._distances, self._hashes, self._keys
+        capacity = self._capacity
+        index = hash % capacity
+        distance = 0
+
+        while distances[index] >= distance:
+            if hashes[index] == hash and keys[index] == key:
+                return index
+            index += 1
+            if index == capacity:
+                index = 0
+            distance += 1
+
+        return -1
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Inserts a key that is not in the table, displacing entries that are closer to
+        their home index than the entry being carried
+        """
+        distances, hashes, keys, values = self._distances, self._hashes, self._keys, self._values
+        capacity = self._capacity
+        index = hash % capacity
+        distance = 0
+
+        while True:
+            current = distances[index]
+            if current == EMPTY:
+                keys[index], values[index] = key, value
+                hashes[index], distances[index] = hash, distance
+                return
+
+            if current < distance:
+                # Take from the rich: swap with the entry that is closer to home
+                keys[index], key = key, keys[index]
+                values[index], value = value, values[index]
+                hashes[index], hash = hash, hashes[index]
+                distances[index], distance = distance, current
+
+            index += 1
+            if index == capacity:
+                index = 0
+            distance += 1
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. If the given key already exists in the hash map,
+        its associated value is replaced with the new value. If the given key is not in the hash map,
+        a new key/value pair is added.
+        """
+        hash = self._hash_function(key)
+        index = self._find(key, hash)
+        if index >= 0:
+            self._values[index] = value
+            return
+
+        # Double capacity if the new entry would take the load above the load factor
+        if (self._size + 1) / self._capacity > self._load_factor:
+            self.resize_table(self._capacity * 2)
+
+        self._insert(key, value, hash)
+        self._size += 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table. Entries are reinserted using their
+        cached hashes. If new_capacity is not prime, it is changed to the next highest prime number.
+        """
+        # Check if new capacity is valid
+        if new_capacity < self._size:
+            return
+
+        # Ensure new capacity is a prime number
+        new_capacity = prime_capacity(new_capacity)
+
+        keys, values, hashes, distances = self._keys, self._values, self._hashes, self._distances
+        self._allocate(new_capacity)
+        self._capacity = new_capacity
+
+        for index in range(len(distances)):
+            if distances[index] != EMPTY:
+                self._insert(keys[index], values[index], hashes[index])
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the HashMap
+        """
+        return self._distances.count(EMPTY)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map, returns None.
+        """
+        index = self._find(key, self._hash_function(key))
+        if index < 0:
+            return None
+        return self._values[index]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the HashMap, otherwise returns False
+        """
+        if self._size == 0:
+            return False
+        return self._find(key, self._hash_function(key)) >= 0
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map. The entries after it
+        are shifted back one slot, so no tombstone is left. If the key is not in the hash map,
+        the method does nothing.
+        """
+        index = self._find(key, self._hash_function(key))
+        if index < 0:
+            return
+
+        distances, hashes, keys, values = self._distances, self._hashes, self._keys, self._values
+        capacity = self._capacity
+        following = index + 1 if index + 1 < capacity else 0
+
+        # Shift back every following entry that isn't at its home index
+        while distances[following] > 0:
+            keys[index], values[index] = keys[following], values[following]
+            hashes[index], distances[index] = hashes[following], distances[following] - 1
+            index = following
+            following = index + 1 if index + 1 < capacity else 0
+
+        keys[index], values[index] = None, None
+        distances[index] = EMPTY
+        self._size -= 1
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value pair stored in the HashMap
+        """
+        keyValues = DynamicArray()
+        for index in range(self._capacity):
+            if self._distances[index] != EMPTY:
+                keyValues.append((self._keys[index], self._values[index]))
+
+        return keyValues
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the HashMap, without changing the underlying hash table capacity
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+
+    def __iter__(self):
+        """
+        Return a generator over the entries, as HashEntry objects
+        """
+        for index in range(self._capacity):
+            if self._distances[index] != EMPTY:
+                yield HashEntry(self._keys[index], self._values[index])
+
+    def probe_lengths(self) -> tuple:
+        """
+        Returns a tuple of the average and the maximum number of slots a successful
+        lookup inspects
+        """
+        lengths = [distance + 1 for distance in self._distances if distance != EMPTY]
+        if not lengths:
+            return 0.0, 0
+        return sum(lengths) / len(lengths), max(lengths)
+
+    def miss_probe_length(self, keys) -> float:
+        """
+        Returns the average number of slots inspected by unsuccessful lookups of the given keys
+        """
+        total = 0
+        for key in keys:
+            index = self._hash_function(key) % self._capacity
+            distance = 0
+            while self._distances[index] >= distance:
+                index = (index + 1) % self._capacity
+                distance += 1
+            total += distance + 1
+        return total / len(keys)
+
+
+def quadratic_probe_lengths(m, keys) -> tuple:
+    """
+    Returns a tuple of the average and maximum number of slots a successful lookup inspects
+    in a quadratic probing hash_map_oa.HashMap holding the given keys, and the average for
+    unsuccessful lookups of the same keys with a suffix appended
+    """
+    capacity = m.get_capacity()
+
+    def probes(key: str, stop_at_key: bool) -> int:
+        initial = m._hash_function(key) % capacity
+        index, j = initial, 1
+        entry = m._buckets.get_at_index(index)
+        while entry is not None and not (stop_at_key and entry.key == key) and j <= capacity:
+            index = (initial + j ** 2) % capacity
+            entry = m._buckets.get_at_index(index)
+            j += 1
+        return j
+
+    hits = [probes(key, True) for key in keys]
+    misses = [probes(key + '#', False) for key in keys]
+    return sum(hits) / len(hits), max(hits), sum(misses) / len(misses)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nRobin Hood - put / get / remove example 1")
+    print("-----------------------------------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(50):
+        m.put('str' + str(i), i * 100)
+        if i % 10 == 9:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    result = True
+    for i in range(0, 50, 2):
+        m.remove('str' + str(i))
+    for i in range(50):
+        result &= m.get('str' + str(i)) == (i * 100 if i % 2 else None)
+        result &= m.contains_key('str' + str(i)) == (i % 2 == 1)
+    print(result, m.get_size(), m.get_keys_and_values().length())
+
+    print("\nRobin Hood - iterator example 1")
+    print("-------------------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\nProbe lengths, 100000 keys: average hit / max hit / average miss")
+    print("----------------------------------------------------------------")
+    import random
+    import hash_map_oa
+
+    random.seed(261)
+    keys = [''.join(random.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(16))
+            for _ in range(100000)]
+    # Probe lengths depend on how well the hash spreads keys, so use one that spreads them well
+    quadratic = hash_map_oa.HashMap(11, hash)
+    quadratic.put_many(keys, keys)
+    average, longest, miss = quadratic_probe_lengths(quadratic, keys)
+    print(f"quadratic, load {quadratic.table_load():.2f}:",
+          round(average, 2), longest, round(miss, 2))
+
+    for load_factor in (0.5, 0.85, 0.9):
+        robin_hood = HashMap(11, hash, load_factor)
+        for key in keys:
+            robin_hood.put(key, key)
+        robin_hood.resize_table(int(len(keys) / load_factor))
+        average, longest = robin_hood.probe_lengths()
+        miss = robin_hood.miss_probe_length([key + '#' for key in keys])
+        print(f"Robin Hood, load {robin_hood.table_load():.2f}:",
+              round(average, 2), longest, round(miss, 2))
@@ -0,0 +1,551 @@
+# Course:      CS261 - Data Structures
+# Description: Struct-of-arrays storage backend for the Open Addressing HashMap.
+#              Instead of one HashEntry object per slot, the table is kept in four
+#              parallel arrays: keys, values, cached hashes and a one-byte slot state
+#              (empty / live / tombstone). Collision resolution is the same quadratic
+#              probing as hash_map_oa, and the public methods match hash_map_oa.HashMap.
+#              Cached hashes let resize_table() move entries without calling the hash
+#              function again. Hash values must fit in a signed 64-bit integer.
+
+from array import array
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+from capacity import prime_capacity
+from hash_engine import as_engine, largest_put_size, to_list
+
+
+# Slot states stored in HashMap._states
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+
+class HashMap:
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses quadratic probing for collision
+        resolution and parallel arrays for storage
+        """
+        # capacity must be a prime number
+        self._capacity = self._next_prime(capacity)
+        self._allocate(self._capacity)
+
+        self._hash_function = function
+        self._size = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide the same output as hash_map_oa.HashMap, except that
+        tombstones don't keep their key and value
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._states[i] == EMPTY:
+                slot = None
+            else:
+                slot = HashEntry(self._keys[i], self._values[i])
+                slot.is_tombstone = self._states[i] == TOMBSTONE
+            out += str(i) + ': ' + str(slot) + '\n'
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replaces the storage arrays with empty arrays of the given capacity
+        """
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._hashes = array('q', bytes(8 * capacity))
+        self._states = bytearray(capacity)
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Returns the slot index holding the key, or -1 if the key is not in the table.
+        Tombstones are probed past, an empty slot ends the search.
+        """
+        states, hashes, keys = self._states, self._hashes, self._keys
+        capacity = self._capacity
+        initial = hash % capacity
+        index, j = initial, 1
+
+        while j <= capacity:
+            state = states[index]
+            if state == EMPTY:
+                return -1
+            if state == LIVE and hashes[index] == hash and keys[index] == key:
+                return index
+            index = (initial + j * j) % capacity
+            j += 1
+
+        return -1
+
+    def _slot_for(self, key: str, hash: int) -> int:
+        """
+        Returns the slot index holding the key if it is live, otherwise the index of
+        the first tombstone or empty slot on its probe sequence
+        """
+        states, hashes, keys = self._states, self._hashes, self._keys
+        capacity = self._capacity
+        initial = hash % capacity
+        index, j = initial, 1
+        free = -1
+
+        while j <= capacity:
+            state = states[index]
+            if state == EMPTY:
+                return index if free < 0 else free
+            if state == LIVE:
+                if hashes[index] == hash and keys[index] == key:
+                    return index
+            elif free < 0:
+                free = index
+            index = (initial + j * j) % capacity
+            j += 1
+
+        return free
+
+    def _store(self, index: int, key: str, value: object, hash: int) -> bool:
+        """
+        Stores the key/value pair in the given slot.
+        Returns True if a new entry was added, False if an existing value was replaced.
+        """
+        if self._states[index] == LIVE:
+            self._values[index] = value
+            return False
+
+        self._keys[index] = key
+        self._values[index] = value
+        self._hashes[index] = hash
+        self._states[index] = LIVE
+        return True
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. If the given key already exists in the hash map,
+        its associated value is replaced with the new value. If the given key is not in the hash map,
+        a new key/value pair is added.
+        """
+        # If load factor >=0.5, double capacity
+        if self._size / self._capacity >= 0.5:
+            self.resize_table(self._capacity * 2)
+
+        hash = self._hash_function(key)
+        if self._store(self._slot_for(key, hash), key, value, hash):
+            self._size += 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table. Live entries are moved into the new table
+        using their cached hashes, tombstones are dropped.
+        """
+        # Check if new capacity is valid
+        if new_capacity < self._size:
+            return
+
+        # Ensure new capacity is a prime number
+        new_capacity = prime_capacity(new_capacity)
+
+        # Keep doubling, as putting the entries back one by one would, until the load is below 0.5
+        while (self._size - 1) * 2 >= new_capacity:
+            new_capacity = prime_capacity(new_capacity * 2)
+
+        keys, values, hashes, states = self._keys, self._values, self._hashes, self._states
+        self._allocate(new_capacity)
+        self._capacity = new_capacity
+
+        new_states = self._states
+        for index in range(len(states)):
+            if states[index] != LIVE:
+                continue
+            # Keys are unique and the new table has no tombstones, so take the first empty slot
+            hash = hashes[index]
+            initial = hash % new_capacity
+            slot, j = initial, 1
+            while new_states[slot] != EMPTY:
+                slot = (initial + j * j) % new_capacity
+                j += 1
+            self._store(slot, keys[index], values[index], hash)
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets (empty or tombstone slots) in the HashMap
+        """
+        return self._capacity - self._states.count(LIVE)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map, returns None.
+        """
+        index = self._find(key, self._hash_function(key))
+        if index < 0:
+            return None
+        return self._values[index]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the HashMap, otherwise returns False
+        """
+        if self._size == 0:
+            return False
+        return self._find(key, self._hash_function(key)) >= 0
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map. If the key is not in the hash map,
+        the method does nothing.
+        """
+        index = self._find(key, self._hash_function(key))
+        if index >= 0:
+            self._states[index] = TOMBSTONE
+            self._keys[index] = self._values[index] = None
+            self._size -= 1
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value pair stored in the HashMap
+        """
+        keyValues = DynamicArray()
+        states, keys, values = self._states, self._keys, self._values
+        for index in range(self._capacity):
+            if states[index] == LIVE:
+                keyValues.append((keys[index], values[index]))
+
+        return keyValues
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the HashMap, without changing the underlying hash table capacity
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map. The result is
+        the same as calling put() for each pair in order, but the table is resized at most once.
+        """
+        keys, values = to_list(keys), to_list(values)
+        if len(keys) != len(values):
+            raise ValueError("put_many() needs the same number of keys and values")
+        if not keys:
+            return
+
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        # put() doubles capacity whenever the load it sees is >= 0.5
+        largest_size = largest_put_size(self._size, keys, hashes,
+                                        lambda key, hash: self._find(key, hash) >= 0)
+        new_capacity = self._capacity
+        while largest_size * 2 >= new_capacity:
+            new_capacity = prime_capacity(new_capacity * 2)
+        if new_capacity != self._capacity:
+            self.resize_table(new_capacity)
+
+        for key, value, hash in zip(keys, values, hashes):
+            if self._store(self._slot_for(key, hash), key, value, hash):
+                self._size += 1
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        Keys that are not in the hash map get None.
+        """
+        keys = to_list(keys)
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        found = DynamicArray()
+        for key, hash in zip(keys, hashes):
+            index = self._find(key, hash)
+            found.append(None if index < 0 else self._values[index])
+
+        return found
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map.
+        Keys that are not in the hash map are ignored.
+        """
+        keys = to_list(keys)
+        for key, hash in zip(keys, as_engine(self._hash_function).hash_many(keys)):
+            index = self._find(key, hash)
+            if index >= 0:
+                self._states[index] = TOMBSTONE
+                self._keys[index] = self._values[index] = None
+                self._size -= 1
+
+    def __iter__(self):
+        """
+        Return a generator over the live entries, as HashEntry objects
+        """
+        for index in range(self._capacity):
+            if self._states[index] == LIVE:
+                yield HashEntry(self._keys[index], self._values[index])
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - put example 2")
+    print("-------------------")
+    m = HashMap(41, hash_function_2)
+    for i in range(50):
+        m.put('str' + str(i // 3), i * 100)
+        if i % 10 == 9:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - resize example 1")
+    print("----------------------")
+    m = HashMap(20, hash_function_1)
+    m.put('key1', 10)
+    print(m.get_size(), m.get_capacity(), m.get('key1'), m.contains_key('key1'))
+    m.resize_table(30)
+    print(m.get_size(), m.get_capacity(), m.get('key1'), m.contains_key('key1'))
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(25, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        if m.table_load() > 0.5:
+            print(f"Check that the load factor is acceptable after the call to resize_table().\n"
+                  f"Your load factor is {round(m.table_load(), 2)} and should be less than or equal to 0.5")
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\nPDF - table_load example 1")
+    print("--------------------------")
+    m = HashMap(101, hash_function_1)
+    print(round(m.table_load(), 2))
+    m.put('key1', 10)
+    print(round(m.table_load(), 2))
+    m.put('key2', 20)
+    print(round(m.table_load(), 2))
+    m.put('key1', 30)
+    print(round(m.table_load(), 2))
+
+    print("\nPDF - table_load example 2")
+    print("--------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(50):
+        m.put('key' + str(i), i * 100)
+        if i % 10 == 0:
+            print(round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - empty_buckets example 1")
+    print("-----------------------------")
+    m = HashMap(101, hash_function_1)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key1', 10)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key2', 20)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key1', 30)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key4', 40)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+
+    print("\nPDF - empty_buckets example 2")
+    print("-----------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('key' + str(i), i * 100)
+        if i % 30 == 0:
+            print(m.empty_buckets(), m.get_size(), m.get_capacity())
+
+    print("\nPDF - get example 1")
+    print("-------------------")
+    m = HashMap(31, hash_function_1)
+    print(m.get('key'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+
+    print("\nPDF - get example 2")
+    print("-------------------")
+    m = HashMap(151, hash_function_2)
+    for i in range(200, 300, 7):
+        m.put(str(i), i * 10)
+    print(m.get_size(), m.get_capacity())
+    for i in range(200, 300, 21):
+        print(i, m.get(str(i)), m.get(str(i)) == i * 10)
+        print(i + 1, m.get(str(i + 1)), m.get(str(i + 1)) == (i + 1) * 10)
+
+    print("\nPDF - contains_key example 1")
+    print("----------------------------")
+    m = HashMap(11, hash_function_1)
+    print(m.contains_key('key1'))
+    m.put('key1', 10)
+    m.put('key2', 20)
+    m.put('key3', 30)
+    print(m.contains_key('key1'))
+    print(m.contains_key('key4'))
+    print(m.contains_key('key2'))
+    print(m.contains_key('key3'))
+    m.remove('key3')
+    print(m.contains_key('key3'))
+
+    print("\nPDF - contains_key example 2")
+    print("----------------------------")
+    m = HashMap(79, hash_function_2)
+    keys = [i for i in range(1, 1000, 20)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+    result = True
+    for key in keys:
+        # all inserted keys must be present
+        result &= m.contains_key(str(key))
+        # NOT inserted keys must be absent
+        result &= not m.contains_key(str(key + 1))
+    print(result)
+
+    print("\nPDF - remove example 1")
+    print("----------------------")
+    m = HashMap(53, hash_function_1)
+    print(m.get('key1'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+    m.remove('key1')
+    print(m.get('key1'))
+    m.remove('key4')
+
+    print("\nPDF - get_keys_and_values example 1")
+    print("------------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    print(m.get_keys_and_values())
+
+    m.resize_table(2)
+    print(m.get_keys_and_values())
+
+    m.put('20', '200')
+    m.remove('1')
+    m.resize_table(12)
+    print(m.get_keys_and_values())
+
+    print("\nPDF - clear example 1")
+    print("---------------------")
+    m = HashMap(101, hash_function_1)
+    print(m.get_size(), m.get_capacity())
+    m.put('key1', 10)
+    m.put('key2', 20)
+    m.put('key1', 30)
+    print(m.get_size(), m.get_capacity())
+    m.clear()
+    print(m.get_size(), m.get_capacity())
+
+    print("\nPDF - clear example 2")
+    print("---------------------")
+    m = HashMap(53, hash_function_1)
+    print(m.get_size(), m.get_capacity())
+    m.put('key1', 10)
+    print(m.get_size(), m.get_capacity())
+    m.put('key2', 20)
+    print(m.get_size(), m.get_capacity())
+    m.resize_table(100)
+    print(m.get_size(), m.get_capacity())
+    m.clear()
+    print(m.get_size(), m.get_capacity())
+
+    print("\nPDF - __iter__(), __next__() example 1")
+    print("---------------------")
+    m = HashMap(10, hash_function_1)
+    for i in range(5):
+        m.put(str(i), str(i * 10))
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\nPDF - __iter__(), __next__() example 2")
+    print("---------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\nMemory per entry (bytes, 100000 entries)")
+    print("----------------------------------------")
+    import hash_map_oa
+    from map_stats import memory_per_entry
+
+    print('HashEntry objects:', round(memory_per_entry(hash_map_oa.HashMap), 1))
+    print('parallel arrays  :', round(memory_per_entry(HashMap), 1))
@@ -6,14 +6,33 @@
 # Description: An implementation of a hash map that utilizes a dynamic array for storage and
 # chaining for collision resolution using a singly linked list. Contains methods for put(),
 # resize_table(), table_load(), empty_buckets(), get(), contains_key(), remove(),
-# get_keys_and_values(), clear(), and find_mode().
+# get_keys_and_values(), keys(), values(), items(), clear(), put_many(), get_many(), remove_many(),
+# setdefault(), get_or_insert(), update_with(), increment(), enable_stats(), disable_stats(),
+# stats(), add_hook(), remove_hook(), enable_bloom(), disable_bloom(), bloom_stats(), save(),
+# load() and find_mode().
 
 
 from a6_include import (DynamicArray, LinkedList,
                         hash_function_1, hash_function_2)
+import bloom
+from capacity import prime_capacity
+from hash_engine import as_engine, bucket_indices, largest_put_size, to_list
+import hooks
+from map_stats import TableStats, describe
+import snapshot
 
 
 class HashMap:
+    # Table health counters while stats are enabled (see map_stats.py), event hooks while
+    # any are registered (see hooks.py) and a filter of the keys while one is enabled (see
+    # bloom.py). Class level defaults, so __init__ stays as provided
+    _stats = None
+    _hooks = None
+    _bloom = None
+
+    # How keys are placed in the table, recorded in snapshots (see snapshot.py)
+    _layout = snapshot.MODULO
+
     def __init__(self,
                  capacity: int = 11,
                  function: callable = hash_function_1) -> None:
@@ -96,6 +115,27 @@ class HashMap:
         Updates the key:value pair in the hash map. If the given key already exists in the hash map,
         its associated value is replaced with the new value.
         """
+        bucket, node = self._locate_for_put(key)
+        if node is not None:
+            node.value = value
+        else:
+            # Insert key:value pair in bucket at hash
+            self._add(bucket, key, value)
+
+    def _add(self, bucket: LinkedList, key: str, value: object) -> None:
+        """
+        Inserts a key that is not in the hash map into its bucket
+        """
+        bucket.insert(key, value)
+        self._size += 1
+        if self._bloom is not None:
+            self._bloom.add(key)
+
+    def _locate_for_put(self, key: str) -> tuple:
+        """
+        Resizes the table if put() would, then hashes the key once and returns a tuple of its
+        bucket and its node (None if the key is not in the hash map)
+        """
         # If load factor >=1, double capacity
         if self.table_load() >= 1:
             new_capacity = self._capacity * 2
@@ -103,15 +143,67 @@ class HashMap:
 
         # Get hash and bucket
         hash = self._hash_function(key)
-        index = (hash % self._capacity)
-        bucket = self._buckets.get_at_index(index)
-        if self.contains_key(key):
-            node = bucket.contains(key)
-            node.value = value
-        else:
-            # Insert key:value pair in bucket at hash
-            bucket.insert(key, value)
-            self._size += 1
+        bucket = self._buckets.get_at_index(self._index(hash))
+        node = bucket.contains(key)
+        if self._stats is not None:
+            self._stats.record_probe(bucket.length())
+            if node is None:
+                self._stats.record_insert()
+        if self._hooks is not None:
+            self._hooks.probe(self, key, bucket.length())
+        return bucket, node
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        it is added with the default value, which is returned.
+        """
+        bucket, node = self._locate_for_put(key)
+        if node is not None:
+            return node.value
+
+        self._add(bucket, key, default)
+        return default
+
+    def get_or_insert(self, key: str, factory: callable) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map,
+        factory() is called once and its result is added under the key and returned.
+        """
+        bucket, node = self._locate_for_put(key)
+        if node is not None:
+            return node.value
+
+        value = factory()
+        self._add(bucket, key, value)
+        return value
+
+    def update_with(self, key: str, function: callable, default: object = None) -> object:
+        """
+        Replaces the value associated with the given key by function(value) and returns the
+        new value. If the key is not in the hash map, function(default) is added instead.
+        """
+        bucket, node = self._locate_for_put(key)
+        if node is not None:
+            node.value = function(node.value)
+            return node.value
+
+        value = function(default)
+        self._add(bucket, key, value)
+        return value
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value associated with the given key and returns the new value.
+        A key that is not in the hash map starts from 0.
+        """
+        bucket, node = self._locate_for_put(key)
+        if node is not None:
+            node.value += delta
+            return node.value
+
+        self._add(bucket, key, delta)
+        return delta
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -124,34 +216,59 @@ class HashMap:
             return
 
         # If new_capacity is not prime, change it to the next highest prime number
-        if not self._is_prime(new_capacity):
-            new_capacity = self._next_prime(new_capacity)
+        new_capacity = self._round_capacity(new_capacity)
 
         while (self._size / new_capacity) > 1.0:
-            new_capacity = new_capacity * 2
-            if not self._is_prime(new_capacity):
-                new_capacity = self._next_prime(new_capacity)
+            new_capacity = self._round_capacity(new_capacity * 2)
 
+        if self._stats is not None:
+            started = self._stats.start_resize()
+        registry = self._hooks
+        if registry is not None:
+            resize_started = registry.start_resize(self, new_capacity)
 
         # Create new underlying dynamic array with new_capacity
         da = DynamicArray()
         for _ in range(new_capacity):
             da.append(LinkedList())
 
-        keyValues = self.get_keys_and_values()
-        for val in range(keyValues.length()):
-            pair = keyValues.get_at_index(val)
-            key = pair[0]
-            hash = self._hash_function(key)
-            newIndex = (hash % new_capacity)
-            bucket = da.get_at_index(newIndex)
-            bucket.insert(key, pair[1])
+        # Update hash table and capacity first, so _index() uses the new capacity
+        old_buckets, self._buckets = self._buckets, da
+        old_capacity, self._capacity = self._capacity, new_capacity
+
+        # Stream the pairs straight out of the old buckets instead of copying them first
+        for index in range(old_capacity):
+            for node in old_buckets.get_at_index(index):
+                hash = self._hash_function(node.key)
+                bucket = da.get_at_index(self._index(hash))
+                bucket.insert(node.key, node.value)
 
+        if self._stats is not None:
+            self._stats.record_resize(started, old_capacity, new_capacity, self._size)
+        if self._bloom is not None:
+            self._bloom.rebuild(self.keys(), new_capacity)
+        if registry is not None:
+            registry.end_resize(self, resize_started, old_capacity)
+
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity resize_table() uses for the given one: the capacity itself if it
+        is prime, otherwise the next highest prime number (looked up, not trial divided)
+        """
+        return prime_capacity(capacity)
 
-        # Update hash table and capacity
-        self._buckets = da
-        self._capacity = new_capacity
+    def _index(self, hash: int) -> int:
+        """
+        Returns the bucket index of the given hash
+        """
+        return hash % self._capacity
 
+    def _indices(self, hashes: list) -> list:
+        """
+        Returns the bucket index of every given hash, as _index() does
+        """
+        return bucket_indices(hashes, self._capacity)
 
     def table_load(self) -> float:
         """
@@ -179,12 +296,22 @@ class HashMap:
         Returns the value associated with the given key.
         If the key is not in the hash map, the method returns None.
         """
+        bloom = self._bloom
+        if bloom is not None and not bloom.might_contain(key):
+            return None
+
         hash = self._hash_function(key)
-        index = (hash % self._capacity)
+        index = self._index(hash)
         bucket = self._buckets.get_at_index(index)
+        if self._stats is not None:
+            self._stats.record_probe(bucket.length())
+        if self._hooks is not None:
+            self._hooks.probe(self, key, bucket.length())
 
         value = bucket.contains(key)
         if value is None:
+            if bloom is not None:
+                bloom.record_false_positive()
             return None
 
         return value.value
@@ -194,13 +321,23 @@ class HashMap:
         Returns True if the given key is in the hash map, otherwise returns False.
         An empty hash map does not contain any keys
         """
+        bloom = self._bloom
+        if bloom is not None and not bloom.might_contain(key):
+            return False
+
         hash = self._hash_function(key)
-        index = (hash % self._capacity)
+        index = self._index(hash)
         bucket = self._buckets.get_at_index(index)
+        if self._stats is not None:
+            self._stats.record_probe(bucket.length())
+        if self._hooks is not None:
+            self._hooks.probe(self, key, bucket.length())
 
         if bucket.contains(key):
             return True
         else:
+            if bloom is not None:
+                bloom.record_false_positive()
             return False
 
     def remove(self, key: str) -> None:
@@ -208,40 +345,219 @@ class HashMap:
         Removes the given key and its associated value from the hash map.
         """
         hash = self._hash_function(key)
-        index = (hash % self._capacity)
+        index = self._index(hash)
         bucket = self._buckets.get_at_index(index)
 
         if bucket.remove(key):
             self._size -= 1
+            if self._bloom is not None:
+                self._bloom.remove(key)
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         Returns an array where each index contains a tuple of a key/value pair stored in the hash map.
         """
         keyValues = DynamicArray()
+        for pair in self.items():
+            keyValues.append(pair)
 
-        for index in range(self._capacity):
-            bucket = self._buckets.get_at_index(index)
-            bucket.insert('key', 0)
+        return keyValues
 
-            node = bucket.contains('key')
-            node = node.next
-            while node is not None:
-                keyValues.append((node.key, node.value))
-                node = node.next
-            bucket.remove('key')
+    def _nodes(self):
+        """
+        Returns a generator over the nodes of every bucket, in table order
+        """
+        buckets = self._buckets
+        for index in range(buckets.length()):
+            yield from buckets.get_at_index(index)
 
-        return keyValues
+    def keys(self):
+        """
+        Returns a generator over the keys in the hash map. Nothing is copied or changed,
+        so the map must not be changed while the generator is in use.
+        """
+        return (node.key for node in self._nodes())
+
+    def values(self):
+        """
+        Returns a generator over the values in the hash map
+        """
+        return (node.value for node in self._nodes())
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs in the hash map
+        """
+        return ((node.key, node.value) for node in self._nodes())
 
     def clear(self) -> None:
         """
         Clears the contents of the hash map, does not change the underlying hash table capacity.
         """
+        if self._hooks is not None:
+            self._hooks.fire(self, 'clear', size=self._size, capacity=self._capacity)
+
         # Iterate through the array and assign a blank LinkedList to each index
-        for bucket in range(self._buckets.length() - 1):
+        for bucket in range(self._buckets.length()):
             self._buckets.set_at_index(bucket, LinkedList())
 
         self._size = 0
+        if self._bloom is not None:
+            self._bloom.clear()
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map. The result is
+        the same as calling put() for each pair in order, but the table is resized at most
+        once and all bucket indices are computed in a single vectorized step.
+        """
+        keys, values = to_list(keys), to_list(values)
+        if len(keys) != len(values):
+            raise ValueError("put_many() needs the same number of keys and values")
+        if not keys:
+            return
+
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        # put() doubles capacity whenever the size it sees is >= the capacity
+        largest_size = largest_put_size(self._size, keys, self._indices(hashes),
+                                        lambda key, index: self._buckets.get_at_index(index).contains(key))
+        new_capacity = self._capacity
+        while largest_size >= new_capacity:
+            new_capacity = self._round_capacity(new_capacity * 2)
+        if new_capacity != self._capacity:
+            self.resize_table(new_capacity)
+
+        # Fill the buckets in one pass, recording each probe as _locate_for_put() does
+        stats, hooks = self._stats, self._hooks
+        for key, value, index in zip(keys, values, self._indices(hashes)):
+            bucket = self._buckets.get_at_index(index)
+            node = bucket.contains(key)
+            if stats is not None:
+                stats.record_probe(bucket.length())
+                if node is None:
+                    stats.record_insert()
+            if hooks is not None:
+                hooks.probe(self, key, bucket.length())
+            if node is not None:
+                node.value = value
+            else:
+                self._add(bucket, key, value)
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        Keys that are not in the hash map get None.
+        """
+        keys = to_list(keys)
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        found = DynamicArray()
+        stats, hooks, bloom = self._stats, self._hooks, self._bloom
+        for key, index in zip(keys, self._indices(hashes)):
+            if bloom is not None and not bloom.might_contain(key):
+                found.append(None)
+                continue
+            bucket = self._buckets.get_at_index(index)
+            if stats is not None:
+                stats.record_probe(bucket.length())
+            if hooks is not None:
+                hooks.probe(self, key, bucket.length())
+            node = bucket.contains(key)
+            if node is None and bloom is not None:
+                bloom.record_false_positive()
+            found.append(None if node is None else node.value)
+
+        return found
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map.
+        Keys that are not in the hash map are ignored.
+        """
+        keys = to_list(keys)
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        for key, index in zip(keys, self._indices(hashes)):
+            if self._buckets.get_at_index(index).remove(key):
+                self._size -= 1
+                if self._bloom is not None:
+                    self._bloom.remove(key)
+
+    def enable_stats(self) -> None:
+        """
+        Starts recording table health counters, from zero, if they aren't already recorded
+        """
+        if self._stats is None:
+            self._stats = TableStats()
+
+    def disable_stats(self) -> None:
+        """
+        Stops recording table health counters and drops them
+        """
+        self._stats = None
+
+    def stats(self) -> dict:
+        """
+        Returns a dict of table health figures: the chain length histogram and the number of
+        empty buckets (from a scan of the table), plus the recorded counters if stats are enabled
+        """
+        chains = {}
+        for index in range(self._capacity):
+            length = self._buckets.get_at_index(index).length()
+            chains[length] = chains.get(length, 0) + 1
+        return describe(self, {'chain_lengths': dict(sorted(chains.items())),
+                               'empty_buckets': chains.get(0, 0)})
+
+    def add_hook(self, event: str, callback: callable, threshold: int = None) -> None:
+        """
+        Registers callback(map, event, data) for one of the events in hooks.EVENTS. For
+        slow_probe, a given threshold sets the chain length that fires it.
+        """
+        hooks.add_hook(self, event, callback, threshold)
+
+    def remove_hook(self, event: str, callback: callable) -> None:
+        """
+        Unregisters a callback added with add_hook()
+        """
+        hooks.remove_hook(self, event, callback)
+
+    def enable_bloom(self, counters_per_key: int = bloom.COUNTERS_PER_KEY) -> None:
+        """
+        Puts a counting Bloom filter of the keys in front of get() and contains_key(), if there
+        isn't one already, so most lookups of missing keys skip the table (see bloom.py)
+        """
+        if self._bloom is None:
+            # At most one key per bucket before the next resize
+            self._bloom = bloom.CountingBloomFilter(self._capacity, counters_per_key)
+            self._bloom.update(self.keys())
+
+    def disable_bloom(self) -> None:
+        """
+        Drops the Bloom filter
+        """
+        self._bloom = None
+
+    def bloom_stats(self) -> dict:
+        """
+        Returns a dict of the Bloom filter's size and its measured and expected false positive
+        rates, or None if no filter is enabled
+        """
+        return None if self._bloom is None else self._bloom.as_dict()
+
+    def save(self, path: str) -> None:
+        """
+        Writes a binary snapshot of the hash map to the given path (see snapshot.py)
+        """
+        snapshot.save_sc(self, path)
+
+    @classmethod
+    def load(cls, path: str, function: callable = None) -> "HashMap":
+        """
+        Returns a hash map restored from a snapshot written by save(), with the same layout.
+        function is only needed if the saved map used a custom hash function.
+        """
+        return snapshot.load_sc(cls, path, function)
 
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     """
@@ -251,10 +567,7 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
 
     max_frequency = 0
     for i in range(da.length()):
-        value = da.get_at_index(i)
-        frequency = map.get(value) or 0
-        frequency += 1
-        map.put(value, frequency)
+        frequency = map.increment(da.get_at_index(i))
 
         if frequency > max_frequency:
             max_frequency = frequency
@@ -265,15 +578,9 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     for i in range(da.length()):
         value = da.get_at_index(i)
         if map.get(value) == max_frequency:
-            # Check if value is already in mode_array
-            already_in_array = False
-            for j in range(mode_array.length()):
-                if mode_array.get_at_index(j) == value:
-                    already_in_array = True
-                    break
-
-            if not already_in_array:
-                mode_array.append(value)
+            mode_array.append(value)
+            # Drop the counted value so its later occurrences aren't added again
+            map.remove(value)
 
     return mode_array, max_frequency
 
@@ -0,0 +1,493 @@
+# Course:      CS261 - Data Structures
+# Description: Separate Chaining HashMap with array-backed bucket chains. Each bucket is
+#              either None (empty buckets cost nothing) or a pair of small contiguous
+#              Python lists holding that bucket's keys and values, so lookups scan a list
+#              instead of following SLNode.next pointers, and __init__/resize_table only
+#              allocate storage for buckets that are actually used. The public methods and
+#              the order entries are reported in match hash_map_sc.HashMap: the newest entry
+#              of a bucket is its head, and it is kept at the end of the bucket's lists.
+
+from a6_include import (DynamicArray,
+                        hash_function_1, hash_function_2)
+from capacity import prime_capacity
+from hash_engine import as_engine, bucket_indices, largest_put_size, to_list
+
+
+class HashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1) -> None:
+        """
+        Initialize new HashMap that uses separate chaining with
+        array-backed buckets for collision resolution
+        """
+        # capacity must be a prime number
+        self._capacity = self._next_prime(capacity)
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+
+        self._hash_function = function
+        self._size = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide the same output as hash_map_sc.HashMap
+        """
+        out = ''
+        for i in range(self._capacity):
+            keys, values = self._keys[i], self._values[i]
+            if keys is None:
+                chain = 'SLL []'
+            else:
+                nodes = ['(' + str(keys[j]) + ': ' + str(values[j]) + ')'
+                         for j in range(len(keys) - 1, -1, -1)]
+                chain = 'SLL [' + ' -> '.join(nodes) + ']'
+            out += str(i) + ': ' + chain + '\n'
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number and the find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _put_at(self, index: int, key: str, value: object) -> bool:
+        """
+        Puts the key/value pair into the bucket at the given index.
+        Returns True if a new entry was added, False if an existing value was replaced.
+        """
+        keys = self._keys[index]
+        if keys is None:
+            self._keys[index] = [key]
+            self._values[index] = [value]
+            return True
+
+        try:
+            self._values[index][keys.index(key)] = value
+            return False
+        except ValueError:
+            keys.append(key)
+            self._values[index].append(value)
+            return True
+
+    def _get_at(self, index: int, key: str) -> object:
+        """
+        Returns the value for the key in the bucket at the given index, or None if the
+        key is not in that bucket
+        """
+        keys = self._keys[index]
+        if keys is None:
+            return None
+        try:
+            return self._values[index][keys.index(key)]
+        except ValueError:
+            return None
+
+    def _remove_at(self, index: int, key: str) -> bool:
+        """
+        Removes the key from the bucket at the given index, releasing the bucket when it
+        becomes empty. Returns True if the key was found.
+        """
+        keys = self._keys[index]
+        if keys is None:
+            return False
+        try:
+            position = keys.index(key)
+        except ValueError:
+            return False
+
+        if len(keys) == 1:
+            self._keys[index] = None
+            self._values[index] = None
+        else:
+            del keys[position]
+            del self._values[index][position]
+        return True
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key:value pair in the hash map. If the given key already exists in the hash map,
+        its associated value is replaced with the new value.
+        """
+        # If load factor >=1, double capacity
+        if self._size >= self._capacity:
+            self.resize_table(self._capacity * 2)
+
+        if self._put_at(self._hash_function(key) % self._capacity, key, value):
+            self._size += 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table. All existing key/value pairs are put into the new
+        table by rehashing the keys. If new_capacity is not prime, it is changed to the next
+        highest prime number.
+        """
+        # If new_capacity < 1, do nothing
+        if new_capacity < 1:
+            return
+
+        # If new_capacity is not prime, change it to the next highest prime number
+        new_capacity = prime_capacity(new_capacity)
+
+        while (self._size / new_capacity) > 1.0:
+            new_capacity = prime_capacity(new_capacity * 2)
+
+        new_keys = [None] * new_capacity
+        new_values = [None] * new_capacity
+        hash_function = self._hash_function
+
+        # Walk every bucket from head to tail, making each entry the head of its new bucket
+        for old_keys, old_values in zip(self._keys, self._values):
+            if old_keys is None:
+                continue
+            for position in range(len(old_keys) - 1, -1, -1):
+                key = old_keys[position]
+                index = hash_function(key) % new_capacity
+                if new_keys[index] is None:
+                    new_keys[index] = [key]
+                    new_values[index] = [old_values[position]]
+                else:
+                    new_keys[index].append(key)
+                    new_values[index].append(old_values[position])
+
+        self._keys, self._values = new_keys, new_values
+        self._capacity = new_capacity
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return self._keys.count(None)
+
+    def get(self, key: str):
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, the method returns None.
+        """
+        return self._get_at(self._hash_function(key) % self._capacity, key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        An empty hash map does not contain any keys
+        """
+        keys = self._keys[self._hash_function(key) % self._capacity]
+        return keys is not None and key in keys
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        if self._remove_at(self._hash_function(key) % self._capacity, key):
+            self._size -= 1
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array where each index contains a tuple of a key/value pair stored in the hash map.
+        """
+        keyValues = DynamicArray()
+        for keys, values in zip(self._keys, self._values):
+            if keys is not None:
+                for position in range(len(keys) - 1, -1, -1):
+                    keyValues.append((keys[position], values[position]))
+
+        return keyValues
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map, does not change the underlying hash table capacity.
+        """
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._size = 0
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map. The result is
+        the same as calling put() for each pair in order, but the table is resized at most
+        once and all bucket indices are computed in a single vectorized step.
+        """
+        keys, values = to_list(keys), to_list(values)
+        if len(keys) != len(values):
+            raise ValueError("put_many() needs the same number of keys and values")
+        if not keys:
+            return
+
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        # put() doubles capacity whenever the size it sees is >= the capacity
+        largest_size = largest_put_size(self._size, keys, bucket_indices(hashes, self._capacity),
+                                        lambda key, index: self._keys[index] is not None
+                                        and key in self._keys[index])
+        new_capacity = self._capacity
+        while largest_size >= new_capacity:
+            new_capacity = prime_capacity(new_capacity * 2)
+        if new_capacity != self._capacity:
+            self.resize_table(new_capacity)
+
+        for key, value, index in zip(keys, values, bucket_indices(hashes, self._capacity)):
+            if self._put_at(index, key, value):
+                self._size += 1
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        Keys that are not in the hash map get None.
+        """
+        keys = to_list(keys)
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        found = DynamicArray()
+        for key, index in zip(keys, bucket_indices(hashes, self._capacity)):
+            found.append(self._get_at(index, key))
+
+        return found
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map.
+        Keys that are not in the hash map are ignored.
+        """
+        keys = to_list(keys)
+        hashes = as_engine(self._hash_function).hash_many(keys)
+
+        for key, index in zip(keys, bucket_indices(hashes, self._capacity)):
+            if self._remove_at(index, key):
+                self._size -= 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - put example 2")
+    print("-------------------")
+    m = HashMap(41, hash_function_2)
+    for i in range(50):
+        m.put('str' + str(i // 3), i * 100)
+        if i % 10 == 9:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - resize example 1")
+    print("----------------------")
+    m = HashMap(20, hash_function_1)
+    m.put('key1', 10)
+    print(m.get_size(), m.get_capacity(), m.get('key1'), m.contains_key('key1'))
+    m.resize_table(30)
+    print(m.get_size(), m.get_capacity(), m.get('key1'), m.contains_key('key1'))
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(1, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\nPDF - table_load example 1")
+    print("--------------------------")
+    m = HashMap(101, hash_function_1)
+    print(round(m.table_load(), 2))
+    m.put('key1', 10)
+    print(round(m.table_load(), 2))
+    m.put('key2', 20)
+    print(round(m.table_load(), 2))
+    m.put('key1', 30)
+    print(round(m.table_load(), 2))
+
+    print("\nPDF - table_load example 2")
+    print("--------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(50):
+        m.put('key' + str(i), i * 100)
+        if i % 10 == 0:
+            print(round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - empty_buckets example 1")
+    print("-----------------------------")
+    m = HashMap(101, hash_function_1)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key1', 10)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key2', 20)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key1', 30)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+    m.put('key4', 40)
+    print(m.empty_buckets(), m.get_size(), m.get_capacity())
+
+    print("\nPDF - empty_buckets example 2")
+    print("-----------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('key' + str(i), i * 100)
+        if i % 30 == 0:
+            print(m.empty_buckets(), m.get_size(), m.get_capacity())
+
+    print("\nPDF - get example 1")
+    print("-------------------")
+    m = HashMap(31, hash_function_1)
+    print(m.get('key'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+
+    print("\nPDF - get example 2")
+    print("-------------------")
+    m = HashMap(151, hash_function_2)
+    for i in range(200, 300, 7):
+        m.put(str(i), i * 10)
+    print(m.get_size(), m.get_capacity())
+    for i in range(200, 300, 21):
+        print(i, m.get(str(i)), m.get(str(i)) == i * 10)
+        print(i + 1, m.get(str(i + 1)), m.get(str(i + 1)) == (i + 1) * 10)
+
+    print("\nPDF - contains_key example 1")
+    print("----------------------------")
+    m = HashMap(53, hash_function_1)
+    print(m.contains_key('key1'))
+    m.put('key1', 10)
+    m.put('key2', 20)
+    m.put('key3', 30)
+    print(m.contains_key('key1'))
+    print(m.contains_key('key4'))
+    print(m.contains_key('key2'))
+    print(m.contains_key('key3'))
+    m.remove('key3')
+    print(m.contains_key('key3'))
+
+    print("\nPDF - contains_key example 2")
+    print("----------------------------")
+    m = HashMap(79, hash_function_2)
+    keys = [i for i in range(1, 1000, 20)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+    result = True
+    for key in keys:
+        # all inserted keys must be present
+        result &= m.contains_key(str(key))
+        # NOT inserted keys must be absent
+        result &= not m.contains_key(str(key + 1))
+    print(result)
+
+    print("\nPDF - remove example 1")
+    print("----------------------")
+    m = HashMap(53, hash_function_1)
+    print(m.get('key1'))
+    m.put('key1', 10)
+    print(m.get('key1'))
+    m.remove('key1')
+    print(m.get('key1'))
+    m.remove('key4')
+
+    print("\nPDF - get_keys_and_values example 1")
+    print("------------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    print(m.get_keys_and_values())
+
+    m.put('20', '200')
+    m.remove('1')
+    m.resize_table(2)
+    print(m.get_keys_and_values())
+
+    print("\nPDF - clear example 1")
+    print("---------------------")
+    m = HashMap(101, hash_function_1)
+    print(m.get_size(), m.get_capacity())
+    m.put('key1', 10)
+    m.put('key2', 20)
+    m.put('key1', 30)
+    print(m.get_size(), m.get_capacity())
+    m.clear()
+    print(m.get_size(), m.get_capacity())
+
+    print("\nPDF - clear example 2")
+    print("---------------------")
+    m = HashMap(53, hash_function_1)
+    print(m.get_size(), m.get_capacity())
+    m.put('key1', 10)
+    print(m.get_size(), m.get_capacity())
+    m.put('key2', 20)
+    print(m.get_size(), m.get_capacity())
+    m.resize_table(100)
+    print(m.get_size(), m.get_capacity())
+    m.clear()
+    print(m.get_size(), m.get_capacity())
+
+
+    print("\nMemory per entry (bytes, 100000 entries)")
+    print("----------------------------------------")
+    import hash_map_sc
+    from map_stats import memory_per_entry
+
+    print('linked lists :', round(memory_per_entry(hash_map_sc.HashMap), 1))
+    print('array buckets:', round(memory_per_entry(HashMap), 1))
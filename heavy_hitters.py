@@ -0,0 +1,245 @@
+# Course:      CS261 - Data Structures
+# Description: Approximate mode and heavy hitters of a stream in fixed memory, for inputs too
+#              large to count exactly. A Count-Min sketch (depth rows of width counters)
+#              estimates the frequency of any value, never below the true frequency, and a
+#              HashMap of at most `candidates` entries keeps Misra-Gries counters for the
+#              values that may be frequent, never above the true frequency. Every value
+#              occurring more than total / (candidates + 1) times is among the candidates.
+#
+#              Memory is fixed when the object is built: width * depth 8-byte counters plus
+#              the candidate map, whose capacity is chosen so that it never grows. Values can
+#              come from a DynamicArray or any iterable, e.g. a generator over a log file.
+#
+#              For a candidate counted c times by Misra-Gries, after d decrement rounds and
+#              with a sketch estimate of s, the true frequency f satisfies
+#              c <= f <= min(s, c + d). Both bounds always hold; the sketch exceeds f by at
+#              most e / width * total with probability 1 - exp(-depth).
+
+from array import array
+import math
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_engine import mix_hash
+import hash_map_oa
+import hash_map_sc
+
+
+# Sizes used unless the caller chooses others
+CANDIDATES = 64
+WIDTH = 2048
+DEPTH = 4
+
+
+class HeavyHitters:
+    """
+    Count-Min sketch with a Misra-Gries candidate HashMap
+    """
+
+    def __init__(self,
+                 candidates: int = CANDIDATES,
+                 width: int = WIDTH,
+                 depth: int = DEPTH,
+                 map_class: type = hash_map_oa.HashMap,
+                 function: callable = hash_function_1) -> None:
+        """
+        Initialize new summary keeping at most `candidates` candidate values in a map_class
+        with the given hash function, and a sketch of depth rows of width counters
+        """
+        if candidates < 1 or width < 1 or depth < 1:
+            raise ValueError("HeavyHitters needs at least one candidate, column and row")
+        self._rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self._width = width
+        self._limit = candidates
+        # Twice the entries plus one keeps the load of either map below its resize threshold
+        self._candidates = map_class(2 * candidates + 1, function)
+        self._total = 0
+        self._decrements = 0
+
+    @classmethod
+    def with_error(cls, epsilon: float, delta: float, candidates: int = CANDIDATES,
+                   map_class: type = hash_map_oa.HashMap,
+                   function: callable = hash_function_1) -> "HeavyHitters":
+        """
+        Returns a summary whose sketch overestimates by at most epsilon * total with
+        probability 1 - delta
+        """
+        return cls(candidates, math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)),
+                   map_class, function)
+
+    def _decrement(self) -> None:
+        """
+        Misra-Gries round: takes one off every candidate, dropping those that reach 0
+        """
+        self._decrements += 1
+        candidates = self._candidates
+        survivors = [(value, count - 1) for value, count in candidates.items() if count > 1]
+        # Refilling a cleared map leaves no tombstones behind (OA) to compact later
+        candidates.clear()
+        for value, count in survivors:
+            candidates.put(value, count)
+
+    def update(self, source) -> None:
+        """
+        Counts every value of the source, a DynamicArray or any iterable
+        """
+        if isinstance(source, DynamicArray):
+            da = source
+            source = (da.get_at_index(i) for i in range(da.length()))
+
+        rows, width = self._rows, self._width
+        depth = range(len(rows))
+        candidates, limit = self._candidates, self._limit
+        total = self._total
+        for value in source:
+            total += 1
+            # Row i uses hash h1 + i * h2, two halves of one mixed 64-bit hash. Unmixed, the
+            # high half is 0 for small ints and every row would be a shifted copy of the first
+            h = mix_hash(hash(value))
+            h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+            for i in depth:
+                rows[i][(h1 + i * h2) % width] += 1
+
+            if candidates.get_size() < limit or candidates.contains_key(value):
+                candidates.increment(value)
+            else:
+                self._decrement()
+        self._total = total
+
+    def add(self, value: object) -> None:
+        """
+        Counts one occurrence of the value
+        """
+        self.update((value,))
+
+    def estimate(self, value: object) -> int:
+        """
+        Returns the sketch's estimate of the value's frequency, which is never below it
+        """
+        h = mix_hash(hash(value))
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        width = self._width
+        return min(row[(h1 + i * h2) % width] for i, row in enumerate(self._rows))
+
+    def bounds(self, value: object) -> tuple[int, int]:
+        """
+        Returns a tuple of the lowest and highest frequency the value can have
+        """
+        count = self._candidates.get(value) or 0
+        return count, min(self.estimate(value), count + self._decrements)
+
+    def get_total(self) -> int:
+        """
+        Return number of values counted
+        """
+        return self._total
+
+    def error_bounds(self) -> dict:
+        """
+        Returns a dict of the summary's guarantees: candidate_error, the most a candidate's
+        count is below its frequency (and the frequency a value needs to be sure to be a
+        candidate); sketch_error, the most an estimate exceeds the frequency with probability
+        confidence; and the memory the summary was given
+        """
+        return {'total': self._total,
+                'candidate_error': self._decrements,
+                'sketch_error': math.e / self._width * self._total,
+                'confidence': 1 - math.exp(-len(self._rows)),
+                'candidates': self._limit,
+                'counter_bytes': 8 * self._width * len(self._rows)}
+
+    def top_k(self, k: int) -> DynamicArray:
+        """
+        Returns an array of (value, frequency, error) tuples for the k candidates with the
+        highest frequency estimate. The true frequency is at most frequency, and at least
+        frequency - error with probability confidence (see error_bounds()).
+        """
+        sketch_error = math.ceil(math.e / self._width * self._total)
+        ranked = []
+        for value, count in self._candidates.items():
+            high = min(self.estimate(value), count + self._decrements)
+            # high - count always holds; the sketch's bound holds with probability confidence
+            ranked.append((high, min(high - count, sketch_error), value))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return DynamicArray([(value, high, error) for high, error, value in ranked[:k]])
+
+    def mode(self) -> tuple[DynamicArray, int, int]:
+        """
+        Returns a tuple containing the estimated mode value(s) along with the estimated
+        frequency and its error, as in top_k()
+        """
+        ranked = self.top_k(self._limit)
+        if ranked.length() == 0:
+            return DynamicArray(), 0, 0
+
+        frequency = ranked.get_at_index(0)[1]
+        modes, error = DynamicArray(), 0
+        for i in range(ranked.length()):
+            value, high, value_error = ranked.get_at_index(i)
+            if high != frequency:
+                break
+            modes.append(value)
+            error = max(error, value_error)
+        return modes, frequency, error
+
+
+def find_mode(source,
+              candidates: int = CANDIDATES,
+              width: int = WIDTH,
+              depth: int = DEPTH) -> tuple[DynamicArray, int, int]:
+    """
+    Returns a tuple containing the estimated mode value(s) of the source, a DynamicArray or
+    any iterable, along with the estimated frequency and its error (see HeavyHitters.mode())
+    """
+    summary = HeavyHitters(candidates, width, depth)
+    summary.update(source)
+    return summary.mode()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nHeavy hitters - example 1")
+    print("-------------------------")
+    test_cases = (
+        ["apple", "apple", "grape", "melon", "peach"],
+        ["Arch", "Manjaro", "Manjaro", "Mint", "Mint", "Mint", "Ubuntu", "Ubuntu", "Ubuntu"],
+        ["2", "4", "2", "6", "8", "4", "1", "3", "4", "5", "7", "3", "3", "2"]
+    )
+    for case in test_cases:
+        da = DynamicArray(case)
+        mode, frequency, error = find_mode(da)
+        print(f"Input: {da}\nMode : {mode}, Frequency: {frequency}, Error: {error}, "
+              f"exact: {hash_map_sc.find_mode(da)[0]}\n")
+
+    summary = HeavyHitters(candidates=2, width=8, depth=2, map_class=hash_map_sc.HashMap,
+                           function=hash_function_2)
+    summary.update(iter("abracadabra"))
+    print(summary.top_k(2), summary.bounds('a'), summary.bounds('r'), summary.error_bounds())
+
+    print("\n1000000 Zipf tokens from a generator, 200000 distinct")
+    print("-----------------------------------------------------")
+    import random
+    from time import perf_counter
+
+    generator = random.Random(1)
+    weights = [1 / rank ** 1.1 for rank in range(1, 200001)]
+    ranks = generator.choices(range(200000), weights, k=1000000)
+    exact = {}
+    for rank in ranks:
+        exact[rank] = exact.get(rank, 0) + 1
+
+    summary = HeavyHitters.with_error(epsilon=0.001, delta=0.01, candidates=100)
+    start = perf_counter()
+    summary.update('token' + str(rank) for rank in ranks)
+    print(round(perf_counter() - start, 2), 's', summary.error_bounds())
+    mode, frequency, error = summary.mode()
+    print('mode', mode, frequency, error)
+    top, misses = summary.top_k(100), 0
+    for i in range(top.length()):
+        value, frequency, error = top.get_at_index(i)
+        true = exact[int(value[5:])]
+        misses += not frequency - error <= true <= frequency
+        if i < 5:
+            print(' ', value, 'estimate', frequency, 'error', error, 'true', true)
+    print('bounds violated:', misses, 'of', top.length())
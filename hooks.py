@@ -0,0 +1,154 @@
+# Course:      CS261 - Data Structures
+# Description: Event hooks for the HashMaps (SC & OA) and BoundedCache, behind their
+#              add_hook() and remove_hook() methods. A callback registered for an event is
+#              called as callback(map, event, data), data being a dict of the details below.
+#              A map without hooks keeps _hooks as None, so the only cost it pays is testing
+#              that one attribute; the registry is dropped again with its last callback.
+#
+#              resize_start:  old_capacity, new_capacity, size (before any entry moves)
+#              resize_end:    old_capacity, new_capacity, size, seconds
+#              slow_probe:    key, length, capacity, for lookups probing at least the
+#                             threshold past the first slot (OA) or searching a chain at
+#                             least that long (SC)
+#              clear:         size, capacity (before clearing)
+#              evict:         key, value (BoundedCache only)
+
+from time import perf_counter
+
+
+EVENTS = ('resize_start', 'resize_end', 'slow_probe', 'clear', 'evict')
+
+# Probe (OA) or chain (SC) length that fires slow_probe unless told otherwise
+SLOW_PROBE_THRESHOLD = 8
+
+
+class HookRegistry:
+    """
+    Callbacks registered on one map, by event
+    """
+
+    def __init__(self) -> None:
+        self._callbacks = {}
+        self.slow_probe_threshold = SLOW_PROBE_THRESHOLD
+
+    def add(self, event: str, callback: callable) -> None:
+        """
+        Registers the callback for the event
+        """
+        self._callbacks.setdefault(event, []).append(callback)
+
+    def remove(self, event: str, callback: callable) -> None:
+        """
+        Unregisters the callback from the event, if it was registered
+        """
+        callbacks = self._callbacks.get(event, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._callbacks[event]
+
+    def is_empty(self) -> bool:
+        """
+        Returns True if no callback is registered
+        """
+        return not self._callbacks
+
+    def fire(self, m, event: str, **data) -> None:
+        """
+        Calls every callback registered for the event
+        """
+        for callback in self._callbacks.get(event, ()):
+            callback(m, event, data)
+
+    def probe(self, m, key: str, length: int) -> None:
+        """
+        Fires slow_probe if the lookup of the key had a probe or chain length at the threshold
+        """
+        if length >= self.slow_probe_threshold and 'slow_probe' in self._callbacks:
+            self.fire(m, 'slow_probe', key=key, length=length, capacity=m.get_capacity())
+
+    def start_resize(self, m, new_capacity: int) -> float:
+        """
+        Fires resize_start and returns the time the resize starts at, for end_resize()
+        """
+        self.fire(m, 'resize_start', old_capacity=m.get_capacity(), new_capacity=new_capacity,
+                  size=m.get_size())
+        return perf_counter()
+
+    def end_resize(self, m, started: float, old_capacity: int) -> None:
+        """
+        Fires resize_end for a resize that started at the given time
+        """
+        self.fire(m, 'resize_end', old_capacity=old_capacity, new_capacity=m.get_capacity(),
+                  size=m.get_size(), seconds=perf_counter() - started)
+
+
+def add_hook(m, event: str, callback: callable, threshold: int = None) -> None:
+    """
+    Registers callback(map, event, data) for the event on the map. For slow_probe, a given
+    threshold replaces the map's probe length threshold.
+    """
+    if event not in EVENTS:
+        raise ValueError("Unknown hook event " + repr(event))
+    if m._hooks is None:
+        m._hooks = HookRegistry()
+    m._hooks.add(event, callback)
+    if threshold is not None:
+        m._hooks.slow_probe_threshold = threshold
+
+
+def remove_hook(m, event: str, callback: callable) -> None:
+    """
+    Unregisters the callback from the event on the map
+    """
+    if m._hooks is not None:
+        m._hooks.remove(event, callback)
+        if m._hooks.is_empty():
+            m._hooks = None
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nHooks - example 1")
+    print("-----------------")
+    import hash_map_oa
+    import hash_map_sc
+    from a6_include import hash_function_1, hash_function_2
+
+    slow = []
+
+    def trace(m, event: str, data: dict) -> None:
+        if event == 'resize_end':
+            print(' ', event, data['old_capacity'], '->', data['new_capacity'], data['size'], 'entries',
+                  round(data['seconds'] * 1000, 2), 'ms')
+        elif event == 'slow_probe':
+            slow.append(data['length'])
+        elif event == 'clear':
+            print(' ', event, data)
+
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        print(map_class.__module__)
+        m = map_class(11, hash_function_1)
+        for event in ('resize_start', 'resize_end', 'clear'):
+            m.add_hook(event, trace)
+        m.add_hook('slow_probe', trace, threshold=4)
+        for i in range(40):
+            m.put('str' + str(i), i)
+        m.get('str39')
+        print('  slow probes', len(slow), 'longest', max(slow, default=0))
+        slow.clear()
+        m.clear()
+        for event in ('resize_start', 'resize_end', 'clear', 'slow_probe'):
+            m.remove_hook(event, trace)
+        print(' ', m._hooks)
+
+    print("\nPre-sizing from resize events")
+    print("-----------------------------")
+    resizes = []
+    m = hash_map_oa.HashMap(11, hash_function_2)
+    m.add_hook('resize_end', lambda m, event, data: resizes.append(data['new_capacity']))
+    for i in range(1000):
+        m.put('str' + str(i), i)
+    print(len(resizes), 'resizes, next time start at capacity', resizes[-1])
@@ -0,0 +1,726 @@
+# Course:      CS261 - Data Structures
+# Description: HashMaps (SC & OA) with incremental resizing. Instead of rehashing every
+#              entry inside the put() that crosses the load threshold, resize_table() only
+#              allocates the new table. The old and new tables then coexist, and every
+#              following operation migrates at most migration_step buckets (SC) or slots
+#              (OA) from the old table. Lookups check both tables until the migration is
+#              done; writes first move the key's old bucket (or entry) into the new table.
+#
+#              put_many() and remove_many() keep indices computed for the current table, so a
+#              resize they start (or a compaction, OA) runs to completion inside the call.
+#              With stats enabled, a resize is recorded, and resize_end fired, once its
+#              migration is done (or clear() drops the rest); its seconds span the whole
+#              migration. Lookups during a migration check the Bloom filter and record their
+#              probes through both tables like any other lookup.
+
+from time import perf_counter
+
+from a6_include import (DynamicArray, HashEntry, LinkedList,
+                        hash_function_1, hash_function_2)
+import hash_map_oa
+import hash_map_sc
+
+
+# Number of old buckets migrated by each operation unless told otherwise
+MIGRATION_STEP = 64
+
+# Marks an OA slot whose entry was moved to the new table; lookups probe past it
+_MOVED = HashEntry(None, None)
+_MOVED.is_tombstone = True
+
+
+def _start_resize(m, new_capacity: int) -> None:
+    """
+    Fires resize_start and notes when the resize of the map started, for _end_resize()
+    """
+    if m._hooks is not None:
+        m._hooks.start_resize(m, new_capacity)
+    m._resize_started = perf_counter()
+
+
+def _end_resize(m) -> None:
+    """
+    Records the resize whose migration just finished and fires resize_end
+    """
+    if m._stats is not None:
+        m._stats.record_resize(m._resize_started, m._old_capacity, m._capacity, m._size)
+    if m._hooks is not None:
+        m._hooks.end_resize(m, m._resize_started, m._old_capacity)
+
+
+class IncrementalSCHashMap(hash_map_sc.HashMap):
+    """
+    Separate chaining HashMap that spreads the work of resize_table() over later operations
+    """
+
+    # True inside put_many() and remove_many(), which need every resize finished at once
+    _bulk = False
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 migration_step: int = MIGRATION_STEP) -> None:
+        """
+        Initialize new HashMap. migration_step is the number of old buckets each operation
+        migrates while a resize is in progress.
+        """
+        super().__init__(capacity, function)
+        self.migration_step = migration_step
+
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._migrate_index = 0
+        self._materialized = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to finish any resize in progress first
+        """
+        self.finish_resize()
+        return super().__str__()
+
+    def resize_in_progress(self) -> bool:
+        """
+        Returns True while entries are still being migrated from the old table
+        """
+        return self._old_buckets is not None
+
+    def finish_resize(self) -> None:
+        """
+        Migrates everything left in the old table
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Starts changing the capacity of the underlying table. Only the new table is allocated
+        here, entries are migrated by the operations that follow. If new_capacity is not prime,
+        it is changed to the next highest prime number.
+        """
+        # If new_capacity < 1, do nothing
+        if new_capacity < 1:
+            return
+
+        # Only one resize runs at a time
+        self.finish_resize()
+
+        # If new_capacity is not prime, change it to the next highest prime number
+        new_capacity = self._round_capacity(new_capacity)
+
+        while (self._size / new_capacity) > 1.0:
+            new_capacity = self._round_capacity(new_capacity * 2)
+
+        _start_resize(self, new_capacity)
+
+        # Buckets of the new table are created as they are needed, or by _migrate()
+        self._old_buckets, self._old_capacity = self._buckets, self._capacity
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._capacity = new_capacity
+        self._migrate_index = 0
+        self._materialized = 0
+        if self._bloom is not None:
+            # The filter holds keys, not positions, so it is resized here in one go
+            self._bloom.rebuild(self.keys(), new_capacity)
+        if self._bulk:
+            self.finish_resize()
+
+    def _bucket(self, index: int) -> LinkedList:
+        """
+        Returns the bucket of the new table at the given index, creating it if needed
+        """
+        bucket = self._buckets.get_at_index(index)
+        if bucket is None:
+            bucket = LinkedList()
+            self._buckets.set_at_index(index, bucket)
+        return bucket
+
+    def _move_bucket(self, old_index: int) -> None:
+        """
+        Moves every entry of one old bucket into the new table
+        """
+        old_bucket = self._old_buckets.get_at_index(old_index)
+        if old_bucket is None:
+            return
+
+        # Walk from head to tail, making each entry the head of its new bucket like resize_table()
+        for node in old_bucket:
+            index = self._hash_function(node.key) % self._capacity
+            self._bucket(index).insert(node.key, node.value)
+        self._old_buckets.set_at_index(old_index, None)
+
+    def _migrate(self, count: int) -> None:
+        """
+        Migrates up to count old buckets, in order, and creates new buckets in proportion
+        """
+        while count > 0 and self._migrate_index < self._old_capacity:
+            self._move_bucket(self._migrate_index)
+            self._migrate_index += 1
+            count -= 1
+
+        target = self._migrate_index * self._capacity // self._old_capacity
+        while self._materialized < target:
+            self._bucket(self._materialized)
+            self._materialized += 1
+
+        if self._migrate_index == self._old_capacity:
+            self._old_buckets = None
+            _end_resize(self)
+
+    def _absorb(self, key: str) -> None:
+        """
+        Moves the old bucket that could hold the key into the new table and makes sure the
+        key's new bucket exists, so the key can be written through the new table only
+        """
+        hash = self._hash_function(key)
+        self._move_bucket(hash % self._old_capacity)
+        self._bucket(hash % self._capacity)
+
+    def _find(self, key: str) -> tuple:
+        """
+        Returns a tuple of the node holding the key in either table, or None, and the number
+        of nodes in the buckets searched
+        """
+        hash = self._hash_function(key)
+        bucket = self._buckets.get_at_index(hash % self._capacity)
+        node, length = None, 0
+        if bucket is not None:
+            node, length = bucket.contains(key), bucket.length()
+
+        if node is None and self._old_buckets is not None:
+            old_bucket = self._old_buckets.get_at_index(hash % self._old_capacity)
+            if old_bucket is not None:
+                node = old_bucket.contains(key)
+                length += old_bucket.length()
+        return node, length
+
+    def _lookup(self, key: str):
+        """
+        Returns the node holding the key in either table, or None. Checks the filter and
+        records the probe like get() and contains_key() without a resize in progress.
+        """
+        bloom = self._bloom
+        if bloom is not None and not bloom.might_contain(key):
+            return None
+
+        node, length = self._find(key)
+        if self._stats is not None:
+            self._stats.record_probe(length)
+        if self._hooks is not None:
+            self._hooks.probe(self, key, length)
+        if node is None and bloom is not None:
+            bloom.record_false_positive()
+        return node
+
+    def _locate_for_put(self, key: str) -> tuple:
+        """
+        Resizes the table if put() would, migrates one step and moves the key into the new
+        table, then locates the key's bucket and node there
+        """
+        # If load factor >=1, double capacity
+        if self.table_load() >= 1:
+            self.resize_table(self._capacity * 2)
+
+        if self._old_buckets is not None:
+            self._migrate(self.migration_step)
+            if self._old_buckets is not None:
+                self._absorb(key)
+        return super()._locate_for_put(key)
+
+    def get(self, key: str):
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, the method returns None.
+        """
+        if self._old_buckets is None:
+            return super().get(key)
+
+        self._migrate(self.migration_step)
+        node = self._lookup(key)
+        return None if node is None else node.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        if self._old_buckets is None:
+            return super().contains_key(key)
+
+        self._migrate(self.migration_step)
+        return self._lookup(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        if self._old_buckets is not None:
+            self._migrate(self.migration_step)
+            if self._old_buckets is not None:
+                self._absorb(key)
+        super().remove(key)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        self.finish_resize()
+        return super().empty_buckets()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array where each index contains a tuple of a key/value pair stored in the hash map.
+        """
+        self.finish_resize()
+        return super().get_keys_and_values()
+
+    def _nodes(self):
+        """
+        Returns a generator over the nodes of both tables, without migrating anything
+        """
+        for buckets in (self._buckets, self._old_buckets):
+            if buckets is None:
+                continue
+            for index in range(buckets.length()):
+                bucket = buckets.get_at_index(index)
+                if bucket is not None:
+                    yield from bucket
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map, does not change the underlying hash table capacity.
+        A resize in progress ends here, without migrating the rest of the old table.
+        """
+        if self._old_buckets is not None:
+            self._old_buckets = None
+            _end_resize(self)
+        super().clear()
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map. A resize it
+        needs is done in one go.
+        """
+        self.finish_resize()
+        self._bulk = True
+        try:
+            super().put_many(keys, values)
+        finally:
+            self._bulk = False
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        """
+        self.finish_resize()
+        return super().get_many(keys)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map.
+        """
+        self.finish_resize()
+        super().remove_many(keys)
+
+    def stats(self) -> dict:
+        """
+        Returns a dict of table health figures (see map_stats.py), after finishing any
+        resize in progress
+        """
+        self.finish_resize()
+        return super().stats()
+
+    def save(self, path: str) -> None:
+        """
+        Writes a binary snapshot of the hash map, after finishing any resize in progress
+        """
+        self.finish_resize()
+        super().save(path)
+
+
+class IncrementalOAHashMap(hash_map_oa.HashMap):
+    """
+    Open addressing HashMap that spreads the work of resize_table() over later operations
+    """
+
+    # True inside put_many() and remove_many(), which need every resize finished at once
+    _bulk = False
+
+    def __init__(self,
+                 capacity: int,
+                 function: callable,
+                 migration_step: int = MIGRATION_STEP) -> None:
+        """
+        Initialize new HashMap. migration_step is the number of old slots each operation
+        migrates while a resize is in progress.
+        """
+        super().__init__(capacity, function)
+        self.migration_step = migration_step
+
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._migrate_index = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to finish any resize in progress first
+        """
+        self.finish_resize()
+        return super().__str__()
+
+    def resize_in_progress(self) -> bool:
+        """
+        Returns True while entries are still being migrated from the old table
+        """
+        return self._old_buckets is not None
+
+    def finish_resize(self) -> None:
+        """
+        Migrates everything left in the old table
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Starts changing the capacity of the underlying table. Only the new table is allocated
+        here, active entries are migrated by the operations that follow.
+        """
+        # Check if new capacity is valid
+        if new_capacity < self._size:
+            return
+
+        # Only one resize runs at a time
+        self.finish_resize()
+
+        # Ensure new capacity is a prime number
+        new_capacity = self._round_capacity(new_capacity)
+
+        # Keep doubling, as putting the entries back one by one would, until the load is below 0.5
+        while (self._size - 1) * 2 >= new_capacity:
+            new_capacity = self._round_capacity(new_capacity * 2)
+
+        _start_resize(self, new_capacity)
+        self._old_buckets, self._old_capacity = self._buckets, self._capacity
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._capacity = new_capacity
+        self._migrate_index = 0
+        # Tombstones stay behind in the old table
+        self._tombstones = 0
+        self._modcount += 1
+        if self._bloom is not None:
+            # The filter holds keys, not positions, so it is resized here in one go
+            self._bloom.rebuild(self.keys(), new_capacity // 2)
+        if self._bulk:
+            self.finish_resize()
+
+    def _move_slot(self, old_index: int) -> None:
+        """
+        Moves the active entry in one old slot into the new table
+        """
+        entry = self._old_buckets.get_at_index(old_index)
+        if entry is None or entry.is_tombstone:
+            return
+
+        # Moving an entry counts as the resize, not as a lookup and an insert (or a slow probe),
+        # and the key is already in the filter
+        stats, registry, bloom = self._stats, self._hooks, self._bloom
+        self._stats = self._hooks = self._bloom = None
+        hash = self._hash_function(entry.key)
+        self._put_at(hash % self._capacity, entry.key, entry.value)
+        self._stats, self._hooks, self._bloom = stats, registry, bloom
+        # A tombstone keeps the probe sequences of the old table intact
+        self._old_buckets.set_at_index(old_index, _MOVED)
+
+    def _migrate(self, count: int) -> None:
+        """
+        Migrates up to count old slots, in order
+        """
+        while count > 0 and self._migrate_index < self._old_capacity:
+            self._move_slot(self._migrate_index)
+            self._migrate_index += 1
+            count -= 1
+
+        if self._migrate_index == self._old_capacity:
+            self._old_buckets = None
+            _end_resize(self)
+
+    def _old_index(self, hash: int, key: str) -> tuple:
+        """
+        Returns a tuple of the index of the key's active entry in the old table, or -1, and
+        the number of probes past the initial one. Tombstones are probed past, an empty slot
+        ends the search.
+        """
+        initial = hash % self._old_capacity
+        index, j = initial, 1
+        entry = self._old_buckets.get_at_index(index)
+        while entry is not None and j <= self._old_capacity:
+            if not entry.is_tombstone and entry.key == key:
+                return index, j - 1
+            index = (initial + j ** 2) % self._old_capacity
+            entry = self._old_buckets.get_at_index(index)
+            j += 1
+        return -1, j - 1
+
+    def _absorb(self, key: str) -> None:
+        """
+        Moves the key's entry from the old table into the new one, if it is still there
+        """
+        index = self._old_index(self._hash_function(key), key)[0]
+        if index >= 0:
+            self._move_slot(index)
+
+    def _find(self, key: str) -> tuple:
+        """
+        Returns a tuple of the active entry for the key in either table, or None, and the
+        number of probes past the initial one (the old table's initial slot counts as one)
+        """
+        hash = self._hash_function(key)
+        entry, probes = self._find_at(hash % self._capacity, key)
+
+        if entry is None and self._old_buckets is not None:
+            index, old_probes = self._old_index(hash, key)
+            probes += 1 + old_probes
+            if index >= 0:
+                entry = self._old_buckets.get_at_index(index)
+        return entry, probes
+
+    def _lookup(self, key: str) -> HashEntry:
+        """
+        Returns the active entry for the key in either table, or None. Checks the filter and
+        records the probe like get() and contains_key() without a resize in progress.
+        """
+        bloom = self._bloom
+        if bloom is not None and not bloom.might_contain(key):
+            return None
+
+        entry, probes = self._find(key)
+        if self._stats is not None:
+            self._stats.record_probe(probes)
+        if self._hooks is not None:
+            self._hooks.probe(self, key, probes)
+        if entry is None and bloom is not None:
+            bloom.record_false_positive()
+        return entry
+
+    def _locate_for_put(self, key: str) -> tuple:
+        """
+        Resizes the table if put() would, migrates one step and moves the key into the new
+        table, then probes for the key there
+        """
+        # If load factor >=0.5, double capacity
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+
+        if self._old_buckets is not None:
+            self._migrate(self.migration_step)
+            if self._old_buckets is not None:
+                self._absorb(key)
+        return super()._locate_for_put(key)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map, returns None.
+        """
+        if self._old_buckets is None:
+            return super().get(key)
+
+        self._migrate(self.migration_step)
+        entry = self._lookup(key)
+        return None if entry is None else entry.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the HashMap, otherwise returns False
+        """
+        if self._old_buckets is None:
+            return super().contains_key(key)
+
+        self._migrate(self.migration_step)
+        return self._lookup(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        if self._old_buckets is not None:
+            self._migrate(self.migration_step)
+            if self._old_buckets is not None:
+                self._absorb(key)
+        super().remove(key)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the HashMap
+        """
+        self.finish_resize()
+        return super().empty_buckets()
+
+    def _entries(self):
+        """
+        Returns a generator over the active entries of both tables, without migrating anything
+        """
+        for buckets in (self._buckets, self._old_buckets):
+            if buckets is None:
+                continue
+            for index in range(buckets.length()):
+                entry = buckets.get_at_index(index)
+                if entry is not None and not entry.is_tombstone:
+                    yield entry
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value pair stored in the HashMap
+        """
+        self.finish_resize()
+        return super().get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the HashMap, without changing the underlying hash table capacity.
+        A resize in progress ends here, without migrating the rest of the old table.
+        """
+        if self._old_buckets is not None:
+            self._old_buckets = None
+            _end_resize(self)
+        super().clear()
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map. A resize it
+        needs is done in one go.
+        """
+        self.finish_resize()
+        self._bulk = True
+        try:
+            super().put_many(keys, values)
+        finally:
+            self._bulk = False
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        """
+        self.finish_resize()
+        return super().get_many(keys)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map. A compaction
+        it triggers is done in one go.
+        """
+        self.finish_resize()
+        self._bulk = True
+        try:
+            super().remove_many(keys)
+        finally:
+            self._bulk = False
+
+    def stats(self) -> dict:
+        """
+        Returns a dict of table health figures (see map_stats.py), after finishing any
+        resize in progress
+        """
+        self.finish_resize()
+        return super().stats()
+
+    def save(self, path: str) -> None:
+        """
+        Writes a binary snapshot of the hash map, after finishing any resize in progress
+        """
+        self.finish_resize()
+        super().save(path)
+
+    def __iter__(self):
+        """
+        Create iterator for loop, after finishing any resize in progress
+        """
+        self.finish_resize()
+        return super().__iter__()
+
+    def iter_range(self, start: int, stop: int):
+        """
+        Returns an iterator over the active entries in buckets start up to stop, after
+        finishing any resize in progress
+        """
+        self.finish_resize()
+        return super().iter_range(start, stop)
+
+
+def worst_put_latency(m, count: int) -> float:
+    """
+    Puts count keys into the given map and returns the slowest single put() in seconds.
+    The garbage collector is paused so its own pauses don't hide the resize pauses.
+    """
+    import gc
+    from time import perf_counter
+
+    worst = 0.0
+    gc.disable()
+    try:
+        for i in range(count):
+            start = perf_counter()
+            m.put('key' + str(i), i)
+            worst = max(worst, perf_counter() - start)
+    finally:
+        gc.enable()
+    return worst
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nIncremental resize example 1")
+    print("----------------------------")
+    for map_class in (IncrementalSCHashMap, IncrementalOAHashMap):
+        m = map_class(11, hash_function_2, 4)
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+            if i % 25 == 24:
+                print(m.resize_in_progress(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+        result = True
+        for i in range(150):
+            result &= m.get('str' + str(i)) == i * 100
+            result &= not m.contains_key('str' + str(i + 150))
+        for i in range(0, 150, 2):
+            m.remove('str' + str(i))
+        for i in range(150):
+            result &= m.contains_key('str' + str(i)) == (i % 2 == 1)
+        print(result, m.get_size(), m.get_keys_and_values().length())
+
+    print("\nIncremental resize example 2, put_many() and remove_many() across resizes")
+    print("------------------------------------------------------------------------")
+    import random
+
+    for map_class in (IncrementalSCHashMap, IncrementalOAHashMap):
+        result = True
+        for seed in range(60):
+            generator = random.Random(seed)
+            m, expected = map_class(3, hash_function_1, generator.randrange(1, 5)), {}
+            for step in range(300):
+                keys = ['k' + str(generator.randrange(60)) for _ in range(generator.randrange(1, 15))]
+                if generator.random() < 0.6:
+                    m.put_many(keys, list(range(len(keys))))
+                    expected.update(zip(keys, range(len(keys))))
+                else:
+                    m.remove_many(keys)
+                    for key in keys:
+                        expected.pop(key, None)
+                m.put(keys[0], step)
+                expected[keys[0]] = step
+                result &= m.get_size() == len(expected)
+            result &= all(m.get(key) == value for key, value in expected.items())
+        m.enable_stats()
+        m.put_many(['new' + str(i) for i in range(200)], list(range(200)))
+        print(map_class.__name__, result, m.stats()['resizes'], 'resize(s) recorded')
+
+    print("\nWorst put() latency, 200000 keys (ms)")
+    print("-------------------------------------")
+    from hash_engine import crc32_hash
+
+    for name, map_class in (('SC stop-the-world', hash_map_sc.HashMap),
+                            ('SC incremental   ', IncrementalSCHashMap),
+                            ('OA stop-the-world', hash_map_oa.HashMap),
+                            ('OA incremental   ', IncrementalOAHashMap)):
+        print(name, round(worst_put_latency(map_class(11, crc32_hash), 200000) * 1000, 2))
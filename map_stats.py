@@ -0,0 +1,167 @@
+# Course:      CS261 - Data Structures
+# Description: Table health counters for the HashMaps (SC & OA), behind their
+#              enable_stats(), disable_stats() and stats() methods. While enabled, a map
+#              records the probe length of every lookup (OA: slots probed past the first,
+#              SC: length of the chain searched), every new key and whether it collided,
+#              and the count, duration and entries moved of every resize. Recording is a
+#              few integer updates per operation; disabled maps only test one attribute.
+#              stats() returns everything as a plain dict, ready for a metrics exporter.
+#              memory_per_entry() measures what a map class allocates per entry.
+
+from collections import deque
+from time import perf_counter
+
+from hash_engine import crc32_hash
+
+
+# Probe lengths at or above this are counted together
+MAX_PROBE = 32
+
+# Number of recent resizes whose details are kept
+RESIZE_HISTORY = 16
+
+
+class TableStats:
+    """
+    Counters recorded by a HashMap while its stats are enabled
+    """
+
+    def __init__(self) -> None:
+        self.probes = [0] * (MAX_PROBE + 1)
+        self.inserts = 0
+        self.collisions = 0
+        self.resizes = 0
+        self.resize_seconds = 0.0
+        self.entries_moved = 0
+        self.recent_resizes = deque(maxlen=RESIZE_HISTORY)
+        self._last_probe = 0
+
+    def record_probe(self, length: int) -> None:
+        """
+        Counts one lookup that went length steps past the key's first bucket or slot
+        """
+        self.probes[length if length < MAX_PROBE else MAX_PROBE] += 1
+        self._last_probe = length
+
+    def record_insert(self) -> None:
+        """
+        Counts one new key, as a collision if the lookup before it probed past its first
+        bucket (OA) or found a non-empty chain (SC)
+        """
+        self.inserts += 1
+        if self._last_probe > 0:
+            self.collisions += 1
+
+    def start_resize(self) -> float:
+        """
+        Returns the time a resize starts at, to pass to record_resize()
+        """
+        return perf_counter()
+
+    def record_resize(self, started: float, old_capacity: int, new_capacity: int, moved: int) -> None:
+        """
+        Counts one resize that started at the given time and moved the given number of entries
+        """
+        seconds = perf_counter() - started
+        self.resizes += 1
+        self.resize_seconds += seconds
+        self.entries_moved += moved
+        self.recent_resizes.append({'old_capacity': old_capacity, 'new_capacity': new_capacity,
+                                    'seconds': seconds, 'moved': moved})
+
+    def as_dict(self) -> dict:
+        """
+        Returns the counters as a dict. probe_lengths maps each length seen to its count,
+        with MAX_PROBE standing for MAX_PROBE or more.
+        """
+        lookups = sum(self.probes)
+        return {'lookups': lookups,
+                'probe_lengths': {length: count for length, count in enumerate(self.probes) if count},
+                'mean_probe_length': sum(length * count for length, count in enumerate(self.probes)) / lookups
+                if lookups else 0.0,
+                'inserts': self.inserts,
+                'collisions': self.collisions,
+                'resizes': self.resizes,
+                'resize_seconds': self.resize_seconds,
+                'entries_moved': self.entries_moved,
+                'recent_resizes': list(self.recent_resizes)}
+
+
+def describe(m, table: dict) -> dict:
+    """
+    Returns the stats() dict of a map: its hash function, size, capacity and load, the
+    given figures computed from its table, and its counters if stats are enabled
+    """
+    function = getattr(m._hash_function, 'function', m._hash_function)
+    out = {'function': getattr(function, '__name__', repr(function)),
+           'size': m.get_size(),
+           'capacity': m.get_capacity(),
+           'load': m.table_load(),
+           'enabled': m._stats is not None}
+    out.update(table)
+    if m._stats is not None:
+        out.update(m._stats.as_dict())
+    return out
+
+
+def memory_per_entry(map_class, count: int = 100000) -> float:
+    """
+    Returns the number of bytes the given HashMap class allocates per entry to store
+    count keys, not counting the key and value objects themselves
+    """
+    import tracemalloc
+
+    keys = ['key' + str(i) for i in range(count)]
+    tracemalloc.start()
+    m = map_class(11, crc32_hash)
+    for key in keys:
+        m.put(key, key)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return used / count
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nTable stats - example 1")
+    print("-----------------------")
+    import hash_map_oa
+    import hash_map_sc
+    from a6_include import hash_function_1, hash_function_2
+
+    keys = ['str' + str(i) for i in range(2000)]
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        for function in (hash_function_1, hash_function_2):
+            m = map_class(11, function)
+            m.enable_stats()
+            for key in keys:
+                m.put(key, key)
+            for key in keys[::3]:
+                m.remove(key)
+            for key in keys:
+                m.get(key)
+            stats = m.stats()
+            print(map_class.__module__, stats['function'], 'mean probe', round(stats['mean_probe_length'], 2),
+                  'collisions', stats['collisions'], 'of', stats['inserts'], 'resizes', stats['resizes'],
+                  'moved', stats['entries_moved'], round(stats['resize_seconds'] * 1000, 1), 'ms')
+    print(sorted(m.stats())[:6])
+
+    print("\nOverhead, 200000 put() + get() (s)")
+    print("----------------------------------")
+    keys = ['key' + str(i) for i in range(200000)]
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        times = []
+        for enabled in (False, True):
+            m = map_class(11, crc32_hash)
+            if enabled:
+                m.enable_stats()
+            start = perf_counter()
+            for key in keys:
+                m.put(key, key)
+            for key in keys:
+                m.get(key)
+            times.append(round(perf_counter() - start, 2))
+        print(map_class.__module__, 'disabled', times[0], 'enabled', times[1])
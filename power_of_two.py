@@ -0,0 +1,135 @@
+# Course:      CS261 - Data Structures
+# Description: HashMaps (SC & OA) with power of two capacities. Bucket indices are taken
+#              with a bit mask (hash & (capacity - 1)) instead of hash % capacity. A mask
+#              only keeps the low bits of the hash, which the sums of hash_function_1 and
+#              hash_function_2 spread poorly, so every hash is first scrambled with
+#              mix_hash(). The OA map probes with triangular numbers (1, 3, 6, 10, ...),
+#              which visit every slot of a power of two table, where squares do not.
+
+from a6_include import DynamicArray, LinkedList, hash_function_1, hash_function_2
+from capacity import next_power_of_two
+from hash_engine import mask_indices, mix_hash
+import hash_map_oa
+import hash_map_sc
+import snapshot
+
+
+class PowerOfTwoSCHashMap(hash_map_sc.HashMap):
+    """
+    Separate chaining HashMap with a power of two capacity and mask indexing
+    """
+    _layout = snapshot.MIXED_MASK
+
+    def __init__(self,
+                 capacity: int = 16,
+                 function: callable = hash_function_1) -> None:
+        """
+        Initialize new HashMap. Capacity is rounded up to a power of two.
+        """
+        # The base constructor would allocate a prime capacity table, so the table is built here
+        self._capacity = self._round_capacity(capacity)
+        self._buckets = DynamicArray([LinkedList() for _ in range(self._capacity)])
+        self._hash_function = function
+        self._size = 0
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the smallest power of two >= capacity
+        """
+        return next_power_of_two(capacity)
+
+    def _index(self, hash: int) -> int:
+        """
+        Returns the bucket index of the given hash
+        """
+        return mix_hash(hash) & (self._capacity - 1)
+
+    def _indices(self, hashes: list) -> list:
+        """
+        Returns the bucket index of every given hash
+        """
+        return mask_indices(hashes, self._capacity)
+
+
+class PowerOfTwoOAHashMap(hash_map_oa.HashMap):
+    """
+    Open addressing HashMap with a power of two capacity, mask indexing and triangular probing
+    """
+    _layout = snapshot.MIXED_MASK
+
+    def __init__(self, capacity: int, function: callable) -> None:
+        """
+        Initialize new HashMap. Capacity is rounded up to a power of two.
+        """
+        # The base constructor would allocate a prime capacity table, so the table is built here
+        self._capacity = self._round_capacity(capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
+        self._hash_function = function
+        self._size = 0
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the smallest power of two >= capacity
+        """
+        return next_power_of_two(capacity)
+
+    def _index(self, hash: int) -> int:
+        """
+        Returns the initial probe index of the given hash
+        """
+        return mix_hash(hash) & (self._capacity - 1)
+
+    def _indices(self, hashes: list) -> list:
+        """
+        Returns the initial probe index of every given hash
+        """
+        return mask_indices(hashes, self._capacity)
+
+    def _probe(self, initial: int, j: int) -> int:
+        """
+        Returns the j-th index of the triangular probe sequence starting at the given initial index
+        """
+        return (initial + j * (j + 1) // 2) & (self._capacity - 1)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nPower of two example 1")
+    print("----------------------")
+    for map_class in (PowerOfTwoSCHashMap, PowerOfTwoOAHashMap):
+        m = map_class(10, hash_function_2)
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+            if i % 25 == 24:
+                print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+        result = True
+        for i in range(0, 150, 2):
+            m.remove('str' + str(i))
+        for i in range(150):
+            result &= m.get('str' + str(i)) == (i * 100 if i % 2 else None)
+            result &= m.contains_key('str' + str(i)) == (i % 2 == 1)
+        print(result, m.get_size(), m.get_keys_and_values().length())
+
+    print("\nBuckets used by the 1000 keys 'x' * 1 ... 'x' * 1000 in 1024 buckets")
+    print("--------------------------------------------------------------------")
+    # Every hash is a multiple of 8, so a bare mask can only reach one bucket in 8
+    keys = ['x' * length for length in range(1, 1001)]
+    for function in (hash_function_1, hash_function_2):
+        print(len({function(key) & 1023 for key in keys}), 'masked,',
+              len({mix_hash(function(key)) & 1023 for key in keys}), 'mixed and masked,',
+              len({function(key) % 1031 for key in keys}), 'modulo the prime 1031')
+
+    print("\nFinding 20 growth primes from 11 (ms)")
+    print("-------------------------------------")
+    import time
+    from capacity import next_prime
+
+    m = hash_map_sc.HashMap(11)
+    for name, find_prime in (('trial division', m._next_prime), ('prime table   ', next_prime)):
+        capacity, start = 11, time.perf_counter()
+        for _ in range(20):
+            capacity = find_prime(capacity * 2)
+        print(name, round((time.perf_counter() - start) * 1000, 3), capacity)
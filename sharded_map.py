@@ -0,0 +1,310 @@
+# Course:      CS261 - Data Structures
+# Description: HashMap sharded over worker processes. Every worker process owns one shard,
+#              a hash_map_sc or hash_map_oa HashMap, and keys are routed to shard
+#              hash % shards using the map's hash function. put_many(), get_many() and
+#              remove_many() hash their keys in one vectorized pass, split them into one
+#              batch per shard, send every batch before waiting for any answer so the
+#              shards work in parallel, then gather the answers back into input order.
+
+import multiprocessing
+import os
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_engine import as_engine, bucket_indices, to_list
+import hash_map_oa
+import hash_map_sc
+
+
+# Keys routed per round trip. Bounds the size of every message sent to a worker; kept large
+# because every put_many() batch makes a shard check and possibly resize its table again
+ROUTE_BATCH = 1 << 20
+
+
+def _serve(connection, map_class: type, capacity: int, function: callable) -> None:
+    """
+    Worker process loop: builds the shard, then runs (method name, arguments) requests on it
+    and sends back ('ok', result) or ('error', exception) until it receives None
+    """
+    shard = map_class(capacity, function)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        method, arguments = request
+        try:
+            result = getattr(shard, method)(*arguments)
+            if isinstance(result, DynamicArray):
+                result = to_list(result)
+            elif method == 'items':
+                result = list(result)
+            connection.send(('ok', result))
+        except Exception as exception:
+            connection.send(('error', exception))
+    connection.close()
+
+
+class ShardedHashMap:
+    """
+    HashMap partitioned over worker processes
+    """
+
+    def __init__(self,
+                 shards: int = None,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 map_class: type = hash_map_sc.HashMap) -> None:
+        """
+        Start one worker process per shard (one per CPU if shards is None). Every shard is a
+        map_class with an equal share of the capacity. The function must be picklable.
+        """
+        shards = shards or os.cpu_count() or 1
+        share = max(-(-capacity // shards), 1)
+        self._hash_function = function
+        self._connections = []
+        self._workers = []
+
+        for _ in range(shards):
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_serve, daemon=True,
+                                             args=(worker_connection, map_class, share, function))
+            worker.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    def __enter__(self) -> "ShardedHashMap":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stops the worker processes. The map can't be used afterwards.
+        """
+        for connection in self._connections:
+            try:
+                connection.send(None)
+                connection.close()
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.join()
+        self._connections, self._workers = [], []
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _receive(connection):
+        """
+        Returns the result of the last request sent on the connection, re-raising its error
+        """
+        status, result = connection.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    @staticmethod
+    def _receive_all(connections: list) -> list:
+        """
+        Returns the results of the last requests sent on the connections. Every reply is
+        read before the first error is re-raised, so no connection is left with one unread.
+        """
+        replies = [connection.recv() for connection in connections]
+        for status, result in replies:
+            if status == 'error':
+                raise result
+        return [result for _, result in replies]
+
+    def _call(self, index: int, method: str, *arguments):
+        """
+        Runs one method on one shard and returns the result
+        """
+        self._connections[index].send((method, arguments))
+        return self._receive(self._connections[index])
+
+    def _broadcast(self, method: str, *arguments) -> list:
+        """
+        Runs one method on every shard in parallel and returns the list of results
+        """
+        for connection in self._connections:
+            connection.send((method, arguments))
+        return self._receive_all(self._connections)
+
+    def _shard(self, key: str) -> int:
+        """
+        Returns the index of the shard that owns the key
+        """
+        return self._hash_function(key) % len(self._connections)
+
+    def _route(self, keys: list) -> tuple:
+        """
+        Returns a tuple of two lists with one list per shard: the keys the shard owns and
+        their positions in the given keys
+        """
+        shards = len(self._connections)
+        indices = bucket_indices(as_engine(self._hash_function).hash_many(keys), shards)
+        routed = [[] for _ in range(shards)]
+        positions = [[] for _ in range(shards)]
+        for position, (key, index) in enumerate(zip(keys, indices)):
+            routed[index].append(key)
+            positions[index].append(position)
+        return routed, positions
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. If the given key already exists in the hash map,
+        its associated value is replaced with the new value.
+        """
+        self._call(self._shard(key), 'put', key, value)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, the method returns None.
+        """
+        return self._call(self._shard(key), 'get', key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        return self._call(self._shard(key), 'contains_key', key)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        """
+        self._call(self._shard(key), 'remove', key)
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key/value pair from the two given arrays into the hash map, as if put()
+        was called for each pair in order. The shards fill in parallel.
+        """
+        keys, values = to_list(keys), to_list(values)
+        if len(keys) != len(values):
+            raise ValueError("put_many() needs the same number of keys and values")
+
+        sent = []
+        for start in range(0, len(keys), ROUTE_BATCH):
+            batch_values = values[start:start + ROUTE_BATCH]
+            routed, positions = self._route(keys[start:start + ROUTE_BATCH])
+            for index, connection in enumerate(self._connections):
+                if routed[index]:
+                    shard_values = [batch_values[position] for position in positions[index]]
+                    connection.send(('put_many', (routed[index], shard_values)))
+                    sent.append(connection)
+
+        # Acknowledgements are small, so they are only collected once everything is sent
+        self._receive_all(sent)
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns an array with the value associated with each of the given keys, in order.
+        Keys that are not in the hash map get None.
+        """
+        keys = to_list(keys)
+        found = [None] * len(keys)
+
+        for start in range(0, len(keys), ROUTE_BATCH):
+            routed, positions = self._route(keys[start:start + ROUTE_BATCH])
+            shards = [index for index in range(len(self._connections)) if routed[index]]
+            for index in shards:
+                self._connections[index].send(('get_many', (routed[index],)))
+            results = self._receive_all([self._connections[index] for index in shards])
+            for index, values in zip(shards, results):
+                for position, value in zip(positions[index], values):
+                    found[start + position] = value
+
+        return DynamicArray(found)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key and its associated value from the hash map.
+        Keys that are not in the hash map are ignored.
+        """
+        keys = to_list(keys)
+        sent = []
+        for start in range(0, len(keys), ROUTE_BATCH):
+            routed, _ = self._route(keys[start:start + ROUTE_BATCH])
+            for index, connection in enumerate(self._connections):
+                if routed[index]:
+                    connection.send(('remove_many', (routed[index],)))
+                    sent.append(connection)
+
+        self._receive_all(sent)
+
+    def clear(self) -> None:
+        """
+        Clears the contents of every shard
+        """
+        self._broadcast('clear')
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return sum(self._broadcast('get_size'))
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map, summed over the shards
+        """
+        return sum(self._broadcast('get_capacity'))
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self.get_size() / self.get_capacity()
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs, one shard at a time
+        """
+        for index in range(len(self._connections)):
+            yield from self._call(index, 'items')
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array where each index contains a tuple of a key/value pair stored in the hash map.
+        """
+        return DynamicArray(list(self.items()))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nShardedHashMap - example 1")
+    print("--------------------------")
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        with ShardedHashMap(3, 11, hash_function_2, map_class) as m:
+            keys = ['str' + str(i) for i in range(150)]
+            m.put_many(keys, [i * 100 for i in range(150)])
+            m.remove_many(keys[::2])
+            m.put('extra', -1)
+            found = m.get_many(keys)
+            result = all(found[i] == (i * 100 if i % 2 else None) for i in range(150))
+            result &= m.get('extra') == -1 and not m.contains_key('str0')
+            print(result, m.get_size(), m.get_keys_and_values().length(), m.get_capacity())
+
+    print("\nBuild throughput, 500000 keys (keys per second)")
+    print("-----------------------------------------------")
+    from time import perf_counter
+
+    # Throughput depends on how well keys spread over the shards, so use a hash that spreads them well
+    keys = ['key' + str(i) for i in range(500000)]
+    values = list(range(len(keys)))
+    start = perf_counter()
+    single = hash_map_oa.HashMap(11, hash)
+    single.put_many(keys, values)
+    print('single map', round(len(keys) / (perf_counter() - start)))
+    for shards in sorted({1, 2, os.cpu_count() or 1}):
+        with ShardedHashMap(shards, 11, hash, hash_map_oa.HashMap) as m:
+            start = perf_counter()
+            m.put_many(keys, values)
+            print(shards, 'shard(s)', round(len(keys) / (perf_counter() - start)), m.get_size())
@@ -0,0 +1,378 @@
+# Course:      CS261 - Data Structures
+# Description: Read-only open addressing hash table stored in one flat buffer, so other
+#              processes can use it in place. One process builds the table into shared
+#              memory (or a file); the others attach to it (or mmap the file) and look keys
+#              up straight in the buffer, without copying or deserializing the table.
+#
+#              Layout: a header, the hash function's name, then capacity fixed-width slots (state byte, hash, arena
+#              offset, key length, value length), then the arena holding every encoded key
+#              followed by its encoded value (see codec.py). Capacity is prime and the load
+#              stays below 0.5, and collisions are resolved by quadratic probing, like
+#              hash_map_oa. The hash function must give the same hash in every process,
+#              as hash_function_1/2 do (Python's built-in hash() of a str does not).
+#              A table only opens with the function it was built with, compared by name
+#              (see hash_engine.function_name()).
+
+import mmap
+import struct
+from multiprocessing import shared_memory
+
+from a6_include import DynamicArray, HashEntry, hash_function_1
+from capacity import next_prime
+from codec import decode, encode
+from hash_engine import MASK_64, as_engine, crc32_hash, function_id, function_name
+
+
+MAGIC = b'HMST'
+VERSION = 2
+
+# magic, version, hash function id, capacity, size, arena length, function name length
+HEADER = struct.Struct('<4sHHQQQH')
+
+# version 1 tables have no function name
+HEADER_V1 = struct.Struct('<4sHHQQQ')
+PREFIX = struct.Struct('<4sH')
+
+# state, hash, arena offset, key length, value length
+SLOT = struct.Struct('<BQQII')
+
+EMPTY = 0
+LIVE = 1
+
+
+class SharedTableException(Exception):
+    """
+    Raised when a buffer doesn't hold a table this module can read
+    """
+    pass
+
+
+def _image(source, function: callable) -> tuple:
+    """
+    Lays out the table for the given HashMap, dict or iterable of key/value pairs and returns
+    a tuple of the header plus slots and the arena, as bytearrays
+    """
+    pairs = list(source.items() if hasattr(source, 'items') else dict(source).items())
+    keys = [key for key, _ in pairs]
+    hashes = as_engine(function).hash_many(keys)
+    capacity = next_prime(2 * len(pairs) + 1)
+    name = function_name(function).encode()
+    slots = HEADER.size + len(name)
+
+    table = bytearray(slots + capacity * SLOT.size)
+    arena = bytearray()
+    states = bytearray(capacity)
+
+    for (key, value), hash in zip(pairs, hashes):
+        hash &= MASK_64
+        initial = hash % capacity
+        index, j = initial, 1
+        while states[index] != EMPTY:
+            index = (initial + j * j) % capacity
+            j += 1
+        states[index] = LIVE
+
+        encoded_key, encoded_value = encode(key), encode(value)
+        SLOT.pack_into(table, slots + index * SLOT.size,
+                       LIVE, hash, len(arena), len(encoded_key), len(encoded_value))
+        arena += encoded_key
+        arena += encoded_value
+
+    HEADER.pack_into(table, 0, MAGIC, VERSION, function_id(function), capacity, len(pairs), len(arena),
+                     len(name))
+    table[HEADER.size:slots] = name
+    return table, arena
+
+
+class SharedTable:
+    """
+    Read-only hash table in a shared memory block or memory mapped file
+    """
+
+    def __init__(self, buffer, function: callable, shared: shared_memory.SharedMemory = None,
+                 mapped: mmap.mmap = None) -> None:
+        """
+        Wrap a buffer holding a table. Use build(), attach(), write_file() and open_file()
+        instead of calling this directly.
+        """
+        if len(buffer) < PREFIX.size:
+            raise SharedTableException("Not a shared table")
+        magic, version = PREFIX.unpack_from(buffer, 0)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise SharedTableException("Not a version " + str(VERSION) + " shared table")
+        if version == 1:
+            _, _, stored_id, capacity, size, arena_length = HEADER_V1.unpack_from(buffer, 0)
+            slots = HEADER_V1.size
+            if stored_id != function_id(function):
+                raise SharedTableException("Table was built with a different hash function")
+        else:
+            _, _, _, capacity, size, arena_length, length = HEADER.unpack_from(buffer, 0)
+            slots = HEADER.size + length
+            stored_name = bytes(buffer[HEADER.size:slots]).decode()
+            if stored_name != function_name(function):
+                raise SharedTableException("Table was built with " + stored_name + ", not "
+                                           + function_name(function))
+
+        self._buffer = buffer
+        self._shared = shared
+        self._mapped = mapped
+        self._hash_function = function
+        self._capacity = capacity
+        self._size = size
+        self._slots = slots
+        self._arena = slots + capacity * SLOT.size
+
+    @classmethod
+    def build(cls, source, function: callable, name: str = None) -> "SharedTable":
+        """
+        Builds a table from a HashMap, dict or iterable of key/value pairs in a new shared
+        memory block. Other processes attach to it by name. The building process owns the
+        block and must unlink() it once no process needs it.
+        """
+        table, arena = _image(source, function)
+        shared = shared_memory.SharedMemory(name, create=True, size=max(len(table) + len(arena), 1))
+        shared.buf[:len(table)] = table
+        shared.buf[len(table):len(table) + len(arena)] = arena
+        return cls(shared.buf.toreadonly(), function, shared=shared)
+
+    @classmethod
+    def attach(cls, name: str, function: callable) -> "SharedTable":
+        """
+        Attaches read-only to a table another process built with build().
+        On Python < 3.13 an attaching process that wasn't started by the building one
+        unlinks the block when it exits; share tables with such processes through files.
+        """
+        try:
+            shared = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            shared = shared_memory.SharedMemory(name)
+        return cls(shared.buf.toreadonly(), function, shared=shared)
+
+    @staticmethod
+    def write_file(source, function: callable, path: str) -> None:
+        """
+        Builds a table from a HashMap, dict or iterable of key/value pairs into a file
+        """
+        table, arena = _image(source, function)
+        with open(path, 'wb') as file:
+            file.write(table)
+            file.write(arena)
+
+    @classmethod
+    def open_file(cls, path: str, function: callable) -> "SharedTable":
+        """
+        Memory maps a table written by write_file(), read-only. Processes mapping the same
+        file share its pages.
+        """
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapped)
+        try:
+            return cls(buffer, function, mapped=mapped)
+        except SharedTableException:
+            buffer.release()
+            mapped.close()
+            raise
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the shared memory block, or None for a mapped file
+        """
+        return None if self._shared is None else self._shared.name
+
+    def close(self) -> None:
+        """
+        Detaches from the buffer. The table can't be used afterwards.
+        """
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        if self._shared is not None:
+            self._shared.close()
+        if self._mapped is not None:
+            self._mapped.close()
+
+    def unlink(self) -> None:
+        """
+        Destroys the shared memory block once every process has closed it
+        """
+        if self._shared is not None:
+            self._shared.unlink()
+
+    def __enter__(self) -> "SharedTable":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------ #
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    def table_load(self) -> float:
+        """
+        Returns the hash table load factor
+        """
+        return self._size / self._capacity
+
+    def _find(self, key: str) -> tuple:
+        """
+        Returns a tuple of the arena position and length of the key's encoded value,
+        or None if the key is not in the table. Keys are compared in encoded form.
+        """
+        buffer, capacity = self._buffer, self._capacity
+        hash = self._hash_function(key) & MASK_64
+        encoded = encode(key)
+        initial = hash % capacity
+        index, j = initial, 1
+
+        while j <= capacity:
+            state, slot_hash, offset, key_length, value_length = \
+                SLOT.unpack_from(buffer, self._slots + index * SLOT.size)
+            if state == EMPTY:
+                return None
+            if slot_hash == hash and key_length == len(encoded):
+                start = self._arena + offset
+                if buffer[start:start + key_length] == encoded:
+                    return start + key_length, value_length
+            index = (initial + j * j) % capacity
+            j += 1
+
+        return None
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the table, returns None.
+        """
+        found = self._find(key)
+        if found is None:
+            return None
+        start, length = found
+        return decode(self._buffer[start:start + length])
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the table, otherwise returns False
+        """
+        return self._find(key) is not None
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs, decoded as they are reached
+        """
+        buffer = self._buffer
+        for index in range(self._capacity):
+            state, _, offset, key_length, value_length = \
+                SLOT.unpack_from(buffer, self._slots + index * SLOT.size)
+            if state == LIVE:
+                start = self._arena + offset
+                yield (decode(buffer[start:start + key_length]),
+                       decode(buffer[start + key_length:start + key_length + value_length]))
+
+    def keys(self):
+        """
+        Returns a generator over the keys in the table
+        """
+        return (key for key, _ in self.items())
+
+    def values(self):
+        """
+        Returns a generator over the values in the table
+        """
+        return (value for _, value in self.items())
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value pair stored in the table
+        """
+        keyValues = DynamicArray()
+        for pair in self.items():
+            keyValues.append(pair)
+        return keyValues
+
+    def __iter__(self):
+        """
+        Return a generator over the entries, as HashEntry objects
+        """
+        for key, value in self.items():
+            yield HashEntry(key, value)
+
+
+def _attached_lookups(name: str, keys: list, results) -> None:
+    """
+    Worker for the example below: attaches to a table and checks every key's value
+    """
+    with SharedTable.attach(name, crc32_hash) as table:
+        results.put(all(table.get(key) == int(key[3:]) for key in keys))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nSharedTable - example 1")
+    print("-----------------------")
+    import hash_map_oa
+
+    m = hash_map_oa.HashMap(11, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+    m.put('mixed', (1, 'a'))
+    m.remove('str0')
+    table = SharedTable.build(m, hash_function_1)
+    result = all(table.get('str' + str(i)) == (i * 100 if i else None) for i in range(150))
+    print(result, table.get('mixed'), table.contains_key('str0'), table.get_size(), table.get_capacity())
+    print(sorted(table.items()) == sorted(m.items()))
+    table.close()
+    table.unlink()
+
+    print("\nSharedTable - attach from other processes")
+    print("-----------------------------------------")
+    import multiprocessing
+    import os
+    import tempfile
+    from time import perf_counter
+
+    keys = ['key' + str(i) for i in range(200000)]
+    source = dict(zip(keys, range(len(keys))))
+    start = perf_counter()
+    table = SharedTable.build(source, crc32_hash)
+    print('build', round(perf_counter() - start, 2), 's,', table.get_size(), 'entries')
+
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_attached_lookups, args=(table.name, keys[n::4], results))
+               for n in range(4)]
+    for worker in workers:
+        worker.start()
+    print([results.get() for _ in workers])
+    for worker in workers:
+        worker.join()
+
+    start = perf_counter()
+    attached = SharedTable.attach(table.name, crc32_hash)
+    print('attach', round((perf_counter() - start) * 1000, 3), 'ms,', attached.get('key12345'))
+    attached.close()
+    table.close()
+    table.unlink()
+
+    path = os.path.join(tempfile.mkdtemp(), 'table.bin')
+    SharedTable.write_file(source, crc32_hash, path)
+    with SharedTable.open_file(path, crc32_hash) as mapped:
+        print('file', os.path.getsize(path), 'bytes,', mapped.get('key199999'), mapped.get('missing'))
+    for other in (hash_function_1, hash):
+        try:
+            SharedTable.open_file(path, other)
+        except SharedTableException as exception:
+            print(exception)
+    os.remove(path)
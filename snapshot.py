@@ -0,0 +1,333 @@
+# Course:      CS261 - Data Structures
+# Description: Binary snapshots of the HashMaps (SC & OA), used by HashMap.save() and
+#              HashMap.load(). A snapshot records the exact table layout, so loading it
+#              needs no hashing or resizing: every entry goes straight back into the
+#              bucket (and, for SC, the chain position) it was saved from.
+#
+#              Format (little endian): a header with magic, format version, map kind,
+#              hash function id, layout, capacity, size, tombstone count and the length of
+#              the hash function's name, then the name (see hash_engine.function_name()),
+#              then one record per bucket. SC buckets are an entry count followed by the entries from head to
+#              tail; OA slots are a state byte (empty, live or tombstone) followed by the
+#              entry unless empty. An entry is the lengths of its encoded key and value
+#              followed by both (see codec.py). Tombstones keep their key and value.
+#              Snapshots are written as a stream and read back through mmap.
+#
+#              The layout says how keys were placed: hash % capacity (with quadratic probing,
+#              OA), or mix_hash(hash) & (capacity - 1) (with triangular probing, OA) for the
+#              power_of_two.py maps. A snapshot only loads into a map class of the same
+#              layout, since its entries would not be found under the other one. Version 1
+#              snapshots have no layout field and were all saved with MODULO.
+#
+#              For the same reason a snapshot only loads with the hash function it was saved
+#              with, checked by name. Versions 1 and 2 only stored the function id, which is
+#              0 for every custom function, so those can't be checked.
+
+import mmap
+import os
+import pickle
+import struct
+
+from a6_include import DynamicArray, HashEntry, LinkedList, hash_function_1, hash_function_2
+from codec import CodecException, decode, encode
+from hash_engine import function_id, function_name
+
+
+MAGIC = b'HMAP'
+VERSION = 3
+
+# Map kinds
+SEPARATE_CHAINING = 1
+OPEN_ADDRESSING = 2
+
+# Layouts, the map class's _layout
+MODULO = 1
+MIXED_MASK = 2
+
+# OA slot states
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+# magic, version, kind, hash function id, layout, capacity, size, tombstones, name length
+HEADER = struct.Struct('<4sHBBBQQQH')
+
+# Version 2 header: no name
+HEADER_V2 = struct.Struct('<4sHBBBQQQ')
+
+# Version 1 header: no layout and no name
+HEADER_V1 = struct.Struct('<4sHBBQQQ')
+
+# magic, version
+PREFIX = struct.Struct('<4sH')
+
+# SC bucket entry count
+COUNT = struct.Struct('<I')
+
+# encoded key length, encoded value length
+ENTRY = struct.Struct('<II')
+
+# Bytes buffered before each write to the file
+WRITE_BUFFER = 1 << 20
+
+_FUNCTIONS = {1: hash_function_1, 2: hash_function_2}
+
+
+class SnapshotException(Exception):
+    """
+    Raised when a file is not a snapshot that can be loaded
+    """
+    pass
+
+
+def _entry(key: object, value: object) -> bytes:
+    """
+    Returns the record of one key/value pair
+    """
+    key, value = encode(key), encode(value)
+    return ENTRY.pack(len(key), len(value)) + key + value
+
+
+def _header(m, kind: int, tombstones: int) -> bytes:
+    """
+    Returns the header and hash function name of a snapshot of the given map
+    """
+    name = function_name(m._hash_function).encode('utf-8')
+    return HEADER.pack(MAGIC, VERSION, kind, function_id(m._hash_function), m._layout,
+                       m.get_capacity(), m.get_size(), tombstones, len(name)) + name
+
+
+def save_sc(m, path: str) -> None:
+    """
+    Writes a snapshot of a separate chaining HashMap to the given path
+    """
+    with open(path, 'wb', buffering=WRITE_BUFFER) as file:
+        file.write(_header(m, SEPARATE_CHAINING, 0))
+        for index in range(m.get_capacity()):
+            nodes = list(m._buckets.get_at_index(index))
+            file.write(COUNT.pack(len(nodes)))
+            for node in nodes:
+                file.write(_entry(node.key, node.value))
+
+
+def save_oa(m, path: str) -> None:
+    """
+    Writes a snapshot of an open addressing HashMap to the given path
+    """
+    with open(path, 'wb', buffering=WRITE_BUFFER) as file:
+        file.write(_header(m, OPEN_ADDRESSING, m.tombstone_count()))
+        empty = bytes([EMPTY])
+        for index in range(m.get_capacity()):
+            entry = m._buckets.get_at_index(index)
+            if entry is None:
+                file.write(empty)
+            else:
+                file.write(bytes([TOMBSTONE if entry.is_tombstone else LIVE]))
+                file.write(_entry(entry.key, entry.value))
+
+
+def _read_entry(view: memoryview, offset: int) -> tuple:
+    """
+    Returns a tuple of the key, value and offset after the entry starting at offset
+    """
+    key_length, value_length = ENTRY.unpack_from(view, offset)
+    start = offset + ENTRY.size
+    middle = start + key_length
+    end = middle + value_length
+    return decode(view[start:middle]), decode(view[middle:end]), end
+
+
+def _load(map_class: type, path: str, kind: int, function: callable, fill: callable):
+    """
+    Maps the snapshot at path, checks its header, creates a map_class and gives it the
+    saved capacity and the list of buckets returned by fill(view, offset, capacity)
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < PREFIX.size:
+            raise SnapshotException(path + " is too short to be a snapshot")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    # The error is raised once the mapping is closed, which the traceback's views would prevent
+    truncated = False
+    with mapped:
+        view = memoryview(mapped)
+        try:
+            magic, version = PREFIX.unpack_from(view, 0)
+            if magic != MAGIC:
+                raise SnapshotException(path + " is not a HashMap snapshot")
+            saved_name = None
+            if version == 1:
+                _, _, saved_kind, saved_id, capacity, size, tombstones = HEADER_V1.unpack_from(view, 0)
+                layout, offset = MODULO, HEADER_V1.size
+            elif version == 2:
+                _, _, saved_kind, saved_id, layout, capacity, size, tombstones = HEADER_V2.unpack_from(view, 0)
+                offset = HEADER_V2.size
+            elif version == VERSION:
+                _, _, saved_kind, saved_id, layout, capacity, size, tombstones, length = HEADER.unpack_from(view, 0)
+                offset = HEADER.size + length
+                saved_name = bytes(view[HEADER.size:offset]).decode('utf-8')
+            else:
+                raise SnapshotException("Snapshot format version " + str(version) + " is not supported")
+            if saved_kind != kind:
+                raise SnapshotException("Snapshot was saved from the other kind of HashMap")
+            if layout != map_class._layout:
+                raise SnapshotException("Snapshot was saved from a map with another layout than "
+                                        + map_class.__name__)
+
+            if function is None:
+                if saved_id not in _FUNCTIONS:
+                    raise SnapshotException("Snapshot was saved with a custom hash function, pass it to load()")
+                function = _FUNCTIONS[saved_id]
+            elif saved_name is not None and function_name(function) != saved_name:
+                raise SnapshotException("Snapshot was saved with " + saved_name + ", not "
+                                        + function_name(function))
+            elif saved_name is None and saved_id and function_id(function) != saved_id:
+                raise SnapshotException("Snapshot was saved with hash_function_" + str(saved_id))
+
+            # The smallest map is created, as its empty table is replaced right away
+            m = map_class(1, function)
+            m._buckets = DynamicArray(fill(view, offset, capacity))
+            m._capacity = capacity
+            m._size = size
+            if tombstones:
+                m._tombstones = tombstones
+            return m
+        except (struct.error, IndexError, ValueError, EOFError, pickle.UnpicklingError, CodecException):
+            truncated = True
+        finally:
+            view.release()
+    if truncated:
+        raise SnapshotException(path + " is truncated or corrupt")
+
+
+def load_sc(map_class: type, path: str, function: callable = None):
+    """
+    Returns a new map_class (separate chaining) restored from the snapshot at path.
+    function is only needed for snapshots of maps with a custom hash function.
+    """
+    def fill(view: memoryview, offset: int, capacity: int) -> list:
+        buckets = []
+        for _ in range(capacity):
+            count = COUNT.unpack_from(view, offset)[0]
+            offset += COUNT.size
+            pairs = []
+            for _ in range(count):
+                key, value, offset = _read_entry(view, offset)
+                pairs.append((key, value))
+
+            # Inserting at the head in reverse order rebuilds the chain in its saved order
+            bucket = LinkedList()
+            for key, value in reversed(pairs):
+                bucket.insert(key, value)
+            buckets.append(bucket)
+        return buckets
+
+    return _load(map_class, path, SEPARATE_CHAINING, function, fill)
+
+
+def load_oa(map_class: type, path: str, function: callable = None):
+    """
+    Returns a new map_class (open addressing) restored from the snapshot at path.
+    function is only needed for snapshots of maps with a custom hash function.
+    """
+    def fill(view: memoryview, offset: int, capacity: int) -> list:
+        buckets = []
+        for _ in range(capacity):
+            state = view[offset]
+            offset += 1
+            if state == EMPTY:
+                buckets.append(None)
+                continue
+            key, value, offset = _read_entry(view, offset)
+            entry = HashEntry(key, value)
+            entry.is_tombstone = state == TOMBSTONE
+            buckets.append(entry)
+        return buckets
+
+    return _load(map_class, path, OPEN_ADDRESSING, function, fill)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nSnapshot - save / load example 1")
+    print("--------------------------------")
+    import tempfile
+    import hash_map_oa
+    import hash_map_sc
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'map.snapshot')
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        m = map_class(11, hash_function_2)
+        for i in range(60):
+            m.put('str' + str(i), (i, str(i)) if i % 7 == 0 else i * 100)
+        for i in range(0, 60, 5):
+            m.remove('str' + str(i))
+        m.save(path)
+        loaded = map_class.load(path)
+        print(str(loaded) == str(m), loaded.get_size(), loaded.get_capacity(), loaded.get('str7'),
+              os.path.getsize(path), 'bytes')
+        loaded.put('new', 1)
+        print(loaded.get('new'), loaded.contains_key('str5'), loaded.get_size())
+
+    print("\nSnapshot - layouts must match")
+    print("-----------------------------")
+    import power_of_two
+    # The maps raise the exception of the imported module, not of this script
+    import snapshot
+
+    pairs = ((hash_map_sc.HashMap, power_of_two.PowerOfTwoSCHashMap),
+             (hash_map_oa.HashMap, power_of_two.PowerOfTwoOAHashMap))
+    for base_class, mask_class in pairs:
+        m = mask_class(16, hash_function_2)
+        for i in range(40):
+            m.put('str' + str(i), i)
+        m.save(path)
+        loaded = mask_class.load(path)
+        print(mask_class.__name__, all(loaded.get('str' + str(i)) == i for i in range(40)))
+        try:
+            base_class.load(path)
+        except snapshot.SnapshotException as error:
+            print(' ', error)
+
+    print("\nSnapshot - hash function and truncation checks")
+    print("-----------------------------------------------")
+    from hash_engine import crc32_hash
+
+    m = hash_map_oa.HashMap(11, crc32_hash)
+    for i in range(40):
+        m.put('str' + str(i), i)
+    m.save(path)
+    print(hash_map_oa.HashMap.load(path, crc32_hash).get('str7'))
+    for function in (None, hash_function_1, hash):
+        try:
+            hash_map_oa.HashMap.load(path, function)
+        except snapshot.SnapshotException as error:
+            print(' ', error)
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) // 2)
+    try:
+        hash_map_oa.HashMap.load(path, crc32_hash)
+    except snapshot.SnapshotException as error:
+        print(' ', str(error).replace(path, 'map.snapshot'))
+
+    print("\nCold start, 300000 entries: replaying put() vs load() (s)")
+    print("--------------------------------------------------------")
+    from time import perf_counter
+
+    from hash_engine import crc32_hash
+
+    keys = ['key' + str(i) for i in range(300000)]
+    for map_class in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        start = perf_counter()
+        m = map_class(11, crc32_hash)
+        for i, key in enumerate(keys):
+            m.put(key, i)
+        replay = perf_counter() - start
+        m.save(path)
+        start = perf_counter()
+        loaded = map_class.load(path, crc32_hash)
+        print(map_class.__module__, round(replay, 2), round(perf_counter() - start, 2),
+              loaded.get('key123456') == 123456)
+    os.remove(path)